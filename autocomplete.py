@@ -0,0 +1,81 @@
+import bisect
+
+from item_catalog import normalize
+
+SEPARATOR = "\x00"  # Sorts before every printable character, so "purse\x00..." stays next to "purse"
+
+class ItemCompleter:
+    """Prefix index over the item names currently used in offers and wishlists.
+
+    Every word start of an item's display name gets one sorted key
+    ("kitty purse", "purse"), so typing either word completes the item. A
+    completion is one bisect plus a scan of at most a handful of
+    neighbours. Items are reference counted and leave the index when
+    nothing mentions them; an item whose display name changed is re-keyed
+    the next time it is added.
+    """
+
+    def __init__(self):
+        self._keys = []    # sorted "word suffix\x00item_id"
+        self._names = {}   # item_id -> display name
+        self._counts = {}  # item_id -> number of offers/subscriptions using it
+
+    def __len__(self):
+        return len(self._names)
+
+    def _item_keys(self, item_id, name):
+        words = (normalize(name) or item_id).split()
+        return [f"{' '.join(words[i:])}{SEPARATOR}{item_id}" for i in range(len(words))]
+
+    def _remove_keys(self, item_id):
+        for key in self._item_keys(item_id, self._names[item_id]):
+            index = bisect.bisect_left(self._keys, key)
+            if index < len(self._keys) and self._keys[index] == key:
+                del self._keys[index]
+
+    def add(self, item_id, name):
+        count = self._counts.get(item_id, 0)
+        self._counts[item_id] = count + 1
+        if count:
+            if self._names[item_id] == name:
+                return
+            self._remove_keys(item_id)
+        self._names[item_id] = name
+        for key in self._item_keys(item_id, name):
+            bisect.insort(self._keys, key)
+
+    def discard(self, item_id):
+        count = self._counts.get(item_id, 0)
+        if count > 1:
+            self._counts[item_id] = count - 1
+            return
+        if not count:
+            return
+        del self._counts[item_id]
+        self._remove_keys(item_id)
+        del self._names[item_id]
+
+    def rebuild(self, item_ids, names):
+        """Replace the index from an iterable of item IDs (one per use) and an {item_id: name} map"""
+        self._counts = {}
+        for item_id in item_ids:
+            self._counts[item_id] = self._counts.get(item_id, 0) + 1
+        self._names = {item_id: names.get(item_id, item_id) for item_id in self._counts}
+        self._keys = sorted(key for item_id, name in self._names.items() for key in self._item_keys(item_id, name))
+
+    def complete(self, text, limit=25):
+        """Display names of up to limit items with a word starting with text"""
+        prefix = normalize(text)
+        results = []
+        seen = set()
+        index = bisect.bisect_left(self._keys, prefix)
+        while index < len(self._keys) and len(results) < limit:
+            key = self._keys[index]
+            if not key.startswith(prefix):
+                break
+            item_id = key.split(SEPARATOR, 1)[1]
+            if item_id not in seen:
+                seen.add(item_id)
+                results.append(self._names[item_id])
+            index += 1
+        return results
@@ -0,0 +1,103 @@
+"""Micro-benchmark: auto-match fan-out, every rule hit vs main.check_auto_matches (top-K scoring with cooldowns).
+
+Run from the repository root:  python benchmarks/bench_auto_match.py
+"""
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from bench_item_search import ITEMS
+from fake_discord import FakeGuild, FakeREST
+
+DISCORD_EPOCH_MS = 1420070400000
+
+def make_offers(count, guild_id=None):
+    from records import Offer
+
+    rng = random.Random(count)
+    now_ms = int(time.time() * 1000)
+    offers = {}
+    for i in range(count):
+        # Snowflake IDs spread over the last 30 days
+        created_ms = now_ms - rng.randrange(30 * 86400 * 1000)
+        msg_id = ((created_ms - DISCORD_EPOCH_MS) << 22) + i
+        offers[msg_id] = Offer(rng.randrange(count // 2), ", ".join(rng.sample(ITEMS, 2)), rng.choice(ITEMS), guild_id)
+    return offers
+
+def every_rule_hit(index, trade_offers, new_entry, poster_id):
+    """The previous behaviour: every offer hitting any tier gets a DM"""
+    from offer_index import keywords_in
+
+    new_offer, new_wants, new_keywords = set(new_entry[0]), set(new_entry[1]), new_entry[2]
+    matches = []
+    for msg_id in index.match_candidates(*new_entry):
+        existing_offer = trade_offers[msg_id]
+        if existing_offer.user_id == poster_id:
+            continue
+        existing_offer_items, existing_wants_items = index.items(msg_id)
+        they_have_wanted = not new_wants.isdisjoint(existing_offer_items)
+        they_want_offered = not new_offer.isdisjoint(existing_wants_items)
+        if they_have_wanted and they_want_offered:
+            matches.append((msg_id, 100))
+        elif they_have_wanted or they_want_offered:
+            matches.append((msg_id, 75))
+        elif new_keywords & keywords_in(f"{existing_offer.offer} {existing_offer.wants}"):
+            matches.append((msg_id, 50))
+    return len(matches)
+
+async def run(count, post_count):
+    # main.py opens its data files relative to the working directory at import
+    workdir = tempfile.mkdtemp(prefix="bench_auto_match_")
+    os.makedirs(os.path.join(workdir, "data"))
+    shutil.copy(os.path.join(REPO, "item_catalog.json"), workdir)
+    shutil.copy(os.path.join(REPO, "guild_config.json"), workdir)
+    os.chdir(workdir)
+    os.environ.setdefault("MATCH_WORKERS", "0")
+    import main
+    from offer_index import keywords_in
+
+    main.load_all_data()
+    guild = FakeGuild(FakeREST(), main.guild_configs.default_guild_id)
+    data = main.guild_data(guild.id)
+    data.load(make_offers(count, guild.id), {})
+    main.match_pool.start()
+
+    # Count the DMs check_auto_matches would queue instead of rendering them
+    sent = []
+    main.send_auto_match_notifications = lambda new_user, new_offer, new_wants, matches, guild: sent.append(len(matches))
+
+    rng = random.Random(3)
+    posts = [(poster_id, ", ".join(rng.sample(ITEMS, 2)), rng.choice(ITEMS)) for poster_id in range(post_count)]
+
+    start = time.perf_counter()
+    old_dms = 0
+    for poster_id, offer, wants in posts:
+        entry = (main.item_catalog.items_in(offer), main.item_catalog.items_in(wants), keywords_in(f"{offer} {wants}"))
+        old_dms += every_rule_hit(data.offer_index, data.trade_offers, entry, poster_id)
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for poster_id, offer, wants in posts:
+        await main.check_auto_matches(guild.get_member(poster_id), offer, wants, guild)
+    new_time = time.perf_counter() - start
+    new_dms = sum(sent)
+
+    main.match_pool.stop()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{count} offers, {len(posts)} new posts")
+    print(f"  every rule hit     : {old_dms:>9} DMs ({old_dms / len(posts):8.1f} per post), "
+          f"{old_time / len(posts) * 1000:7.2f} ms per post")
+    print(f"  check_auto_matches : {new_dms:>9} DMs ({new_dms / len(posts):8.1f} per post), "
+          f"{new_time / len(posts) * 1000:7.2f} ms per post")
+    print(f"  stats              : {data.match_scorer.stats()}")
+
+if __name__ == "__main__":
+    asyncio.run(run(100_000, 200))
@@ -0,0 +1,69 @@
+"""Micro-benchmark: health server handler time on the loop and HTTP round trip.
+
+Run from the repository root:  python benchmarks/bench_health.py
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import aiohttp
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.99)] * 1000
+
+async def run():
+    import main
+    from bench_item_search import make_offers
+
+    for msg_id, offer_data in make_offers(100_000).items():
+        main.add_trade_offer(msg_id, offer_data)
+    for _ in range(1000):
+        main.metrics.observe("handler_seconds", ("modal", "CreateOfferModal.on_submit"), 0.02)
+
+    port = 18080
+    server = main.health_server
+    await server.start("127.0.0.1", port)
+    print(f"{len(main.guild_data(None).trade_offers)} offers loaded")
+    print(f"  {'endpoint':<10}{'handler p50':>14}{'p99':>10}{'round trip p50':>17}{'p99':>10}{'status':>8}")
+    async with aiohttp.ClientSession() as session:
+        for path, handler in (("/livez", server.livez), ("/readyz", server.readyz),
+                              ("/stats", server.stats_json), ("/metrics", server.metrics)):
+            handler_times = []
+            for _ in range(2000):
+                started = time.perf_counter()
+                await handler(None)
+                handler_times.append(time.perf_counter() - started)
+
+            round_trips = []
+            for _ in range(500):
+                started = time.perf_counter()
+                async with session.get(f"http://127.0.0.1:{port}{path}") as response:
+                    await response.read()
+                    status = response.status
+                round_trips.append(time.perf_counter() - started)
+
+            handler_p50, handler_p99 = percentiles(handler_times)
+            trip_p50, trip_p99 = percentiles(round_trips)
+            print(f"  {path:<10}{handler_p50:>11.3f} ms{handler_p99:>7.3f} ms{trip_p50:>14.3f} ms{trip_p99:>7.3f} ms{status:>8}")
+    await server.stop()
+    main.storage.close()
+
+def main():
+    # main.py opens its data files relative to the working directory at import
+    workdir = tempfile.mkdtemp(prefix="bench_health_")
+    os.makedirs(os.path.join(workdir, "data"))
+    os.chdir(workdir)
+    try:
+        asyncio.run(run())
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Micro-benchmark: "who has / who wants" lookups, substring scan vs catalog index.
+
+Run from the repository root:  python benchmarks/bench_item_search.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from item_catalog import ItemCatalog
+from offer_index import OfferIndex
+from records import Offer
+
+ADJECTIVES = ["golden", "kitty", "spiked", "neon", "shadow", "candy", "crystal", "rare", "epic", "frozen",
+              "blazing", "royal", "toxic", "cosmic", "ancient", "pixel", "velvet", "iron", "lunar", "solar"]
+NOUNS = ["sword", "purse", "shield", "heart", "axe", "pet", "mount", "armor", "bow", "crown",
+         "wand", "boots", "cape", "helmet", "dagger", "staff", "ring", "amulet", "hammer", "loverboard"]
+ITEMS = [f"{adjective} {noun}".title() for adjective in ADJECTIVES for noun in NOUNS]
+
+def make_offers(count):
+    rng = random.Random(count)
+    return {
+        1391947187281330206 + i: Offer(rng.randrange(5000), ", ".join(rng.sample(ITEMS, 2)), rng.choice(ITEMS))
+        for i in range(count)
+    }
+
+def substring_scan(item, trade_offers):
+    item = item.lower()
+    return [msg_id for msg_id, offer_data in trade_offers.items() if item in offer_data.offer.lower()]
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+def main():
+    queries = ["Golden Sword", "golden swrod", "kitty purse", "purse"]
+    for count in (10_000, 100_000):
+        trade_offers = make_offers(count)
+        index = OfferIndex(ItemCatalog())
+        build_time, _ = timed(lambda: index.rebuild(trade_offers), 1)
+
+        print(f"{count:>7} offers | index build {build_time * 1000:8.1f} ms")
+        for query in queries:
+            scan_time, scanned = timed(lambda: substring_scan(query, trade_offers), 5)
+            # The full ranked list is what /has and the search menu page through
+            search_time, ranked = timed(lambda: index.search_offer(query), 20)
+            print(f"  {query!r:>16} | scan {scan_time * 1000:8.2f} ms, {len(scanned):>6} hit(s) | "
+                  f"index {search_time * 1000:8.3f} ms, {len(ranked):>6} result(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Load test: main.py's interaction paths against fake Discord objects.
+
+Drives CreateOfferModal, the search modals and RemoveOfferModal through the
+real trading panel, check_auto_matches directly, and the trade request
+expiry that cleanup_old_trade_requests runs, over synthetic populations of
+offers and wishlist subscriptions. Each size runs in its own subprocess so
+peak memory is per size.
+
+Run from the repository root:  python benchmarks/bench_load.py
+    --sizes 1000,10000,100000   population sizes (offers and subscribers)
+    --ops 200                   operations per scenario
+    --latency 0.0               seconds added to every fake REST call
+    --rate-limit 0.0            share of fake REST calls answered with 429
+    --json                      print one JSON document for regression tracking
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from bench_item_search import ITEMS
+from fake_discord import FakeContext, FakeGuild, FakeInteraction, FakeREST, FakeSelect, FakeUser, snowflake
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+async def measure(name, ops, rest, results):
+    """Await each op in turn; record throughput, latency and the REST calls they made"""
+    calls_before, limited_before = rest.snapshot()
+    latencies = []
+    started = time.perf_counter()
+    for op in ops:
+        op_started = time.perf_counter()
+        await op()
+        latencies.append(time.perf_counter() - op_started)
+    elapsed = time.perf_counter() - started
+    calls_after, limited_after = rest.snapshot()
+    results[name] = {
+        "ops": len(ops),
+        "throughput_per_s": round(len(ops) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "rest_calls": dict(calls_after - calls_before),
+        "rate_limited": limited_after - limited_before,
+    }
+
+async def run_size(size, op_count, latency, rate_limit):
+    # main.py opens its data files relative to the working directory at import
+    workdir = tempfile.mkdtemp(prefix="bench_load_")
+    os.makedirs(os.path.join(workdir, "data"))
+    shutil.copy(os.path.join(REPO, "item_catalog.json"), workdir)
+    shutil.copy(os.path.join(REPO, "guild_config.json"), workdir)
+    os.chdir(workdir)
+    import main
+    from records import Offer, TradeRequest
+
+    rng = random.Random(size)
+    rest = FakeREST(latency, rate_limit, seed=size)
+    main.guild_configs.reload()
+    config = main.guild_configs.get(main.guild_configs.default_guild_id)
+    guild = FakeGuild(rest, config.guild_id, (config.offers_channel_id, config.requests_channel_id, config.ticket_category_id),
+                      roles=(config.trader_role_id,))
+    offers_channel = guild.get_channel(config.offers_channel_id)
+    data = main.guild_data(guild.id)
+
+    async def fetch_user(user_id):
+        await rest.call("GET /users/{user_id}")
+        return guild.get_member(user_id)
+
+    # The bot never logs in; route its own REST helpers to the fakes
+    main.bot.fetch_user = fetch_user
+    main.bot.get_partial_messageable = lambda channel_id: guild.channels.get(channel_id) or offers_channel
+
+    started = time.perf_counter()
+    main.item_catalog.load(main.ITEM_CATALOG_FILE)
+    now = time.time()
+    for _ in range(size):
+        msg_id = snowflake(now - rng.uniform(0, 10 * 86400))
+        offers_channel.messages.add(msg_id)
+        main.add_trade_offer(msg_id, Offer(rng.randrange(size // 2), ", ".join(rng.sample(ITEMS, 2)), rng.choice(ITEMS), guild.id))
+    for user_id in range(size):
+        main.set_subscriptions(guild.id, user_id, rng.sample(ITEMS, 2))
+    populate_time = time.perf_counter() - started
+
+    main.dm_dispatcher.start()
+    main.match_pool.start()
+    results = {}
+
+    # Open the trading panel once, like !launchembed in the trading channel
+    admin = FakeUser(rest, 2, (config.launch_role_id, config.trader_role_id))
+    ctx = FakeContext(rest, admin, guild)
+    await main.launchembed.callback(ctx)
+    panel = ctx.sent[-1]["view"]
+
+    def panel_op(action, user_id, **fields):
+        async def op():
+            user = guild.get_member(user_id)
+            select_interaction = FakeInteraction(rest, user, guild)
+            await type(panel).trading_select(panel, select_interaction, FakeSelect(action))
+            modal = select_interaction.response.modal
+            for name, value in fields.items():
+                getattr(modal, name)._value = value
+            await modal.on_submit(FakeInteraction(rest, user, guild))
+        return op
+
+    await measure("create_offer", [
+        panel_op("create_offer", rng.randrange(size // 2), weapons_trade=", ".join(rng.sample(ITEMS, 2)),
+                 skins_trade="", looking_for=rng.choice(ITEMS))
+        for _ in range(op_count)], rest, results)
+    await measure("search_has", [
+        panel_op("search_has", rng.randrange(size), item_name=rng.choice(ITEMS).lower())
+        for _ in range(op_count)], rest, results)
+    await measure("search_wants", [
+        panel_op("search_wants", rng.randrange(size), item_name=rng.choice(ITEMS).lower())
+        for _ in range(op_count)], rest, results)
+
+    # Each remove names the first item of one of the user's offers
+    removals = rng.sample(sorted(data.trade_offers), op_count)
+    await measure("remove_offer", [
+        panel_op("remove_offer", data.trade_offers[msg_id].user_id,
+                 offer_item=data.trade_offers[msg_id].offer.split(",")[0])
+        for msg_id in removals], rest, results)
+
+    def auto_match_op(user_id, offer, wants):
+        async def op():
+            await main.check_auto_matches(guild.get_member(user_id), offer, wants, guild)
+        return op
+
+    await measure("check_auto_matches", [
+        auto_match_op(size + i, ", ".join(rng.sample(ITEMS, 2)), rng.choice(ITEMS))
+        for i in range(op_count)], rest, results)
+
+    # Requests already past their TTL; the expiry runner clears them in one batch
+    expired = [snowflake() for _ in range(max(size // 10, 1))]
+    for msg_id in expired:
+        main.add_trade_request(msg_id, TradeRequest(
+            timestamp=now - main.REQUEST_TTL - 1, requester_id=1, original_offerer_id=2,
+            requested_offer="x", original_offer="y", original_wants="z", channel_id=offers_channel.id))
+    calls_before, limited_before = rest.snapshot()
+    started = time.perf_counter()
+    runner = asyncio.create_task(main.request_expiry.run())
+    # Delivered auto-match DMs add live requests of their own; wait for ours only
+    while any(msg_id in main.pending_trade_requests for msg_id in expired):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    runner.cancel()
+    calls_after, limited_after = rest.snapshot()
+    results["expire_requests"] = {
+        "ops": len(expired),
+        "throughput_per_s": round(len(expired) / elapsed, 1),
+        "p50_ms": None,
+        "p99_ms": None,
+        "rest_calls": dict(calls_after - calls_before),
+        "rate_limited": limited_after - limited_before,
+    }
+
+    dm_stats = main.dm_dispatcher.stats()
+    await main.dm_dispatcher.stop()
+    main.match_pool.stop()
+    await main.write_scheduler.close()
+    main.storage.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "size": size,
+        "populate_s": round(populate_time, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "rest_calls_total": sum(rest.calls.values()),
+        "dms": {key: dm_stats[key] for key in ("sent", "dropped", "queue_depth")},
+        "scenarios": results,
+    }
+
+def print_table(report):
+    print(f"REST latency {report['latency']}s, 429 ratio {report['rate_limit']}, {report['ops']} ops per scenario")
+    for result in report["results"]:
+        print(f"\n{result['size']} offers / subscribers | populate {result['populate_s']} s | "
+              f"peak RSS {result['peak_rss_mb']} MB | {result['rest_calls_total']} REST calls | DMs {result['dms']}")
+        print(f"  {'scenario':<20}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'REST':>8}{'429s':>6}")
+        for name, scenario in result["scenarios"].items():
+            p50 = "-" if scenario["p50_ms"] is None else f"{scenario['p50_ms']:.2f}"
+            p99 = "-" if scenario["p99_ms"] is None else f"{scenario['p99_ms']:.2f}"
+            print(f"  {name:<20}{scenario['throughput_per_s']:>10}{p50:>10}{p99:>10}"
+                  f"{sum(scenario['rest_calls'].values()):>8}{scenario['rate_limited']:>6}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # The bot logs to stdout; keep it for the result
+        result_out, sys.stdout = sys.stdout, sys.stderr
+        result = asyncio.run(run_size(args.worker, args.ops, args.latency, args.rate_limit))
+        result_out.write(json.dumps(result) + "\n")
+        return
+
+    report = {"latency": args.latency, "rate_limit": args.rate_limit, "ops": args.ops, "results": []}
+    for size in (int(size) for size in args.sizes.split(",")):
+        worker = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", str(size), "--ops", str(args.ops),
+             "--latency", str(args.latency), "--rate-limit", str(args.rate_limit)],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True)
+        report["results"].append(json.loads(worker.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(report)
+
+if __name__ == "__main__":
+    main()
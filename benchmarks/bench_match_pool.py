@@ -0,0 +1,78 @@
+"""Micro-benchmark: event loop lag while scoring auto-matches inline vs in the match pool.
+
+Run from the repository root:  python benchmarks/bench_match_pool.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_auto_match import make_offers
+from bench_item_search import ITEMS
+from item_catalog import ItemCatalog
+from match_pool import MatchPool
+from match_scoring import best_per_user
+from offer_index import OfferIndex, keywords_in
+
+HALF_LIFE = 3 * 86400
+
+async def heartbeat(lags, stop):
+    """Stands in for the gateway heartbeat: how late does a 10 ms sleep wake up?"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+async def run(label, trade_offers, index, posts, score):
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    for poster_id, entry in posts:
+        candidates = index.match_candidates(entry[0], entry[1], ())
+        snapshot = [(msg_id, trade_offers[msg_id].user_id, index.entry(msg_id))
+                    for msg_id in candidates if trade_offers[msg_id].user_id != poster_id]
+        await score(entry, snapshot)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    lags.sort()
+    print(f"  {label:<18}: {elapsed / len(posts) * 1000:7.2f} ms per post | heartbeat lag "
+          f"p50 {lags[len(lags) // 2] * 1000:6.2f} ms, max {lags[-1] * 1000:7.2f} ms")
+
+async def main():
+    count = 100_000
+    trade_offers = make_offers(count)
+    catalog = ItemCatalog()
+    index = OfferIndex(catalog)
+    index.rebuild(trade_offers)
+
+    rng = random.Random(3)
+    posts = []
+    for poster_id in range(50):
+        offer, wants = ", ".join(rng.sample(ITEMS, 2)), rng.choice(ITEMS)
+        posts.append((poster_id, (catalog.items_in(offer), catalog.items_in(wants), keywords_in(f"{offer} {wants}"))))
+
+    print(f"{count} offers, {len(posts)} new posts")
+
+    async def inline(entry, snapshot):
+        return best_per_user(entry, snapshot, time.time(), HALF_LIFE)
+
+    await run("inline on loop", trade_offers, index, posts, inline)
+
+    for workers in (0, 2):
+        pool = MatchPool(workers, process_threshold=1000)
+        pool.start()
+
+        async def pooled(entry, snapshot):
+            return await pool.run(len(snapshot), best_per_user, entry, snapshot, time.time(), HALF_LIFE)
+
+        await pool.run(pool.process_threshold, best_per_user, posts[0][1], [], time.time(), HALF_LIFE)  # Start the workers
+        await run(f"pool, {workers} process(es)", trade_offers, index, posts, pooled)
+        pool.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""Memory benchmark: dict-per-entry stores vs slotted records at 100k offers.
+
+Run from the repository root:  python benchmarks/bench_records_memory.py
+"""
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Offer, TradeRequest
+
+ITEMS = ["Loverboard", "Kitty Purse", "Spiked Purse", "Golden Sword", "Neon Heart", "Candy Axe",
+         "Shadow Pet", "Crystal Mount", "Rare Shield", "Epic Armor"]
+
+def make_json(count):
+    """Serialized stores as they would be read from disk"""
+    rng = random.Random(count)
+    base_id = 1391947187281330206
+    offers = {
+        str(base_id + i): {"user_id": 1390000000000000000 + rng.randrange(5000),
+                           "offer": rng.choice(ITEMS), "wants": rng.choice(ITEMS)}
+        for i in range(count)
+    }
+    requests = {
+        str(base_id + count + i): {"timestamp": time.time(), "requester_id": 1390000000000000000 + i,
+                                   "original_offerer_id": 1390000000000000001, "requested_offer": rng.choice(ITEMS),
+                                   "original_offer": rng.choice(ITEMS), "original_wants": rng.choice(ITEMS),
+                                   "is_auto_match": False}
+        for i in range(count // 10)
+    }
+    return json.dumps(offers), json.dumps(requests)
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    stores = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, stores
+
+def main():
+    count = 100_000
+    offers_json, requests_json = make_json(count)
+
+    before, _ = measure(lambda: (json.loads(offers_json), json.loads(requests_json)))
+    after, _ = measure(lambda: (
+        {int(k): Offer.from_dict(v) for k, v in json.loads(offers_json).items()},
+        {int(k): TradeRequest.from_dict(v) for k, v in json.loads(requests_json).items()},
+    ))
+
+    print(f"{count} offers + {count // 10} requests")
+    print(f"  dicts with string keys : {before / 1024 / 1024:7.1f} MiB ({before / count:6.0f} B/offer)")
+    print(f"  slotted records        : {after / 1024 / 1024:7.1f} MiB ({after / count:6.0f} B/offer)")
+    print(f"  saved                  : {(1 - after / before) * 100:6.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Micro-benchmark: repeated item searches, uncached index lookup vs SearchCache hit.
+
+Run from the repository root:  python benchmarks/bench_search_cache.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_item_search import ITEMS, make_offers
+from item_catalog import ItemCatalog
+from offer_index import OfferIndex
+from records import Offer
+from search_cache import SearchCache
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+def main():
+    count = 100_000
+    trade_offers = make_offers(count)
+    catalog = ItemCatalog()
+    index = OfferIndex(catalog)
+    index.rebuild(trade_offers)
+    cache = SearchCache(catalog)
+
+    def cached_search(query):
+        msg_ids = cache.get("has", query)
+        if msg_ids is None:
+            msg_ids = cache.put("has", query, [msg_id for msg_id, score in index.search_offer(query)])
+        return msg_ids
+
+    # Popular queries repeat; a Zipf-like mix of 50 distinct queries
+    rng = random.Random(7)
+    popular = rng.sample(ITEMS, 50)
+    queries = rng.choices(popular, weights=[1 / (rank + 1) for rank in range(len(popular))], k=5000)
+
+    uncached_time, _ = timed(lambda: [index.search_offer(query) for query in queries[:200]], 1)
+    cached_time, _ = timed(lambda: [cached_search(query) for query in queries], 1)
+    hit_time, _ = timed(lambda: cache.get("has", popular[0]), 10_000)
+
+    # Offer churn: each new offer drops only the cached queries for its items
+    churn = [Offer(1, rng.choice(ITEMS), rng.choice(ITEMS)) for _ in range(1000)]
+    start = time.perf_counter()
+    for offset, offer_data in enumerate(churn):
+        msg_id = 2_000_000_000_000_000_000 + offset
+        index.add(msg_id, offer_data)
+        cache.invalidate("has", index.items(msg_id)[0])
+    churn_time = (time.perf_counter() - start) / len(churn)
+
+    print(f"{count} offers, {len(queries)} searches over {len(popular)} distinct queries")
+    print(f"  uncached search  : {uncached_time / 200 * 1000:8.3f} ms per query")
+    print(f"  cached (mixed)   : {cached_time / len(queries) * 1000:8.3f} ms per query")
+    print(f"  cache hit        : {hit_time * 1e6:8.2f} us")
+    print(f"  add + invalidate : {churn_time * 1e6:8.2f} us per offer")
+    print(f"  stats            : {cache.stats()}")
+
+if __name__ == "__main__":
+    main()
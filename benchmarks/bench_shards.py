@@ -0,0 +1,182 @@
+"""Multi-process shards: offer throughput and cross-process replication.
+
+Starts 1, 2, 4... copies of main.py against one shared SQLite database
+(STORAGE_BACKEND=shared), each running one shard and posting into the
+guild that shard owns. Every process posts offers through
+add_trade_offer and check_auto_matches as fast as it can for a fixed
+time while its change feed mirrors what the others post. Afterwards
+every process must hold the same offers as the database.
+
+Run from the repository root:  python benchmarks/bench_shards.py
+    --procs 1,2,4        process counts to compare
+    --duration 5         seconds of posting per run
+    --offers 20000       offers in the database before the run
+    --json               print one JSON document for regression tracking
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from bench_item_search import ITEMS, make_offers
+from fake_discord import FakeGuild, FakeREST, snowflake
+
+def shard_guild_id(index, procs):
+    """A guild ID that Discord routes to shard index of procs"""
+    return (1000 * procs + index) << 22
+
+async def run_worker(index, procs, duration):
+    """One shard process; talks to the parent over stdin/stdout"""
+    import main
+    from records import Offer
+
+    result_out, sys.stdout = sys.stdout, sys.stderr  # The bot logs to stdout
+
+    def tell(line):
+        result_out.write(line + "\n")
+        result_out.flush()
+
+    loop = asyncio.get_running_loop()
+    main.load_all_data()
+    main.change_feed.start()
+    main.match_pool.start()
+    guild = FakeGuild(FakeREST(seed=index), shard_guild_id(index, procs))
+    assert main.shard_plan.owns_guild(guild.id)
+    rng = random.Random(index)
+
+    def offer_count():
+        return sum(len(data.trade_offers) for data in main.guilds.values())
+    loaded = offer_count()
+
+    tell("ready")
+    start_at = float(await loop.run_in_executor(None, sys.stdin.readline))
+    await asyncio.sleep(max(start_at - time.time(), 0))
+
+    ops = 0
+    while time.time() < start_at + duration:
+        user = guild.get_member(rng.randrange(1_000_000))
+        offer, wants = ", ".join(rng.sample(ITEMS, 2)), rng.choice(ITEMS)
+        main.add_trade_offer(snowflake(), Offer(user.id, offer, wants, guild.id))
+        main.save_trade_offers()
+        await main.check_auto_matches(user, offer, wants, guild)
+        ops += 1
+
+    await main.write_scheduler.close()
+    tell("done")
+    # Once every process has flushed, catch up with the whole feed
+    await loop.run_in_executor(None, sys.stdin.readline)
+    final_seq = main.storage.last_change()
+    while main.change_feed.cursor < final_seq:
+        await asyncio.sleep(0.01)
+
+    await main.change_feed.stop()
+    main.match_pool.stop()
+    main.storage.close()
+    tell(json.dumps({"ops": ops, "loaded": loaded, "offers": offer_count(), "feed": main.change_feed.stats()}))
+
+def seed_database(workdir, count, procs):
+    """Stored offers, spread over the guilds of every shard"""
+    from storage import OFFERS, SharedSqliteStorage
+
+    storage = SharedSqliteStorage(os.path.join(workdir, "data", "trading.db"), origin="seed")
+    for i, (msg_id, offer_data) in enumerate(make_offers(count).items()):
+        storage.upsert(OFFERS, msg_id, {**offer_data.to_dict(), "guild_id": shard_guild_id(i % procs, procs)})
+    asyncio.run(storage.flush(OFFERS))
+    storage.close()
+
+def run_procs(procs, duration, offers):
+    workdir = tempfile.mkdtemp(prefix="bench_shards_")
+    os.makedirs(os.path.join(workdir, "data"))
+    shutil.copy(os.path.join(REPO, "item_catalog.json"), workdir)
+    seed_database(workdir, offers, procs)
+
+    workers = []
+    for index in range(procs):
+        env = dict(os.environ, STORAGE_BACKEND="shared", MATCH_WORKERS="0",
+                   SHARD_COUNT=str(procs), SHARD_IDS=str(index))
+        workers.append(subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker", str(index), "--procs", str(procs),
+             "--duration", str(duration)],
+            cwd=workdir, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True))
+
+    def broadcast(line):
+        for worker in workers:
+            worker.stdin.write(line + "\n")
+            worker.stdin.flush()
+
+    def wait_for(word):
+        for worker in workers:
+            line = worker.stdout.readline().strip()
+            if line != word:
+                raise RuntimeError(f"worker said {line!r}, expected {word!r}")
+
+    try:
+        wait_for("ready")
+        broadcast(str(time.time() + 0.5))
+        wait_for("done")
+        broadcast("sync")
+        results = [json.loads(worker.stdout.readline()) for worker in workers]
+        for worker in workers:
+            worker.wait()
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.kill()
+
+    with sqlite3.connect(os.path.join(workdir, "data", "trading.db")) as conn:
+        stored = conn.execute("SELECT COUNT(*) FROM offers").fetchone()[0]
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    total_ops = sum(result["ops"] for result in results)
+    lags_p50 = [result["feed"]["lag_p50_ms"] for result in results if result["feed"]["lag_p50_ms"] is not None]
+    lags_p99 = [result["feed"]["lag_p99_ms"] for result in results if result["feed"]["lag_p99_ms"] is not None]
+    return {
+        "procs": procs,
+        "ops_per_s": round(total_ops / duration, 1),
+        "ops_per_s_per_proc": round(total_ops / duration / procs, 1),
+        "applied_per_proc": round(sum(result["feed"]["applied"] for result in results) / procs),
+        "lag_p50_ms": max(lags_p50) if lags_p50 else None,
+        "lag_p99_ms": max(lags_p99) if lags_p99 else None,
+        "stored_offers": stored,
+        "consistent": all(result["offers"] == stored for result in results),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procs", default="1,2,4")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--offers", type=int, default=20_000)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        asyncio.run(run_worker(args.worker, int(args.procs), args.duration))
+        return
+
+    report = {"cpus": os.cpu_count(), "duration": args.duration, "offers": args.offers,
+              "results": [run_procs(int(procs), args.duration, args.offers) for procs in args.procs.split(",")]}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['offers']} stored offers, {report['duration']} s per run, {report['cpus']} CPU(s)")
+    print(f"  {'procs':>5}{'ops/s':>10}{'per proc':>10}{'mirrored':>10}{'lag p50 ms':>12}{'p99 ms':>10}{'consistent':>12}")
+    for result in report["results"]:
+        lag_p50 = "-" if result["lag_p50_ms"] is None else result["lag_p50_ms"]
+        lag_p99 = "-" if result["lag_p99_ms"] is None else result["lag_p99_ms"]
+        print(f"  {result['procs']:>5}{result['ops_per_s']:>10}{result['ops_per_s_per_proc']:>10}"
+              f"{result['applied_per_proc']:>10}{lag_p50:>12}{lag_p99:>10}{str(result['consistent']):>12}")
+
+if __name__ == "__main__":
+    main()
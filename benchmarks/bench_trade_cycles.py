@@ -0,0 +1,61 @@
+"""Micro-benchmark: incremental 3-/4-way trade search over 100k offers.
+
+Run from the repository root:  python benchmarks/bench_trade_cycles.py
+"""
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trade_cycles import TradeGraph
+
+def make_offers(count, items):
+    """(user_id, offer item IDs, wants item IDs); item popularity is skewed like real listings"""
+    rng = random.Random(count)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(items)))
+    offers = []
+    for _ in range(count):
+        offered = tuple(set(rng.choices(range(items), cum_weights=cum_weights, k=2)))
+        wanted = tuple(rng.choices(range(items), cum_weights=cum_weights, k=1))
+        offers.append((rng.randrange(count // 2), offered, wanted))
+    return offers
+
+def main():
+    budget = 0.5  # CYCLE_TIME_BUDGET default
+    for count, items in ((100_000, 400), (100_000, 20_000)):
+        offers = make_offers(count, items)
+        graph = TradeGraph()
+        start = time.perf_counter()
+        graph.rebuild(offers)
+        build_time = time.perf_counter() - start
+
+        # One background run: search queued users until the budget is spent
+        start = time.perf_counter()
+        searched = found = 0
+        slowest = 0.0
+        while graph.dirty and time.perf_counter() - start < budget:
+            user_started = time.perf_counter()
+            cycles = graph.cycles_through(graph.pop_dirty())
+            slowest = max(slowest, time.perf_counter() - user_started)
+            searched += 1
+            found += bool(cycles)
+        run_time = time.perf_counter() - start
+
+        # Incremental updates as offers arrive
+        rng = random.Random(1)
+        start = time.perf_counter()
+        for i in range(10_000):
+            graph.add_offer(count + i, (rng.randrange(items),), (rng.randrange(items),))
+        add_time = (time.perf_counter() - start) / 10_000
+
+        print(f"{count} offers over {items} items | build {build_time * 1000:7.1f} ms | "
+              f"add_offer {add_time * 1e6:5.1f} us")
+        print(f"  one {budget}s run: {searched} user(s) searched in {run_time * 1000:.0f} ms, "
+              f"{found} with a 3-/4-way trade, slowest search {slowest * 1000:.1f} ms, "
+              f"{len(graph.dirty)} still queued")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Micro-benchmark: wishlist fan-out, scanning every wishlist vs WishlistMatcher item lookup.
+
+Both sides answer the same question (which users subscribed to an item the
+offer lists, after catalog resolution) and the run fails if they disagree.
+
+Run from the repository root:  python benchmarks/bench_wishlist.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from item_catalog import ItemCatalog
+from wishlist_matcher import WishlistMatcher
+
+WORDS = ["loverboard", "kitty", "purse", "spiked", "golden", "sword", "shield", "rare", "epic",
+         "legendary", "pet", "mount", "crystal", "neon", "shadow", "candy", "heart", "star"]
+
+def make_subscriptions(count, items_per_user=3):
+    rng = random.Random(count)
+    subscriptions = {}
+    for user_id in range(count // items_per_user):
+        subscriptions[user_id] = {
+            f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.randrange(100)}" for _ in range(items_per_user)
+        }
+    return subscriptions
+
+def scan_all(catalog, offer_items, subscriptions):
+    """Resolve every subscribed item of every user and test it against the offer's items"""
+    offer_items = set(offer_items)
+    matches = {}
+    for user_id, subscribed_items in subscriptions.items():
+        for subscribed_item in subscribed_items:
+            if catalog.resolve(subscribed_item) in offer_items:
+                matches[user_id] = subscribed_item
+                break
+    return matches
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+def main():
+    offer_text = "Loverboard Kitty 12, Kitty Purse 7, Spiked Purse 5, Golden Sword 45 and Neon Heart 99"
+    for count in (10_000, 100_000):
+        subscriptions = make_subscriptions(count)
+        catalog = ItemCatalog()
+        matcher = WishlistMatcher(catalog)
+
+        build_time, _ = timed(lambda: matcher.build(subscriptions), 1)
+        offer_items = catalog.items_in(offer_text)
+        scan_time, expected = timed(lambda: scan_all(catalog, offer_items, subscriptions), 5)
+        match_time, found = timed(lambda: matcher.match(catalog.items_in(offer_text, learn=False)), 50)
+        if found.keys() != expected.keys():
+            raise AssertionError(f"matcher found {len(found)} users, the scan {len(expected)}")
+
+        print(f"{count:>7} subscriptions | scan all    {scan_time * 1000:8.2f} ms, {len(expected)} matched | "
+              f"item lookup {match_time * 1000:8.3f} ms, {len(found)} matched | build {build_time * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""In-process stand-ins for the discord.py objects main.py touches.
+
+Every REST-shaped method goes through FakeREST, which counts calls per
+route template, sleeps an injectable latency and answers a share of calls
+with 429 (slept off and retried, as discord.py does).
+"""
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import discord
+
+DISCORD_EPOCH_MS = 1420070400000
+_sequence = itertools.count()
+
+def snowflake(timestamp=None):
+    """A unique snowflake ID for the given UNIX time (default now)"""
+    ms = int((time.time() if timestamp is None else timestamp) * 1000)
+    return ((ms - DISCORD_EPOCH_MS) << 22) + (next(_sequence) & 0x3FFFFF)
+
+class FakeREST:
+    def __init__(self, latency=0.0, rate_limit_ratio=0.0, retry_after=0.05, seed=0):
+        self.latency = latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.calls = Counter()  # route template -> requests, 429s included
+        self.rate_limited = 0
+
+    async def call(self, route):
+        while True:
+            self.calls[route] += 1
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.rate_limit_ratio and self.rng.random() < self.rate_limit_ratio:
+                self.rate_limited += 1
+                await asyncio.sleep(self.retry_after)
+                continue
+            return
+
+    def snapshot(self):
+        return Counter(self.calls), self.rate_limited
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+class FakeMessage:
+    def __init__(self, rest, channel, msg_id=None):
+        self.rest = rest
+        self.channel = channel
+        self.id = msg_id or snowflake()
+
+    async def edit(self, **kwargs):
+        await self.rest.call("PATCH /channels/{channel_id}/messages/{message_id}")
+        return self
+
+    async def delete(self):
+        await self.rest.call("DELETE /channels/{channel_id}/messages/{message_id}")
+
+class FakeChannel:
+    """Text or DM channel"""
+
+    def __init__(self, rest, channel_id=None, guild=None, name="channel"):
+        self.rest = rest
+        self.id = channel_id or snowflake()
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.messages = set()
+
+    async def send(self, content=None, **kwargs):
+        await self.rest.call("POST /channels/{channel_id}/messages")
+        message = FakeMessage(self.rest, self)
+        self.messages.add(message.id)
+        return message
+
+    async def fetch_message(self, msg_id):
+        await self.rest.call("GET /channels/{channel_id}/messages/{message_id}")
+        if msg_id not in self.messages:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+        return FakeMessage(self.rest, self, msg_id)
+
+    def get_partial_message(self, msg_id):
+        return FakeMessage(self.rest, self, msg_id)
+
+    async def delete_messages(self, messages):
+        # discord.py sends a single delete for one message
+        if len(messages) == 1:
+            await self.rest.call("DELETE /channels/{channel_id}/messages/{message_id}")
+        else:
+            await self.rest.call("POST /channels/{channel_id}/messages/bulk-delete")
+        self.messages.difference_update(message.id for message in messages)
+
+class FakeUser:
+    def __init__(self, rest, user_id, roles=()):
+        self.rest = rest
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.display_avatar = SimpleNamespace(url=f"https://cdn.example/avatars/{user_id}.png")
+        self.roles = [FakeRole(role_id) for role_id in roles]
+        self.bot = False
+
+    async def send(self, content=None, **kwargs):
+        await self.rest.call("POST /users/@me/channels")  # Open the DM channel
+        return await FakeChannel(self.rest).send(content, **kwargs)
+
+class FakeGuild:
+    def __init__(self, rest, guild_id, channel_ids=(), roles=()):
+        self.rest = rest
+        self.id = guild_id
+        self.name = "Fake Guild"
+        self.icon = None
+        self.roles = roles
+        self.channels = {channel_id: FakeChannel(rest, channel_id, self) for channel_id in channel_ids}
+        self.members = {}
+        self.default_role = FakeRole(guild_id)
+        self.me = FakeUser(rest, 1, roles)
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_member(self, user_id):
+        member = self.members.get(user_id)
+        if member is None:
+            member = self.members[user_id] = FakeUser(self.rest, user_id, self.roles)
+        return member
+
+    async def create_text_channel(self, name, **kwargs):
+        await self.rest.call("POST /guilds/{guild_id}/channels")
+        channel = FakeChannel(self.rest, guild=self, name=name)
+        self.channels[channel.id] = channel
+        return channel
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self.done = False
+        self.modal = None
+
+    def is_done(self):
+        return self.done
+
+    async def _callback(self):
+        if self.done:
+            raise discord.InteractionResponded(self.interaction)
+        self.done = True
+        await self.interaction.rest.call("POST /interactions/{interaction_id}/{interaction_token}/callback")
+
+    async def send_message(self, content=None, **kwargs):
+        await self._callback()
+
+    async def send_modal(self, modal):
+        self.modal = modal
+        await self._callback()
+
+    async def edit_message(self, **kwargs):
+        await self._callback()
+
+    async def defer(self, **kwargs):
+        await self._callback()
+
+class FakeInteraction:
+    def __init__(self, rest, user, guild, message=None):
+        self.rest = rest
+        self.id = snowflake()
+        self.user = user
+        self.guild = guild
+        self.message = message
+        self.response = FakeResponse(self)
+        self.followup = SimpleNamespace(send=self._followup)
+
+    async def _followup(self, content=None, **kwargs):
+        await self.rest.call("POST /webhooks/{application_id}/{interaction_token}")
+
+class FakeSelect:
+    def __init__(self, *values):
+        self.values = list(values)
+
+class FakeContext:
+    """Prefix command context; captures what the command sends"""
+
+    def __init__(self, rest, author, guild):
+        self.rest = rest
+        self.author = author
+        self.guild = guild
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        await self.rest.call("POST /channels/{channel_id}/messages")
+        self.sent.append(kwargs)
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+import discord
+
+class TokenBucket:
+    """Simple token bucket used to pace sends on one route"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class DMDispatcher:
+    """Background DM delivery: bounded queue drained by a pool of workers.
+
+    Interaction handlers call enqueue() and return immediately. Workers
+    resolve the recipient, pace sends with a global bucket plus one bucket
+    per DM route, retry transient HTTP errors with exponential backoff and
+    record anything that could not be delivered as a dead letter.
+    """
+
+    MAX_ROUTE_BUCKETS = 10000
+
+    def __init__(self, resolve_user, workers=4, max_queue=1000, max_retries=3,
+                 global_rate=40, route_rate=1, route_burst=5):
+        self.resolve_user = resolve_user
+        self.worker_count = workers
+        self.max_retries = max_retries
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.route_rate = route_rate
+        self.route_burst = route_burst
+        self.route_buckets = OrderedDict()
+        self.workers = []
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retried = 0
+        self.dead_letters = deque(maxlen=100)  # (user_id, reason) of recent failures
+        self.latencies = deque(maxlen=1000)    # enqueue -> delivered, in seconds
+
+    def start(self):
+        if self.workers:
+            return
+        for _ in range(self.worker_count):
+            self.workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def enqueue(self, user_id, build, on_sent=None):
+        """Queue a DM to user_id; build(user) returns the send() kwargs.
+
+        on_sent, if given, is awaited with the delivered message. Returns
+        False when the queue is full and the DM was dropped.
+        """
+        try:
+            self.queue.put_nowait((time.monotonic(), user_id, build, on_sent))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.dead_letters.append((user_id, "queue full"))
+            return False
+
+    def _route_bucket(self, user_id):
+        bucket = self.route_buckets.get(user_id)
+        if bucket is None:
+            bucket = self.route_buckets[user_id] = TokenBucket(self.route_rate, self.route_burst)
+            if len(self.route_buckets) > self.MAX_ROUTE_BUCKETS:
+                self.route_buckets.popitem(last=False)
+        else:
+            self.route_buckets.move_to_end(user_id)
+        return bucket
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._deliver(*job)
+            except Exception as e:
+                self.failed += 1
+                self.dead_letters.append((job[1], repr(e)))
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, queued_at, user_id, build, on_sent):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._route_bucket(user_id).acquire()
+                await self.global_bucket.acquire()
+                user = await self.resolve_user(user_id)
+                message = await user.send(**build(user))
+            except (discord.Forbidden, discord.NotFound) as e:
+                # DMs closed or the user is gone; retrying won't help
+                self.failed += 1
+                self.dead_letters.append((user_id, f"{e.status} {e.text}"))
+                return
+            except discord.HTTPException as e:
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    self.dead_letters.append((user_id, f"{e.status} {e.text}"))
+                    return
+                self.retried += 1
+                await asyncio.sleep(2 ** attempt)
+                continue
+
+            self.sent += 1
+            self.latencies.append(time.monotonic() - queued_at)
+            if on_sent:
+                await on_sent(message)
+            return
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "queue_depth": self.queue.qsize(),
+            "workers": len(self.workers),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "retried": self.retried,
+            "dead_letters": len(self.dead_letters),
+            "latency_avg_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0,
+            "latency_max_ms": round(latencies[-1] * 1000, 2) if latencies else 0,
+        }
@@ -0,0 +1,81 @@
+import asyncio
+import heapq
+import time
+
+class ExpiryScheduler:
+    """Min-heap of deadlines that sleeps exactly until the next one is due.
+
+    Cancelled or rescheduled keys are dropped lazily when they reach the top
+    of the heap. on_expire is awaited with the list of keys that expired
+    together.
+    """
+
+    def __init__(self, ttl, on_expire):
+        self.ttl = ttl
+        self.on_expire = on_expire
+        self._heap = []       # (deadline, key)
+        self._deadlines = {}  # key -> current deadline
+        self._wakeup = asyncio.Event()
+        self._loop = None     # Loop run() is on, once started
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, key, timestamp):
+        deadline = timestamp + self.ttl
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+        if self._heap[0][1] == key:
+            # New earliest deadline; wake the runner so it re-arms its sleep
+            self._wakeup.set()
+
+    def cancel(self, key):
+        self._deadlines.pop(key, None)
+        # Drop stale heap entries once they outnumber live ones
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(deadline, key) for key, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def rebuild(self, timestamps):
+        """Replace every deadline from a {key: timestamp} mapping; safe to call from another thread"""
+        self._deadlines = {key: timestamp + self.ttl for key, timestamp in timestamps.items()}
+        self._heap = [(deadline, key) for key, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+        # Startup loads data in an executor thread and asyncio.Event is not
+        # thread-safe; a runner that hasn't started reads the heap when it does
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pop_expired(self, now=None):
+        now = time.time() if now is None else now
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                expired.append(key)
+        return expired
+
+    def next_deadline(self):
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else max(deadline - time.time(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            expired = self.pop_expired()
+            if expired:
+                try:
+                    await self.on_expire(expired)
+                except Exception as e:
+                    print(f"❌ Error expiring {len(expired)} item(s): {e}")
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+
+@dataclass(frozen=True, slots=True)
+class GuildConfig:
+    """Channels, roles and matching settings of one trading guild"""
+    guild_id: int
+    offers_channel_id: int
+    requests_channel_id: int
+    ticket_category_id: int
+    launch_role_id: int  # Can run !launchembed
+    trader_role_id: int  # Can use the panel and slash commands
+    auto_match_top_k: int = 5
+    auto_match_cooldown: int = 600
+
+    REQUIRED = ("offers_channel_id", "requests_channel_id", "ticket_category_id", "launch_role_id", "trader_role_id")
+    SETTINGS = ("auto_match_top_k", "auto_match_cooldown")
+
+    @classmethod
+    def from_dict(cls, guild_id, data, defaults=None):
+        """Parse one guild's entry; settings it leaves out come from defaults, then the class"""
+        settings = {**(defaults or {}), **{key: data[key] for key in cls.SETTINGS if key in data}}
+        return cls(int(guild_id), *(int(data[key]) for key in cls.REQUIRED),
+                   **{key: int(value) for key, value in settings.items()})
+
+class GuildConfigCache:
+    """guild_id -> GuildConfig from a JSON file, reloaded when the file changes.
+
+    The file looks like {"default_guild_id": ..., "guilds": {"<guild_id>":
+    {"offers_channel_id": ..., ...}}}. get() is a single dict lookup however
+    many guilds are configured. A reload parses the whole file into a new
+    dict and swaps it in, so readers never see a half-applied edit and a
+    broken edit leaves the last good config in place.
+    """
+
+    def __init__(self, path, defaults=None):
+        self.path = path
+        self.defaults = defaults or {}  # Matching settings for guilds that don't set their own
+        self.default_guild_id = None  # Owner of data saved before multi-guild support
+        self.listeners = []  # Called with the new config map after each reload
+        self._configs = {}
+        self._mtime = None
+
+        self.reloads = 0
+        self.failures = 0
+
+    def __len__(self):
+        return len(self._configs)
+
+    def __iter__(self):
+        return iter(list(self._configs))
+
+    def get(self, guild_id):
+        return self._configs.get(guild_id)
+
+    def _read(self):
+        """(mtime, configs, default guild) when the file changed since the last read, else None"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return None
+        if mtime is None:
+            print(f"⚠️ {self.path} not found, no guilds are configured")
+            return mtime, {}, None
+
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            configs = {int(guild_id): GuildConfig.from_dict(guild_id, entry, self.defaults)
+                       for guild_id, entry in data.get("guilds", {}).items()}
+            default_guild_id = data.get("default_guild_id")
+            if default_guild_id is None and len(configs) == 1:
+                default_guild_id = next(iter(configs))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            self.failures += 1
+            self._mtime = mtime  # Don't re-parse the same broken file every poll
+            print(f"⚠️ {self.path} is invalid, keeping the previous guild config: {e!r}")
+            return None
+        return mtime, configs, None if default_guild_id is None else int(default_guild_id)
+
+    def _apply(self, update):
+        if update is None:
+            return False
+        self._mtime, self._configs, self.default_guild_id = update
+        self.reloads += 1
+        for listener in self.listeners:
+            listener(self._configs)
+        return True
+
+    def reload(self):
+        """Re-read the file if it changed; True if a new config was swapped in"""
+        return self._apply(self._read())
+
+    async def watch(self, interval=30):
+        """Poll the file for changes; parsing runs in the executor, the swap on the loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            if self._apply(await loop.run_in_executor(None, self._read)):
+                print(f"🔄 Reloaded {self.path}: {len(self._configs)} guild(s)")
+
+    def stats(self):
+        return {
+            "guilds": len(self._configs),
+            "default_guild_id": self.default_guild_id,
+            "reloads": self.reloads,
+            "failures": self.failures,
+        }
@@ -0,0 +1,83 @@
+from autocomplete import ItemCompleter
+from match_scoring import MatchScorer
+from offer_index import OfferIndex
+from records import make_subscriptions
+from search_cache import SearchCache
+from trade_cycles import TradeGraph
+from wishlist_matcher import WishlistMatcher
+
+class GuildData:
+    """One guild's offers and wishlists, with every index built over them.
+
+    Search, auto-matching, wishlist alerts, autocomplete and the trade
+    cycle search each work on one GuildData, so their cost depends on that
+    guild's data only, however many guilds the bot serves. The item
+    catalog is shared; everything else here belongs to the guild.
+    """
+
+    def __init__(self, guild_id, catalog, search_cache_size=1000, top_k=5, cooldown=600):
+        self.guild_id = guild_id
+        self.catalog = catalog
+        self.trade_offers = {}  # msg_id -> Offer
+        self.notify_subscriptions = {}  # user_id -> tuple of subscribed item names
+        self.offer_index = OfferIndex(catalog)  # Item -> msg_id indexes over trade_offers
+        self.wishlist_matcher = WishlistMatcher(catalog)  # Item -> subscribers over notify_subscriptions
+        self.item_completer = ItemCompleter()  # Prefix index of item names in use, for autocomplete
+        self.search_cache = SearchCache(catalog, search_cache_size)  # (kind, query) -> ranked msg_ids
+        self.match_scorer = MatchScorer(top_k, cooldown)  # Top-K auto-match ranking and cooldowns
+        self.trade_graph = TradeGraph()  # User -> item -> user graph for 3- and 4-way trades
+
+    def configure(self, config):
+        """Apply the guild's matching settings; called again on every config reload"""
+        self.match_scorer.top_k = config.auto_match_top_k
+        self.match_scorer.cooldown = config.auto_match_cooldown
+
+    def add_offer(self, msg_id, offer_data):
+        self.trade_offers[msg_id] = offer_data
+        self.offer_index.add(msg_id, offer_data)
+        offer_items, wants_items = self.offer_index.items(msg_id)
+        self.search_cache.invalidate("has", offer_items)
+        self.search_cache.invalidate("wants", wants_items)
+        self.trade_graph.add_offer(offer_data.user_id, offer_items, wants_items)
+        for item_id in (*offer_items, *wants_items):
+            self.item_completer.add(item_id, self.catalog.names[item_id])
+
+    def remove_offer(self, msg_id):
+        """Drop an offer and its index entries; returns it, or None if it wasn't here"""
+        if msg_id in self.trade_offers:
+            offer_items, wants_items = self.offer_index.items(msg_id)
+            self.search_cache.invalidate("has", offer_items)
+            self.search_cache.invalidate("wants", wants_items)
+            self.trade_graph.remove_offer(self.trade_offers[msg_id].user_id, offer_items, wants_items)
+            for item_id in (*offer_items, *wants_items):
+                self.item_completer.discard(item_id)
+        self.offer_index.remove(msg_id)
+        return self.trade_offers.pop(msg_id, None)
+
+    def set_subscriptions(self, user_id, items):
+        """Replace a user's subscriptions; returns them normalized"""
+        items = make_subscriptions(items)
+        old_items = self.notify_subscriptions.get(user_id, ())
+        # Entries with no item in them ("x2", "#1") resolve to None and aren't indexed
+        for item_id in filter(None, map(self.catalog.resolve, old_items)):
+            self.item_completer.discard(item_id)
+        for item_id in filter(None, map(self.catalog.resolve, items)):
+            self.item_completer.add(item_id, self.catalog.names[item_id])
+        if items:
+            self.notify_subscriptions[user_id] = items
+        else:
+            self.notify_subscriptions.pop(user_id, None)
+        self.wishlist_matcher.update(user_id, old_items, items)
+        return items
+
+    def load(self, offers, subscriptions):
+        """Replace the guild's data and rebuild every index in one pass"""
+        self.trade_offers = offers
+        self.offer_index.rebuild(offers)
+        self.trade_graph.rebuild((offer_data.user_id, *self.offer_index.items(msg_id)) for msg_id, offer_data in offers.items())
+        self.notify_subscriptions = subscriptions
+        self.wishlist_matcher.build(subscriptions)
+
+        item_ids = [item_id for msg_id in offers for item_ids in self.offer_index.items(msg_id) for item_id in item_ids]
+        item_ids += filter(None, (self.catalog.resolve(item) for items in subscriptions.values() for item in items))
+        self.item_completer.rebuild(item_ids, self.catalog.names)
@@ -0,0 +1,100 @@
+import json
+import math
+import time
+
+from aiohttp import web
+
+class HealthServer:
+    """Liveness, readiness, JSON stats and Prometheus metrics on the bot's own event loop.
+
+    Handlers only read state the bot already keeps, so a response is a few
+    dict lookups and needs no extra threads. /livez fails once a shard has
+    stayed disconnected for heartbeat_timeout; /readyz stays 503 until is_ready()
+    (startup reconciliation) returns True.
+    """
+
+    def __init__(self, bot, is_ready, stats, metrics_text, heartbeat_timeout=90):
+        self.bot = bot
+        self.is_ready = is_ready
+        self.stats = stats
+        self.metrics_text = metrics_text
+        self.heartbeat_timeout = heartbeat_timeout
+        self.runner = None
+        self._down_since = {}  # shard_id -> time.monotonic() the connection was lost, None while connected
+
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get("/", self.home),
+            web.get("/livez", self.livez),
+            web.get("/readyz", self.readyz),
+            web.get("/stats", self.stats_json),
+            web.get("/metrics", self.metrics),
+        ])
+
+    async def start(self, host="0.0.0.0", port=8080):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        print(f"🩺 Health server listening on {host}:{port}")
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def gateway(self):
+        """(alive, details) from each shard's public latency and rate-limit state.
+
+        discord.py closes and reconnects a socket that stops acknowledging
+        heartbeats, and latency is not finite until the new socket's first
+        ACK. A shard that was connected and has had no finite latency for
+        heartbeat_timeout seconds is stuck reconnecting, so /livez fails.
+        """
+        shards = getattr(self.bot, "shards", None)
+        if shards is None:
+            shards = {None: self.bot}
+        # AutoShardedBot's ShardInfo and a plain Bot expose the same latency and is_ws_ratelimited()
+
+        now = time.monotonic()
+        alive = not self.bot.is_closed()
+        per_shard = {}
+        for shard_id, shard in shards.items():
+            latency = shard.latency
+            if math.isfinite(latency):
+                self._down_since[shard_id] = None
+            elif shard_id in self._down_since and self._down_since[shard_id] is None:
+                self._down_since[shard_id] = now
+            # Still connecting for the first time counts as alive; readiness covers startup
+            down_since = self._down_since.get(shard_id)
+            down_for = None if down_since is None else now - down_since
+            per_shard[shard_id] = {
+                "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+                "ws_ratelimited": shard.is_ws_ratelimited(),
+                "down_s": None if down_for is None else round(down_for, 1),
+            }
+            if down_for is not None and down_for >= self.heartbeat_timeout:
+                alive = False
+
+        details = {"connected": any(info["latency_ms"] is not None for info in per_shard.values())}
+        if None in per_shard:
+            details.update(per_shard[None])
+        else:
+            details["shards"] = per_shard
+        return alive, details
+
+    async def home(self, request):
+        return web.Response(text="Discord Trading Bot is running!")
+
+    async def livez(self, request):
+        alive, details = self.gateway()
+        return web.json_response({"alive": alive, **details}, status=200 if alive else 503)
+
+    async def readyz(self, request):
+        ready = bool(self.is_ready())
+        return web.json_response({"ready": ready}, status=200 if ready else 503)
+
+    async def stats_json(self, request):
+        return web.json_response(self.stats(), dumps=lambda data: json.dumps(data, default=str))
+
+    async def metrics(self, request):
+        return web.Response(text=self.metrics_text(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
@@ -0,0 +1,158 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import time
+
+# Histogram bucket upper bounds in seconds; 3.0 is Discord's interaction deadline
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 3.0, 5.0, 10.0)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUANTILES = (0.5, 0.95, 0.99)
+DISCORD_EPOCH_MS = 1420070400000
+
+# kind:name of the handler running in the current task, for the REST calls it makes
+current_handler = contextvars.ContextVar("current_handler", default="background")
+
+class Histogram:
+    """Bucket counts, sum and count in the Prometheus histogram layout"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile the way PromQL's histogram_quantile() does"""
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return 0.0
+
+class Metrics:
+    """Latency histograms for interaction handlers, Discord REST calls and event-loop lag.
+
+    timed() wraps interaction callbacks, instrument_discord() wraps the
+    HTTP client and webhook adapter every REST call and interaction
+    response goes through, and sample_loop_lag() measures how late the
+    loop wakes up. render() returns the Prometheus text exposition.
+    """
+
+    FAMILIES = {
+        "handler_seconds": ("Interaction handler duration", ("kind", "name"), LATENCY_BUCKETS),
+        "interaction_ack_seconds": ("Interaction creation to initial response", ("handler",), LATENCY_BUCKETS),
+        "discord_request_seconds": ("Discord REST call duration", ("route",), LATENCY_BUCKETS),
+        "event_loop_lag_seconds": ("Event loop wake-up delay", (), LAG_BUCKETS),
+    }
+
+    def __init__(self, prefix="trading_bot"):
+        self.prefix = prefix
+        self.histograms = {name: {} for name in self.FAMILIES}  # family -> {label values: Histogram}
+
+    def observe(self, family, labels, value):
+        series = self.histograms[family]
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram(self.FAMILIES[family][2])
+        histogram.observe(value)
+
+    def timed(self, kind, label=None):
+        """Decorator timing an interaction callback; label(*args) names it, by default Class.method"""
+        def decorator(fn):
+            default = ".".join(fn.__qualname__.split(".")[-2:]).replace("<locals>.", "")
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                name = label(*args, **kwargs) if label else default
+                token = current_handler.set(f"{kind}:{name}")
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.observe("handler_seconds", (kind, name), time.perf_counter() - started)
+                    current_handler.reset(token)
+            return wrapper
+        return decorator
+
+    def instrument_discord(self, http):
+        """Time every call through the bot's HTTP client and the interaction webhook adapter"""
+        from discord.webhook.async_ import async_context
+
+        def wrap(request):
+            async def timed_request(route, *args, **kwargs):
+                if route.path.startswith("/interactions/") and route.path.endswith("/callback"):
+                    # The 3 second deadline counts from the interaction's creation
+                    created = ((int(route.webhook_id) >> 22) + DISCORD_EPOCH_MS) / 1000
+                    self.observe("interaction_ack_seconds", (current_handler.get(),), max(time.time() - created, 0))
+                started = time.perf_counter()
+                try:
+                    return await request(route, *args, **kwargs)
+                finally:
+                    self.observe("discord_request_seconds", (route.key,), time.perf_counter() - started)
+            return timed_request
+
+        http.request = wrap(http.request)
+        adapter = async_context.get()
+        adapter.request = wrap(adapter.request)
+
+    async def sample_loop_lag(self, interval=0.5):
+        """Record how late a sleep(interval) wakes up, for as long as the loop runs"""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.observe("event_loop_lag_seconds", (), max(time.perf_counter() - started - interval, 0))
+
+    def summary(self):
+        """{family: {label: (count, p50, p95, p99 in ms)}} for the hourly log"""
+        return {family: {"/".join(labels) or "all": (histogram.count, *(round(histogram.quantile(q) * 1000, 1) for q in QUANTILES))
+                         for labels, histogram in list(series.items())}
+                for family, series in self.histograms.items() if series}
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for family, series in self.histograms.items():
+            help_text, label_names, buckets = self.FAMILIES[family]
+            name = f"{self.prefix}_{family}"
+            series = list(series.items())  # The endpoint may render from another thread
+
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series:
+                pairs = dict(zip(label_names, labels))
+                cumulative = 0
+                for bound, count in zip((*buckets, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{label_set(pairs, le=bound)} {cumulative}")
+                lines.append(f"{name}_sum{label_set(pairs)} {histogram.sum}")
+                lines.append(f"{name}_count{label_set(pairs)} {histogram.count}")
+
+            # Precomputed p50/p95/p99 for dashboards without histogram_quantile()
+            lines.append(f"# HELP {name}_quantile {help_text}, estimated quantiles")
+            lines.append(f"# TYPE {name}_quantile gauge")
+            for labels, histogram in series:
+                pairs = dict(zip(label_names, labels))
+                for q in QUANTILES:
+                    lines.append(f"{name}_quantile{label_set(pairs, quantile=q)} {histogram.quantile(q)}")
+        return "\n".join(lines) + "\n"
+
+def label_set(labels, **extra):
+    """{key="value",...} with Prometheus escaping, or "" without labels"""
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
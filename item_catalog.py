@@ -0,0 +1,217 @@
+import json
+import os
+import re
+import sys
+
+# Free text is split into item phrases on list separators ("Loverboard, Kitty Purse and Spiked Purse")
+PHRASE_SPLIT = re.compile(r"[,;/|&\n]+|\band\b|\bor\b", re.IGNORECASE)
+NON_WORD = re.compile(r"[^a-z0-9+]+")
+QUANTITY = re.compile(r"(?<![\w+])x?\d+x?(?!\w)")  # "Kitty Purse 7", "Loverboard x2"
+
+SEARCH_SIMILARITY = 0.35  # Lowest fuzzy score still returned as a ranked search result
+SEARCH_MARGIN = 0.15      # Partial-word searches keep items scoring within this of the best one
+RESOLVE_CANDIDATES = 8    # Closest aliases checked for a typo before a phrase becomes a new item
+
+def normalize(text):
+    """Lowercase, drop quantities and collapse punctuation: "Kitty-Purse x2!" -> "kitty purse" """
+    return " ".join(QUANTITY.sub(" ", NON_WORD.sub(" ", text.lower())).split())
+
+def trigrams(text):
+    """Word trigrams padded like pg_trgm: "sword" -> "  s", " sw", "swo", "wor", "ord", "rd " """
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (adjacent swaps count once), capped at limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+def typo_of(phrase, alias):
+    """True if phrase is alias with a typo per word or different spacing ("lover bord" ~ "loverboard")"""
+    words, alias_words = phrase.split(), alias.split()
+    if len(words) != len(alias_words):
+        words, alias_words = ["".join(words)], ["".join(alias_words)]
+    for word, alias_word in zip(words, alias_words):
+        # One edit allowed in short words, two in longer ones
+        limit = 1 if len(alias_word) <= 5 else 2
+        if edit_distance(word, alias_word, limit) > limit:
+            return False
+    return True
+
+class ItemCatalog:
+    """Canonical item names, their aliases and a trigram index over both.
+
+    An item ID is the normalized name the item was first seen under; it only
+    keys the indexes. Offers, searches and subscriptions are resolved to
+    item IDs so exact aliases hit directly, misspellings land on the closest
+    known item and unknown phrases are learned as new items. A learned item
+    is displayed under the spelling offers use most, so a typo that happened
+    to come first becomes an alias once the right spelling outnumbers it.
+    """
+
+    def __init__(self):
+        self.names = {}      # item_id -> display name
+        self.aliases = {}    # normalized alias -> item_id
+        self._trigrams = {}  # trigram -> set(alias)
+        self._sizes = {}     # alias -> number of trigrams
+        self.alias_log = []  # Every alias in the order it was learned, so caches can catch up on their next read
+        self._spellings = {} # learned item_id -> {alias: [display name, offers using it]}
+        self._words = {}     # word -> number of aliases containing it
+
+    def __len__(self):
+        return len(self.names)
+
+    def load(self, path):
+        """Seed canonical items from a {"Display Name": ["alias", ...]} JSON file"""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            print(f"⚠️ {path} is corrupt, starting with an empty item catalog")
+            return
+        for name, aliases in data.items():
+            self.add_item(name, aliases)
+
+    def add_item(self, name, aliases=()):
+        item_id = sys.intern(normalize(name))
+        if not item_id:
+            return None
+        self.names.setdefault(item_id, name.strip())
+        for alias in (item_id, *map(normalize, aliases)):
+            self._add_alias(alias, item_id)
+        return item_id
+
+    def _add_alias(self, alias, item_id):
+        if not alias or alias in self.aliases:
+            return
+        self.aliases[alias] = item_id
+        grams = trigrams(alias)
+        self._sizes[alias] = len(grams)
+        for gram in grams:
+            self._trigrams.setdefault(gram, set()).add(alias)
+        for word in set(alias.split()):
+            self._words[word] = self._words.get(word, 0) + 1
+        self.alias_log.append(alias)
+
+    def _spelling_rank(self, alias, uses):
+        """Offers using a spelling, then how common its words are across the catalog"""
+        return uses, sum(self._words.get(word, 0) for word in alias.split())
+
+    def _count_use(self, item_id, phrase):
+        """Count an offer's spelling of a learned item; the most used one becomes its display name"""
+        spellings = self._spellings.get(item_id)
+        if spellings is None:
+            return  # Catalog items keep the name they were seeded with
+        alias = normalize(phrase)
+        entry = spellings.setdefault(alias, [phrase.strip(), 0])
+        entry[1] += 1
+        current = normalize(self.names[item_id])
+        if alias != current:
+            current_uses = spellings[current][1] if current in spellings else 0
+            if self._spelling_rank(alias, entry[1]) > self._spelling_rank(current, current_uses):
+                self.names[item_id] = entry[0]
+
+    def _similar_aliases(self, phrase, min_score):
+        """{alias: Dice coefficient} over word trigrams for aliases scoring at least min_score"""
+        grams = trigrams(phrase)
+        shared = {}
+        for gram in grams:
+            for alias in self._trigrams.get(gram, ()):
+                shared[alias] = shared.get(alias, 0) + 1
+
+        scores = {}
+        for alias, count in shared.items():
+            score = 2 * count / (len(grams) + self._sizes[alias])
+            if score >= min_score:
+                scores[alias] = score
+        return scores
+
+    def lookup(self, phrase, min_score=SEARCH_SIMILARITY):
+        """Ranked [(item_id, score)] for one phrase; an exact alias scores 1.0"""
+        phrase = normalize(phrase)
+        if not phrase:
+            return []
+        exact = self.aliases.get(phrase)
+        scores = {exact: 1.0} if exact is not None else {}
+
+        for alias, score in self._similar_aliases(phrase, min_score).items():
+            item_id = self.aliases[alias]
+            if score > scores.get(item_id, 0):
+                scores[item_id] = score
+
+        return sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+
+    def resolve(self, phrase, learn=True):
+        """Item ID for one phrase, learning it as a new item if nothing is close enough"""
+        name, phrase = phrase.strip(), normalize(phrase)
+        if not phrase:
+            return None
+        exact = self.aliases.get(phrase)
+        if exact is not None:
+            return exact
+
+        # Trigrams find candidates, edit distance confirms them word by word, so
+        # "golden swrod" finds "golden sword" but "golden boots" stays apart from "golden bow"
+        candidates = self._similar_aliases(phrase, SEARCH_SIMILARITY)
+        for alias in sorted(candidates, key=lambda alias: (-candidates[alias], alias))[:RESOLVE_CANDIDATES]:
+            if typo_of(phrase, alias):
+                item_id = self.aliases[alias]
+                if learn:
+                    # Remember the spelling so the next occurrence is an exact hit
+                    self._add_alias(phrase, item_id)
+                return item_id
+        if not learn:
+            return None
+        item_id = self.add_item(name)
+        self._spellings[item_id] = {}
+        return item_id
+
+    def phrases(self, text):
+        return [phrase.strip() for phrase in PHRASE_SPLIT.split(text) if normalize(phrase)]
+
+    def items_in(self, text, learn=True):
+        """Item IDs mentioned in free offer/wants text, in order of appearance; learning also counts the spellings used"""
+        items = []
+        for phrase in self.phrases(text):
+            item_id = self.resolve(phrase, learn)
+            if item_id is not None and item_id not in items:
+                items.append(item_id)
+                if learn:
+                    self._count_use(item_id, phrase)
+        return tuple(items)
+
+    def search(self, text):
+        """Ranked [(item_id, score)] across every phrase of a search query.
+
+        A phrase naming an item (exactly or with a typo) finds only that item;
+        otherwise ("purse") the items scoring close to its best match are kept,
+        not every neighbour above SEARCH_SIMILARITY.
+        """
+        scores = {}
+        for phrase in self.phrases(text):
+            item_id = self.resolve(phrase, learn=False)
+            if item_id is not None:
+                matches = [(item_id, 1.0)]
+            else:
+                matches = self.lookup(phrase)
+                matches = [(item_id, score) for item_id, score in matches if score >= matches[0][1] - SEARCH_MARGIN]
+            for item_id, score in matches:
+                if score > scores.get(item_id, 0):
+                    scores[item_id] = score
+        return sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
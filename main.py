@@ -5,100 +5,319 @@ import os
 import json
 import time
 import asyncio
+import hashlib
+import socket
+import datetime
+from offer_index import keywords_in
+from item_catalog import ItemCatalog
+from match_scoring import best_per_user
+from match_pool import MatchPool
+from instrumentation import Metrics
+from health_server import HealthServer
+from wishlist_matcher import merge_subscribers
+from dm_queue import DMDispatcher
+from user_cache import UserCache
+from expiry import ExpiryScheduler
+from sharding import ShardPlan, ChangeFeed
+from guild_config import GuildConfigCache
+from guild_data import GuildData
+from records import Offer, TradeRequest, make_subscriptions
+from storage import OFFERS, SUBSCRIPTIONS, REQUESTS, WriteScheduler, open_storage, write_json_atomic, subscription_key, parse_subscription_key
 
 # --- Config ---
 TOKEN = os.getenv("DISCORD_TOKEN")
-AUTHORIZED_LAUNCH_ROLE = 1390820873086435460  # Role that can launch the embed
-TRADER_ROLE = 1390820117352550504  # Trader role that can use the menu
+DM_WORKERS = int(os.getenv("DM_WORKERS", "4"))  # Background DM delivery workers
+DM_QUEUE_SIZE = int(os.getenv("DM_QUEUE_SIZE", "1000"))  # Pending DMs before new ones are dropped
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None  # Total gateway shards across all processes; unset lets Discord choose
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv("SHARD_IDS", "").split(",") if shard_id.strip()] or None  # Shards this process runs; unset runs them all
 
 # Create data directory if it doesn't exist
 if not os.path.exists("data"):
     os.makedirs("data")
 
 TRADE_OFFERS_FILE = "trade_offers.json"
+ITEM_CATALOG_FILE = "item_catalog.json" # Canonical item names and their aliases
+GUILD_CONFIG_FILE = "guild_config.json" # Channels, roles and matching settings per trading guild
+GUILD_CONFIG_RELOAD_INTERVAL = int(os.getenv("GUILD_CONFIG_RELOAD_INTERVAL", "30"))  # Seconds between checks for edits to the guild config
 NOTIFICATIONS_FILE = "data/notifications.json"
 PENDING_REQUESTS_FILE = "data/pending_requests.json" # New file to store pending trade requests
+DATABASE_FILE = "data/trading.db"
+COMMAND_HASH_FILE = "data/command_tree.hash" # Hash of the last synced command tree
+# When each user was last put in a multi-party trade ticket. Each shard process searches only its own
+# guilds, so it keeps its own file rather than overwriting its peers' cooldowns
+TRADE_CYCLES_FILE = f"data/trade_cycles.shards-{'-'.join(map(str, SHARD_IDS))}.json" if SHARD_IDS else "data/trade_cycles.json"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")  # "json", "journal", "sqlite" or "shared" (sqlite plus a change feed for multi-process shards)
+JOURNAL_COMPACT_BYTES = int(os.getenv("JOURNAL_COMPACT_BYTES", str(1024 * 1024)))  # Log size that triggers a snapshot
+SAVE_WINDOW = float(os.getenv("SAVE_WINDOW", "0.25"))  # Seconds of mutations coalesced into one write
+REQUEST_TTL = 5 * 3600  # Pending trade requests expire after 5 hours
+RECONCILE_HISTORY_LIMIT = int(os.getenv("RECONCILE_HISTORY_LIMIT", "20000"))  # Offers-channel messages scanned at startup
+RECONCILE_CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", "5"))  # Parallel fetches for offers outside the scan
+DELETE_CONCURRENCY = int(os.getenv("DELETE_CONCURRENCY", "5"))  # Parallel deletes for messages too old to bulk-delete
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1000"))  # Distinct search queries kept in the result cache
+AUTO_MATCH_TOP_K = int(os.getenv("AUTO_MATCH_TOP_K", "5"))  # Best-scoring traders DMed per new offer, unless the guild config sets its own
+AUTO_MATCH_COOLDOWN = int(os.getenv("AUTO_MATCH_COOLDOWN", "600"))  # Seconds before the same trader gets another auto-match DM, unless the guild config sets its own
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "2"))  # Processes scoring matches off the event loop; 0 scores in one thread
+MATCH_PROCESS_THRESHOLD = int(os.getenv("MATCH_PROCESS_THRESHOLD", "5000"))  # Candidates per job before a process beats the thread
+MATCH_RECENCY_HALF_LIFE = 3 * 86400  # Offer age at which the recency part of a match score halves
+CYCLE_SCAN_INTERVAL = int(os.getenv("CYCLE_SCAN_INTERVAL", "300"))  # Seconds between multi-party trade searches
+CYCLE_TIME_BUDGET = float(os.getenv("CYCLE_TIME_BUDGET", "0.5"))  # CPU seconds one search run may use
+CYCLE_MAX_EXPANSIONS = 50_000  # Graph postings one user's search may visit
+CYCLE_COOLDOWN = 24 * 3600  # A user joins at most one multi-party trade ticket per day
+HEALTH_HOST = os.getenv("HEALTH_HOST", "0.0.0.0")
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", str(8080 + (SHARD_IDS[0] if SHARD_IDS else 0))))  # Liveness, readiness, /stats and /metrics; shard processes on one host default to 8080 + their first shard ID
+HEALTH_HEARTBEAT_TIMEOUT = 90  # Seconds a shard may stay disconnected after losing its gateway connection before /livez fails
+LOOP_LAG_INTERVAL = 0.5  # Seconds between event-loop lag samples
+SHARD_SYNC_INTERVAL = float(os.getenv("SHARD_SYNC_INTERVAL", "0.25"))  # Seconds between polls of other processes' changes
+CHANGE_RETENTION = 24 * 3600  # Seconds the shared change feed keeps rows for slow peers
+AUTO_MATCH_ACTIONS = "auto_match_actions"  # Change feed messages handing auto-match DM clicks to the request's owner
+RESULTS_PAGE_SIZE = 5  # Offers per page of search results; keeps an embed under Discord's 6000 character cap
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+PROCESS_STARTED = time.perf_counter()
+
+class TradingBot(commands.AutoShardedBot):
+    async def setup_hook(self):
+        # Runs once per process, before the gateway connects; file and index
+        # work happens in the executor so the loop stays free
+        started = time.perf_counter()
+        # Up first, so /readyz answers "not ready" while data loads
+        await health_server.start(HEALTH_HOST, HEALTH_PORT)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, load_all_data)
+        startup_timings["load"] = round(time.perf_counter() - started, 3)
+        # Mirror other shard processes' writes from here on
+        if change_feed is not None:
+            change_feed.start()
+
+        # Time every REST call and interaction response
+        metrics.instrument_discord(self.http)
+
+        # One template per trade button type handles every posted message
+        self.add_dynamic_items(RequestTradeButton, TradeRequestButton, AutoMatchButton)
+
+    async def close(self):
+        # Flush anything still waiting to be written before disconnecting
+        await dm_dispatcher.stop()
+        match_pool.stop()
+        if change_feed is not None:
+            await change_feed.stop()
+        await write_scheduler.close()
+        storage.close()
+        await health_server.stop()
+        await super().close()
+
+bot = TradingBot(command_prefix="!", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
 tree = bot.tree
 
 # --- Data stores ---
-trade_offers = {}
-notify_subscriptions = {}
+startup_timings = {} # Startup phase -> seconds, filled in by setup_hook/on_ready
+metrics = Metrics() # Handler, REST call and loop lag histograms, served at /metrics
+health_server = HealthServer(bot, lambda: reconciliation_complete and bot.is_ready(), lambda: health_stats(),
+                             metrics.render, HEALTH_HEARTBEAT_TIMEOUT) # /livez, /readyz, /stats, /metrics on the bot loop
+reconciliation_complete = False # Set once the startup offer reconciliation finishes
+storage = open_storage(
+    STORAGE_BACKEND,
+    {OFFERS: TRADE_OFFERS_FILE, SUBSCRIPTIONS: NOTIFICATIONS_FILE, REQUESTS: PENDING_REQUESTS_FILE},
+    DATABASE_FILE,
+    compact_bytes=JOURNAL_COMPACT_BYTES,
+    origin=f"{socket.gethostname()}/{os.getpid()}"
+)
+shard_plan = ShardPlan(SHARD_IDS, SHARD_COUNT) # Guilds whose data this process writes
+change_feed = (ChangeFeed(storage, lambda store, key, value: apply_change(store, key, value), SHARD_SYNC_INTERVAL, CHANGE_RETENTION)
+               if STORAGE_BACKEND == "shared" else None) # Other shard processes' writes, mirrored in memory
+write_scheduler = WriteScheduler(storage, window=SAVE_WINDOW)
+guild_configs = GuildConfigCache(GUILD_CONFIG_FILE, {"auto_match_top_k": AUTO_MATCH_TOP_K, "auto_match_cooldown": AUTO_MATCH_COOLDOWN}) # guild_id -> GuildConfig
+guilds = {} # guild_id -> GuildData: that guild's offers, wishlists and their indexes
+offer_guilds = {} # msg_id -> guild_id of the partition holding the offer
 pending_trade_requests = {} # Dict to store pending trade requests
+item_catalog = ItemCatalog() # Canonical items, aliases and trigram fuzzy lookup
+match_pool = MatchPool(MATCH_WORKERS, MATCH_PROCESS_THRESHOLD) # Worker process/thread for auto-match and wishlist matching
+trade_cycle_users = {} # user_id -> time of their last multi-party trade ticket
+user_cache = UserCache(bot) # Gateway cache -> TTL/LRU cache -> fetch_user
+request_expiry = ExpiryScheduler(REQUEST_TTL, lambda msg_ids: expire_trade_requests(msg_ids))
+dm_dispatcher = DMDispatcher(user_cache.get, workers=DM_WORKERS, max_queue=DM_QUEUE_SIZE)
 
 # --- Utility Functions ---
 
-async def check_auto_matches(new_user, new_offer, new_wants, guild):
-    """Check for auto-matches when a new offer is posted"""
-    matches = []
+def guild_data(guild_id):
+    """A guild's partition of offers and wishlists; data saved before multi-guild support belongs to the default guild"""
+    guild_id = guild_id or guild_configs.default_guild_id
+    data = guilds.get(guild_id)
+    if data is None:
+        data = guilds[guild_id] = GuildData(guild_id, item_catalog, SEARCH_CACHE_SIZE, AUTO_MATCH_TOP_K, AUTO_MATCH_COOLDOWN)
+        config = guild_configs.get(guild_id)
+        if config is not None:
+            data.configure(config)
+    return data
+
+def apply_guild_configs(configs):
+    """Config reload hook: push each guild's new matching settings into its partition"""
+    for guild_id, data in list(guilds.items()):
+        if guild_id in configs:
+            data.configure(configs[guild_id])
+
+guild_configs.listeners.append(apply_guild_configs)
+
+def add_trade_offer(msg_id, offer_data, replicated=False):
+    """Store an offer in its guild's partition and index it; replicated changes came from another shard and are not written back"""
+    data = guild_data(offer_data.guild_id)
+    data.add_offer(msg_id, offer_data)
+    offer_guilds[msg_id] = data.guild_id
+    if not replicated:
+        storage.upsert(OFFERS, msg_id, offer_data.to_dict())
+
+def remove_trade_offer(msg_id, guild_id, replicated=False):
+    """Drop an offer and its index entries from the guild's partition"""
+    offer_data = guild_data(guild_id).remove_offer(msg_id)
+    if offer_data is not None:
+        offer_guilds.pop(msg_id, None)
+    if not replicated:
+        storage.delete(OFFERS, msg_id)
+    return offer_data
+
+async def delete_offer_messages(channel, msg_ids):
+    """Delete offer messages with as few REST calls as possible"""
+    # Bulk delete takes up to 100 messages per call but only ones younger than 14 days
+    cutoff = discord.utils.utcnow() - datetime.timedelta(days=14) + datetime.timedelta(minutes=5)
+    recent, old = [], []
+    for msg_id in msg_ids:
+        (recent if discord.utils.snowflake_time(msg_id) > cutoff else old).append(msg_id)
+
+    for start in range(0, len(recent), 100):
+        batch = recent[start:start + 100]
+        try:
+            await channel.delete_messages([discord.Object(id=msg_id) for msg_id in batch])
+        except discord.HTTPException:
+            # e.g. missing Manage Messages; fall back to deleting one by one
+            old.extend(batch)
 
-    for msg_id, existing_offer in trade_offers.items():
-        # Skip if it's the same user
-        if existing_offer['user_id'] == new_user.id:
-            continue
+    semaphore = asyncio.Semaphore(DELETE_CONCURRENCY)
 
-        existing_user_id = existing_offer['user_id']
-        existing_offer_item = existing_offer['offer']
-        existing_wants_item = existing_offer['wants']
-
-        # Calculate match scores
-        perfect_match = False
-        interest_match = False
-        keyword_match = False
-        match_score = 0
-
-        # Perfect match: User A offers what User B wants AND User B offers what User A wants
-        if (new_wants.lower() in existing_offer_item.lower() and 
-            existing_wants_item.lower() in new_offer.lower()):
-            perfect_match = True
-            match_score = 100
-
-        # Interest match: One person wants what the other offers
-        elif new_wants.lower() in existing_offer_item.lower():
-            interest_match = True
-            match_score = 75
-        elif existing_wants_item.lower() in new_offer.lower():
-            interest_match = True
-            match_score = 75
-
-        # Keyword match: Similar items based on common keywords
+    async def delete_one(msg_id):
+        async with semaphore:
+            try:
+                await channel.get_partial_message(msg_id).delete()
+            except discord.HTTPException:
+                pass
+
+    await asyncio.gather(*(delete_one(msg_id) for msg_id in old))
+
+def owns_request(request_data):
+    """True if this process's shards expire the request (its guild's owner)"""
+    return shard_plan.owns_guild(request_data.guild_id or guild_configs.default_guild_id)
+
+def add_trade_request(msg_id, request_data, replicated=False):
+    """Store a pending trade request and schedule its expiry"""
+    pending_trade_requests[msg_id] = request_data
+    if not replicated:
+        storage.upsert(REQUESTS, msg_id, request_data.to_dict())
+    if owns_request(request_data):
+        request_expiry.schedule(msg_id, request_data.timestamp)
+
+def remove_trade_request(msg_id, reason="remove", replicated=False):
+    """Drop a pending trade request"""
+    request_expiry.cancel(msg_id)
+    if not replicated:
+        storage.delete(REQUESTS, msg_id, reason)
+    return pending_trade_requests.pop(msg_id, None)
+
+def set_subscriptions(guild_id, user_id, items, replicated=False):
+    """Replace a user's notification subscriptions in one guild"""
+    data = guild_data(guild_id)
+    items = data.set_subscriptions(user_id, items)
+    if not replicated:
+        storage.upsert(SUBSCRIPTIONS, subscription_key(data.guild_id, user_id), items)
+
+def apply_change(store, key, value):
+    """Mirror one change another shard process wrote; safe to apply twice"""
+    if store == OFFERS:
+        msg_id = int(key)
+        offer_data = None if value is None else Offer.from_dict(value)
+        # A delete carries no value; look up the partition holding the offer
+        holder = guilds[offer_guilds[msg_id]] if msg_id in offer_guilds else None
+        if holder is not None and holder.trade_offers[msg_id] == offer_data:
+            return
+        if holder is not None:
+            remove_trade_offer(msg_id, holder.guild_id, replicated=True)
+        if offer_data is not None:
+            add_trade_offer(msg_id, offer_data, replicated=True)
+    elif store == SUBSCRIPTIONS:
+        guild_id, user_id = parse_subscription_key(key)
+        items = make_subscriptions(value or ())
+        if guild_data(guild_id).notify_subscriptions.get(user_id, ()) != items:
+            set_subscriptions(guild_id, user_id, items, replicated=True)
+    elif store == AUTO_MATCH_ACTIONS:
+        request_data = pending_trade_requests.get(int(key))
+        if request_data is not None and owns_request(request_data):
+            finish_auto_match(int(key), value["action"], value["user_id"])
+    elif value is None:
+        remove_trade_request(int(key), replicated=True)
+    else:
+        add_trade_request(int(key), TradeRequest.from_dict(value), replicated=True)
+
+def match_snapshot(data, msg_ids, poster_id, skipped):
+    """(msg_id, user_id, index entry) of candidate offers, minus the poster and traders in cooldown (added to skipped)"""
+    snapshot = []
+    for msg_id in msg_ids:
+        user_id = data.trade_offers[msg_id].user_id
+        if user_id == poster_id or user_id in skipped:
+            continue
+        if data.match_scorer.cooling_down(user_id):
+            skipped.add(user_id)
         else:
-            keywords = ['sword', 'shield', 'armor', 'weapon', 'rare', 'epic', 'legendary', 'pet', 'mount', 'accessory']
-            new_keywords = [kw for kw in keywords if kw in new_offer.lower() or kw in new_wants.lower()];
-            existing_keywords = [kw for kw in keywords if kw in existing_offer_item.lower() or kw in existing_wants_item.lower()]
-
-            if new_keywords and existing_keywords and any(kw in existing_keywords for kw in new_keywords):
-                keyword_match = True
-                match_score = 50
+            snapshot.append((msg_id, user_id, data.offer_index.entry(msg_id)))
+    return snapshot
 
-        # If we found a match, add it to the list
-        if perfect_match or interest_match or keyword_match:
-            try:
-                existing_user = await bot.fetch_user(existing_user_id)
-                matches.append({
-                    'user': existing_user,
-                    'offer_data': existing_offer,
-                    'match_type': 'Perfect' if perfect_match else 'Interest' if interest_match else 'Keyword',
-                    'score': match_score
-                })
-            except:
-                continue
+async def check_auto_matches(new_user, new_offer, new_wants, guild):
+    """Check for auto-matches when a new offer is posted"""
+    # Only this guild's offers sharing a catalog item or keyword with the new
+    # post can score; the loop only snapshots them, scoring runs in the match pool
+    data = guild_data(guild.id)
+    with match_pool.on_loop():
+        # The offer was indexed when it was posted, so its phrases are already learned and counted
+        new_entry = (item_catalog.items_in(new_offer, learn=False), item_catalog.items_in(new_wants, learn=False),
+                     keywords_in(f"{new_offer} {new_wants}"))
+        # Exact item matches first
+        item_candidates = data.offer_index.match_candidates(new_entry[0], new_entry[1], ())
+        skipped = set()  # Traders in cooldown, counted once however many offers they have
+        snapshot = match_snapshot(data, item_candidates, new_user.id, skipped)
+    # user_id -> (score, msg_id, match type), one offer per trader
+    best = await match_pool.run(len(snapshot), best_per_user, new_entry, snapshot, time.time(), MATCH_RECENCY_HALF_LIFE)
+    data.match_scorer.scored += len(snapshot)
+
+    # Keyword-only matches can't outscore a full top-K of item matches
+    if data.match_scorer.needs_keyword_pass([score for score, _, _ in best.values()]):
+        with match_pool.on_loop():
+            snapshot = match_snapshot(data, data.offer_index.match_candidates((), (), new_entry[2]) - item_candidates, new_user.id, skipped)
+        keyword_best = await match_pool.run(len(snapshot), best_per_user, new_entry, snapshot, time.time(), MATCH_RECENCY_HALF_LIFE)
+        data.match_scorer.scored += len(snapshot)
+        for user_id, candidate in keyword_best.items():
+            if candidate[0] > best.get(user_id, (0,))[0]:
+                best[user_id] = candidate
+
+    with match_pool.on_loop():
+        # Offers removed while the workers were scoring are dropped before they can take a top-K slot
+        best = {user_id: candidate for user_id, candidate in best.items() if candidate[1] in data.trade_offers}
+        matches = [{
+            'user_id': user_id,
+            'offer_data': data.trade_offers[msg_id],
+            'match_type': match_type,
+            'score': score
+        } for user_id, (score, msg_id, match_type) in data.match_scorer.top(best, skipped)]
 
     # Send auto-match notifications if matches found
     if matches:
-        await send_auto_match_notifications(new_user, new_offer, new_wants, matches, guild)
+        send_auto_match_notifications(new_user, new_offer, new_wants, matches, guild)
 
-async def send_auto_match_notifications(new_user, new_offer, new_wants, matches, guild):
-    """Send auto-match notifications to matched users"""
+def send_auto_match_notifications(new_user, new_offer, new_wants, matches, guild):
+    """Queue auto-match notifications to matched users"""
 
     for match in matches:
-        existing_user = match['user']
+        existing_user_id = match['user_id']
         existing_offer_data = match['offer_data']
         match_type = match['match_type']
         match_score = match['score']
@@ -107,7 +326,7 @@ async def send_auto_match_notifications(new_user, new_offer, new_wants, matches,
         embed = discord.Embed(
             title="🎯 Auto-Match Found!",
             description=f"The trading system found a **{match_type} Match** ({match_score}% compatibility) with a new offer!",
-            color=0x27ae60 if match_score == 100 else 0xf39c12 if match_score >= 75 else 0x3498db
+            color=0x27ae60 if match_type == "Perfect" else 0xf39c12 if match_type == "Interest" else 0x3498db
         )
 
         embed.add_field(
@@ -124,7 +343,7 @@ async def send_auto_match_notifications(new_user, new_offer, new_wants, matches,
 
         embed.add_field(
             name="🔄 Trade Comparison",
-            value=f"**Their Offer:** {new_offer}\n**They Want:** {new_wants}\n\n**Your Offer:** {existing_offer_data['offer']}\n**You Want:** {existing_offer_data['wants']}",
+            value=f"**Their Offer:** {new_offer}\n**They Want:** {new_wants}\n\n**Your Offer:** {existing_offer_data.offer}\n**You Want:** {existing_offer_data.wants}",
             inline=False
         )
 
@@ -132,302 +351,878 @@ async def send_auto_match_notifications(new_user, new_offer, new_wants, matches,
         embed.set_footer(text="💼 Baddies Trading Plaza • Auto-Match System", icon_url=guild.icon.url if guild.icon else None)
         embed.timestamp = discord.utils.utcnow()
 
-        # Create auto-match view with accept/decline buttons
-        class AutoMatchView(discord.ui.View):
-            def __init__(self, new_user_obj, new_offer_text, new_wants_text, existing_user_obj, existing_offer_data, guild_obj):
-                super().__init__(timeout=3600)  # 1 hour timeout
-                self.new_user = new_user_obj
-                self.new_offer = new_offer_text
-                self.new_wants = new_wants_text
-                self.existing_user = existing_user_obj
-                self.existing_offer_data = existing_offer_data
-                self.guild = guild_obj
-
-            @discord.ui.button(label="✅ Accept Match", style=discord.ButtonStyle.success)
-            async def accept_match(self, interaction: discord.Interaction, button: discord.ui.Button):
-                if interaction.user.id != self.existing_user.id:
-                    await interaction.response.send_message("❌ Only the matched trader can accept this.", ephemeral=True)
-                    return
+        def build_dm(existing_user, embed=embed):
+            return {"embed": embed, "view": AutoMatchView(existing_user.id)}
 
-                # Send notification to the new user about the accepted match
-                try:
-                    new_user_embed = discord.Embed(
-                        title="🎉 Auto-Match Accepted!",
-                        description=f"Great news! **{self.existing_user.display_name}** accepted your auto-match!",
-                        color=0x27ae60
-                    )
-                    new_user_embed.add_field(
-                        name="📋 Trade Details",
-                        value=f"**Your Offer:** {self.new_offer}\n**You Want:** {self.new_wants}\n\n**Their Offer:** {self.existing_offer_data['offer']}\n**They Want:** {self.existing_offer_data['wants']}",
-                        inline=False
-                    )
-                    new_user_embed.add_field(
-                        name="🎯 Next Steps",
-                        value="A trade ticket will be created automatically for you both to finalize the trade!",
-                        inline=False
-                    )
-                    new_user_embed.set_footer(text="💼 Baddies Trading Plaza • Auto-Match System")
+        async def store_request(dm_msg, existing_user_id=existing_user_id, existing_offer_data=existing_offer_data):
+            # Only a delivered DM starts the cooldown; dropped or failed ones leave the trader matchable
+            guild_data(guild.id).match_scorer.notified(existing_user_id)
+            # Store auto-match request with timestamp for auto-deletion
+            add_trade_request(dm_msg.id, TradeRequest(
+                timestamp=time.time(),
+                channel_id=dm_msg.channel.id,
+                requester_id=new_user.id,
+                original_offerer_id=existing_user_id,
+                requested_offer=new_offer,
+                requested_wants=new_wants,
+                original_offer=existing_offer_data.offer,
+                original_wants=existing_offer_data.wants,
+                is_auto_match=True,
+                guild_id=guild.id
+            ))
+            save_trade_requests()
+
+        # Send auto-match notification via DM in the background
+        dm_dispatcher.enqueue(existing_user_id, build_dm, on_sent=store_request)
+
+def load_guild_data():
+    """Split stored offers and wishlists by guild and build each guild's indexes"""
+    default_guild_id = guild_configs.default_guild_id
+    offers = {}  # guild_id -> {msg_id: Offer}
+    for msg_id, offer_data in storage.load(OFFERS).items():
+        offer_data = Offer.from_dict(offer_data)
+        offers.setdefault(offer_data.guild_id or default_guild_id, {})[int(msg_id)] = offer_data
+    subscriptions = {}  # guild_id -> {user_id: items}
+    for key, items in storage.load(SUBSCRIPTIONS).items():
+        if items:
+            guild_id, user_id = parse_subscription_key(key)
+            subscriptions.setdefault(guild_id or default_guild_id, {})[user_id] = make_subscriptions(items)
+    for guild_id in offers.keys() | subscriptions.keys():
+        guild_data(guild_id).load(offers.get(guild_id, {}), subscriptions.get(guild_id, {}))
+    offer_guilds.clear()
+    offer_guilds.update((msg_id, data.guild_id) for data in guilds.values() for msg_id in data.trade_offers)
+
+def save_trade_offers():
+    """Schedule a coalesced write of pending offer changes"""
+    write_scheduler.mark_dirty(OFFERS)
+
+def save_notifications():
+    """Schedule a coalesced write of pending subscription changes"""
+    write_scheduler.mark_dirty(SUBSCRIPTIONS)
 
-                    await self.new_user.send(embed=new_user_embed)
-                except:
-                    pass
+def load_trade_requests():
+    global pending_trade_requests
+    pending_trade_requests = {int(msg_id): TradeRequest.from_dict(request_data)
+                              for msg_id, request_data in storage.load(REQUESTS).items()}
+    request_expiry.rebuild({msg_id: request_data.timestamp for msg_id, request_data in pending_trade_requests.items()
+                            if owns_request(request_data)})
+
+def load_trade_cycles():
+    global trade_cycle_users
+    if os.path.exists(TRADE_CYCLES_FILE):
+        try:
+            with open(TRADE_CYCLES_FILE, "r") as f:
+                trade_cycle_users = {int(user_id): ts for user_id, ts in json.load(f).items()}
+        except json.JSONDecodeError:
+            print(f"⚠️ {TRADE_CYCLES_FILE} is corrupt, starting without trade cycle history")
+
+def load_all_data():
+    item_catalog.load(ITEM_CATALOG_FILE)
+    guild_configs.reload()
+    if change_feed is not None:
+        # Changes committed from here on are replayed over the loaded data
+        change_feed.mark_loaded()
+    load_guild_data()
+    load_trade_cycles()
+    load_trade_requests()  # Load pending trade requests
 
-                # Create trade ticket automatically
-                category = self.guild.get_channel(1393216235877175447)
-                overwrites = {
-                    self.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                    self.existing_user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-                    self.new_user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-                    self.guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
-                }
-
-                ticket_channel = await self.guild.create_text_channel(
-                    name=f"automatch-{self.new_user.name}-{self.existing_user.name}",
-                    category=category,
-                    overwrites=overwrites
-                )
+def save_trade_requests():
+    """Schedule a coalesced write of pending trade request changes"""
+    write_scheduler.mark_dirty(REQUESTS)
+
+# --- Persistent Views ---
+# Trade buttons are DynamicItems: the custom_id carries the IDs a click needs
+# and the rest is read from the guild's offers / pending_trade_requests, so one
+# registered template per button type serves every message across restarts.
+
+class RequestTradeButton(discord.ui.DynamicItem[discord.ui.Button], template=r"trade:request:(?P<user_id>[0-9]+)"):
+    """"Request a trade" button on a posted offer; user_id is the offerer"""
+
+    def __init__(self, user_id):
+        super().__init__(discord.ui.Button(
+            label="Request a trade",
+            style=discord.ButtonStyle.primary,
+            custom_id=f"trade:request:{user_id}"
+        ))
+        self.user_id = user_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["user_id"]))
+
+    @metrics.timed("button")
+    async def callback(self, button_interaction: discord.Interaction):
+        await button_interaction.response.send_modal(RequestTradeModal(button_interaction.message.id))
+
+class RequestTradeModal(discord.ui.Modal, title="Trade Request"):
+    requested_offer = discord.ui.TextInput(
+        label="Your Offer",
+        placeholder="What are you offering?",
+        required=True
+    )
 
-                ticket_embed = discord.Embed(
-                    title="🤖 Auto-Match Trade Ticket",
-                    description="This ticket was created automatically by the auto-match system!",
-                    color=0x27ae60
-                )
-                ticket_embed.add_field(
-                    name=f"👤 {self.new_user.display_name}'s Offer",
-                    value=f"**Offering:** {self.new_offer}\n**Wants:** {self.new_wants}",
-                    inline=True
-                )
-                ticket_embed.add_field(
-                    name=f"👤 {self.existing_user.display_name}'s Offer", 
-                    value=f"**Offering:** {self.existing_offer_data['offer']}\n**Wants:** {self.existing_offer_data['wants']}",
-                    inline=True
-                )
-                ticket_embed.set_footer(text="💼 Discuss the trade details and finalize your exchange!")
-
-                await ticket_channel.send(
-                    f"🤖 **Auto-Match Trade Ticket**\n\n"
-                    f"Hello {self.new_user.mention} and {self.existing_user.mention}!\n\n"
-                    f"The auto-match system detected you both have compatible trade offers. "
-                    f"Use this private channel to discuss and finalize your trade!",
-                    embed=ticket_embed
-                )
+    def __init__(self, offer_msg_id):
+        super().__init__()
+        self.offer_msg_id = offer_msg_id
 
-                await interaction.response.edit_message(
-                    content="✅ **Auto-match accepted!** A trade ticket has been created automatically.",
-                    embed=None,
-                    view=None
-                )
+    @metrics.timed("modal")
+    async def on_submit(self, modal_interaction: discord.Interaction):
+        requester = modal_interaction.user
+        offer_data = guild_data(modal_interaction.guild.id).trade_offers.get(self.offer_msg_id)
+        if not offer_data:
+            await modal_interaction.response.send_message("❌ This trade offer is no longer available.", ephemeral=True)
+            return
 
-                # Remove the auto-match request from pending
-                msg_id = str(interaction.message.id)
-                if msg_id in pending_trade_requests:
-                    del pending_trade_requests[msg_id]
-                    await save_trade_requests()
+        config = guild_configs.get(modal_interaction.guild.id)
+        requests_channel = config and modal_interaction.guild.get_channel(config.requests_channel_id)
+        if not requests_channel:
+            await modal_interaction.response.send_message("Trading-requests channel not found.", ephemeral=True)
+            return
 
-            @discord.ui.button(label="❌ Decline Match", style=discord.ButtonStyle.danger)
-            async def decline_match(self, interaction: discord.Interaction, button: discord.ui.Button):
-                if interaction.user.id != self.existing_user.id:
-                    await interaction.response.send_message("❌ Only the matched trader can decline this.", ephemeral=True)
-                    return
+        embed_req = discord.Embed(
+            title="🔔 Trade Request Incoming",
+            description="Someone is interested in your trade offer!",
+            color=0xf39c12
+        )
+        embed_req.add_field(name="👤 Requester", value=f"{requester.mention}", inline=True)
+        embed_req.add_field(name="💰 Their Offer", value=f"```{self.requested_offer.value}```", inline=True)
+        embed_req.add_field(name="🔄 Trade Details", value=f"**Your Offer:** {offer_data.offer}\n**You Want:** {offer_data.wants}", inline=False)
+        embed_req.set_author(name=f"{requester.display_name}", icon_url=requester.display_avatar.url)
+        embed_req.set_footer(text="💼 Baddies Trading Plaza • Accept or Decline below", icon_url=modal_interaction.guild.icon.url if modal_interaction.guild.icon else None)
+        embed_req.timestamp = discord.utils.utcnow()
+
+        request_msg = await requests_channel.send(f"<@{offer_data.user_id}> You have a new trade request!", embed=embed_req, view=AcceptDeclineView(offer_data.user_id))
+
+        # Store standard trade request with timestamp for auto-deletion,
+        # keyed by the request message so Accept/Decline can find it
+        add_trade_request(request_msg.id, TradeRequest(
+            timestamp=time.time(),
+            channel_id=requests_channel.id,
+            requester_id=requester.id,
+            original_offerer_id=offer_data.user_id,
+            requested_offer=self.requested_offer.value,
+            original_offer=offer_data.offer,
+            original_wants=offer_data.wants,
+            is_auto_match=False,
+            guild_id=modal_interaction.guild.id
+        ))
+        save_trade_requests()
+        await modal_interaction.response.send_message("Trade request sent!", ephemeral=True)
+
+class TradeRequestButton(discord.ui.DynamicItem[discord.ui.Button], template=r"trade:(?P<action>accept|decline):(?P<offerer_id>[0-9]+)"):
+    """Accept/Decline on a trade request; only the original offerer may press it"""
+
+    def __init__(self, action, original_offerer_id):
+        super().__init__(discord.ui.Button(
+            label="Accept" if action == "accept" else "Decline",
+            style=discord.ButtonStyle.success if action == "accept" else discord.ButtonStyle.danger,
+            custom_id=f"trade:{action}:{original_offerer_id}"
+        ))
+        self.action = action
+        self.original_offerer_id = original_offerer_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["action"], int(match["offerer_id"]))
+
+    @metrics.timed("button", lambda self, interaction: f"TradeRequestButton.{self.action}")
+    async def callback(self, interaction: discord.Interaction):
+        if interaction.user.id != self.original_offerer_id:
+            await interaction.response.send_message(f"Only the original offerer can {self.action}.", ephemeral=True)
+            return
 
-                await interaction.response.edit_message(
-                    content="❌ **Auto-match declined.** No worries, the system will continue looking for other matches!",
-                    embed=None,
-                    view=None
-                )
+        msg_id = interaction.message.id
+        request_data = pending_trade_requests.get(msg_id)
+        if request_data is None:
+            await interaction.response.edit_message(content="⌛ This trade request is no longer available.", view=None)
+            return
 
-                # Remove the auto-match request from pending
-                msg_id = str(interaction.message.id)
-                if msg_id in pending_trade_requests:
-                    del pending_trade_requests[msg_id]
-                    await save_trade_requests()
+        if self.action == "accept":
+            requester = await user_cache.get(request_data.requester_id, interaction.guild)
+            config = guild_configs.get(interaction.guild.id)
+            category = config and interaction.guild.get_channel(config.ticket_category_id)
+            overwrites = {
+                interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                interaction.user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+                requester: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+                interaction.guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
+            }
+            ticket_channel = await interaction.guild.create_text_channel(
+                name=f"trade-{requester.name}-{interaction.user.name}",
+                category=category,
+                overwrites=overwrites
+            )
+
+            await ticket_channel.send(
+                f"Trade ticket created between <@{self.original_offerer_id}> and {requester.mention}.\n"
+                f"Original offer: {request_data.original_offer} - Wants: {request_data.original_wants}\n"
+                f"Requester offer: {request_data.requested_offer}"
+            )
+            await interaction.response.edit_message(content="✅ Trade accepted! Ticket created.", view=None)
+        else:
+            await interaction.response.edit_message(content="❌ Trade request declined.", view=None)
+
+        # Remove the standard trade request from pending
+        remove_trade_request(msg_id)
+        save_trade_requests()
+
+class AcceptDeclineView(discord.ui.View):
+    def __init__(self, original_offerer_id):
+        super().__init__(timeout=None)
+        self.add_item(TradeRequestButton("accept", original_offerer_id))
+        self.add_item(TradeRequestButton("decline", original_offerer_id))
+
+async def open_auto_match_ticket(request_data, existing_user_id):
+    """DM the poster and open the ticket for an accepted auto-match; runs on the process owning the guild"""
+    guild = bot.get_guild(request_data.guild_id or guild_configs.default_guild_id)
+    existing_user = await user_cache.get(existing_user_id, guild)
+    new_user = await user_cache.get(request_data.requester_id, guild)
+    new_offer = request_data.requested_offer
+    new_wants = request_data.requested_wants or ''
+
+    # Send notification to the new user about the accepted match
+    new_user_embed = discord.Embed(
+        title="🎉 Auto-Match Accepted!",
+        description=f"Great news! **{existing_user.display_name}** accepted your auto-match!",
+        color=0x27ae60
+    )
+    new_user_embed.add_field(
+        name="📋 Trade Details",
+        value=f"**Your Offer:** {new_offer}\n**You Want:** {new_wants}\n\n**Their Offer:** {request_data.original_offer}\n**They Want:** {request_data.original_wants}",
+        inline=False
+    )
+    new_user_embed.add_field(
+        name="🎯 Next Steps",
+        value="A trade ticket will be created automatically for you both to finalize the trade!",
+        inline=False
+    )
+    new_user_embed.set_footer(text="💼 Baddies Trading Plaza • Auto-Match System")
+    dm_dispatcher.enqueue(new_user.id, lambda user: {"embed": new_user_embed})
+
+    # Create trade ticket automatically
+    config = guild_configs.get(guild.id)
+    category = config and guild.get_channel(config.ticket_category_id)
+    overwrites = {
+        guild.default_role: discord.PermissionOverwrite(read_messages=False),
+        existing_user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+        new_user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+        guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
+    }
+
+    ticket_channel = await guild.create_text_channel(
+        name=f"automatch-{new_user.name}-{existing_user.name}",
+        category=category,
+        overwrites=overwrites
+    )
 
-            @discord.ui.button(label="💬 Contact Trader", style=discord.ButtonStyle.secondary)
-            async def contact_trader(self, interaction: discord.Interaction, button: discord.ui.Button):
-                if interaction.user.id != self.existing_user.id:
-                    await interaction.response.send_message("❌ Only the matched trader can use this button.", ephemeral=True)
-                    return
+    ticket_embed = discord.Embed(
+        title="🤖 Auto-Match Trade Ticket",
+        description="This ticket was created automatically by the auto-match system!",
+        color=0x27ae60
+    )
+    ticket_embed.add_field(
+        name=f"👤 {new_user.display_name}'s Offer",
+        value=f"**Offering:** {new_offer}\n**Wants:** {new_wants}",
+        inline=True
+    )
+    ticket_embed.add_field(
+        name=f"👤 {existing_user.display_name}'s Offer",
+        value=f"**Offering:** {request_data.original_offer}\n**Wants:** {request_data.original_wants}",
+        inline=True
+    )
+    ticket_embed.set_footer(text="💼 Discuss the trade details and finalize your exchange!")
+
+    await ticket_channel.send(
+        f"🤖 **Auto-Match Trade Ticket**\n\n"
+        f"Hello {new_user.mention} and {existing_user.mention}!\n\n"
+        f"The auto-match system detected you both have compatible trade offers. "
+        f"Use this private channel to discuss and finalize your trade!",
+        embed=ticket_embed
+    )
 
-                contact_embed = discord.Embed(
-                    title="📞 Contact Information",
-                    description=f"You can reach out to **{self.new_user.display_name}** to discuss this trade:",
-                    color=0x3498db
-                )
-                contact_embed.add_field(
-                    name="💬 Direct Message",
-                    value=f"Send a DM to {self.new_user.mention}",
-                    inline=False
-                )
-                contact_embed.add_field(
-                    name="📋 Their Trade Details",
-                    value=f"**Offering:** {self.new_offer}\n**Wants:** {self.new_wants}",
-                    inline=False
-                )
+async def hand_off_auto_match(msg_id, action, user_id):
+    """Pass an auto-match DM click to the process owning the request's guild, over the change feed"""
+    await asyncio.get_running_loop().run_in_executor(
+        None, storage.publish, AUTO_MATCH_ACTIONS, msg_id, {"action": action, "user_id": user_id})
+
+def finish_auto_match(msg_id, action, user_id):
+    """Act on a click another process handed over: drop the request, and open the ticket on accept"""
+    request_data = remove_trade_request(msg_id)
+    save_trade_requests()
+    if request_data is not None and action == "accept":
+        async def open_ticket():
+            try:
+                await open_auto_match_ticket(request_data, user_id)
+            except Exception as e:
+                print(f"❌ Error opening auto-match ticket for request {msg_id}: {e}")
+        asyncio.create_task(open_ticket())
+
+AUTO_MATCH_BUTTONS = {
+    "accept": ("✅ Accept Match", discord.ButtonStyle.success, "accept this"),
+    "decline": ("❌ Decline Match", discord.ButtonStyle.danger, "decline this"),
+    "contact": ("💬 Contact Trader", discord.ButtonStyle.secondary, "use this button")
+}
+
+class AutoMatchButton(discord.ui.DynamicItem[discord.ui.Button], template=r"automatch:(?P<action>accept|decline|contact):(?P<user_id>[0-9]+)"):
+    """Buttons on an auto-match DM; user_id is the matched (existing) trader"""
+
+    def __init__(self, action, existing_user_id):
+        label, style, _ = AUTO_MATCH_BUTTONS[action]
+        super().__init__(discord.ui.Button(label=label, style=style, custom_id=f"automatch:{action}:{existing_user_id}"))
+        self.action = action
+        self.existing_user_id = existing_user_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["action"], int(match["user_id"]))
+
+    @metrics.timed("button", lambda self, interaction: f"AutoMatchButton.{self.action}")
+    async def callback(self, interaction: discord.Interaction):
+        if interaction.user.id != self.existing_user_id:
+            await interaction.response.send_message(f"❌ Only the matched trader can {AUTO_MATCH_BUTTONS[self.action][2]}.", ephemeral=True)
+            return
 
-                await interaction.response.send_message(embed=contact_embed, ephemeral=True)
+        request_data = pending_trade_requests.get(interaction.message.id)
+        if request_data is None:
+            await interaction.response.edit_message(content="⌛ This auto-match has expired.", embed=None, view=None)
+            return
 
-        # Send auto-match notification via DM
-        try:
-            view = AutoMatchView(new_user, new_offer, new_wants, existing_user, existing_offer_data, guild)
-            dm_msg = await existing_user.send(embed=embed, view=view)
+        if self.action == "accept":
+            await self.accept_match(interaction, request_data)
+        elif self.action == "decline":
+            await self.decline_match(interaction, request_data)
+        else:
+            await self.contact_trader(interaction, request_data)
+
+    async def accept_match(self, interaction, request_data):
+        if not owns_request(request_data):
+            # DMs arrive at shard 0; the process running the guild's shard builds the ticket
+            await hand_off_auto_match(interaction.message.id, "accept", interaction.user.id)
+            await interaction.response.edit_message(
+                content="✅ **Auto-match accepted!** A trade ticket is being created automatically.",
+                embed=None,
+                view=None
+            )
+            return
 
-            # Store auto-match request with timestamp for auto-deletion
-            import time
-            pending_trade_requests[str(dm_msg.id)] = {
-                'timestamp': time.time(),
-                'requester_id': new_user.id,
-                'original_offerer_id': existing_user.id,
-                'requested_offer': new_offer,
-                'original_offer': existing_offer_data['offer'],
-                'original_wants': existing_offer_data['wants'],
-                'is_auto_match': True
-            }
-            await save_trade_requests()
-        except:
-            # If DM fails, we could optionally send to a channel instead
-            pass
+        await open_auto_match_ticket(request_data, interaction.user.id)
 
-def load_trade_offers():
-    global trade_offers
-    if os.path.isfile(TRADE_OFFERS_FILE) and os.path.getsize(TRADE_OFFERS_FILE) > 0:
-        try:
-            with open(TRADE_OFFERS_FILE, "r") as f:
-                trade_offers = json.load(f)
-        except json.JSONDecodeError:
-            trade_offers = {}
-    else:
-        trade_offers = {}
+        await interaction.response.edit_message(
+            content="✅ **Auto-match accepted!** A trade ticket has been created automatically.",
+            embed=None,
+            view=None
+        )
 
-async def save_trade_offers():
-    """Async save to prevent blocking"""
-    def _save():
-        with open(TRADE_OFFERS_FILE, "w") as f:
-            json.dump(trade_offers, f, indent=4)
+        # Remove the auto-match request from pending
+        remove_trade_request(interaction.message.id)
+        save_trade_requests()
 
-    # Run in executor to prevent blocking
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _save)
+    async def decline_match(self, interaction, request_data):
+        await interaction.response.edit_message(
+            content="❌ **Auto-match declined.** No worries, the system will continue looking for other matches!",
+            embed=None,
+            view=None
+        )
 
-def load_notifications():
-    global notify_subscriptions
-    if os.path.isfile(NOTIFICATIONS_FILE) and os.path.getsize(NOTIFICATIONS_FILE) > 0:
-        try:
-            with open(NOTIFICATIONS_FILE, "r") as f:
-                data = json.load(f)
-                notify_subscriptions = {int(user_id): set(items) for user_id, items in data.items()}
-        except json.JSONDecodeError:
-            notify_subscriptions = {}
-    else:
-        notify_subscriptions = {}
+        if not owns_request(request_data):
+            await hand_off_auto_match(interaction.message.id, "decline", interaction.user.id)
+            return
 
-async def save_notifications():
-    """Async save to prevent blocking"""
-    def _save():
-        data = {str(user_id): list(items) for user_id, items in notify_subscriptions.items()}
-        with open(NOTIFICATIONS_FILE, "w") as f:
-            json.dump(data, f, indent=4)
+        # Remove the auto-match request from pending
+        remove_trade_request(interaction.message.id)
+        save_trade_requests()
 
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _save)
+    async def contact_trader(self, interaction, request_data):
+        new_user = await user_cache.get(request_data.requester_id)
 
-def load_trade_requests():
-    global pending_trade_requests
-    if os.path.isfile(PENDING_REQUESTS_FILE) and os.path.getsize(PENDING_REQUESTS_FILE) > 0:
-        try:
-            with open(PENDING_REQUESTS_FILE, "r") as f:
-                pending_trade_requests = json.load(f)
-        except json.JSONDecodeError:
-            pending_trade_requests = {}
-    else:
-        pending_trade_requests = {}
+        contact_embed = discord.Embed(
+            title="📞 Contact Information",
+            description=f"You can reach out to **{new_user.display_name}** to discuss this trade:",
+            color=0x3498db
+        )
+        contact_embed.add_field(
+            name="💬 Direct Message",
+            value=f"Send a DM to {new_user.mention}",
+            inline=False
+        )
+        contact_embed.add_field(
+            name="📋 Their Trade Details",
+            value=f"**Offering:** {request_data.requested_offer}\n**Wants:** {request_data.requested_wants or ''}",
+            inline=False
+        )
+
+        await interaction.response.send_message(embed=contact_embed, ephemeral=True)
+
+class AutoMatchView(discord.ui.View):
+    def __init__(self, existing_user_id):
+        super().__init__(timeout=None)
+        for action in AUTO_MATCH_BUTTONS:
+            self.add_item(AutoMatchButton(action, existing_user_id))
+
+# --- Search and Notify ---
+
+def clip(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+def offer_field_value(offer_data):
+    # A field value holds at most 1024 characters
+    return f"💰 **Offering:** ```{clip(offer_data.offer, 450)}```\n🎯 **Wants:** ```{clip(offer_data.wants, 450)}```"
+
+class ResultPages(discord.ui.View):
+    """Previous/next pages over a fixed list of offer IDs.
+
+    The query runs once; render(page_ids, start) builds the embed for the
+    page being shown, so user lookups and fields stay O(page size).
+    """
+
+    def __init__(self, msg_ids, render):
+        super().__init__(timeout=300)
+        self.msg_ids = msg_ids
+        self.render = render
+        self.page = 0
+        self.pages = max(1, -(-len(msg_ids) // RESULTS_PAGE_SIZE))
+
+    async def page_embed(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+        start = self.page * RESULTS_PAGE_SIZE
+        embed = await self.render(self.msg_ids[start:start + RESULTS_PAGE_SIZE], start)
+        if self.pages > 1:
+            embed.set_footer(text=f"{embed.footer.text} • Page {self.page + 1}/{self.pages}", icon_url=embed.footer.icon_url)
+        return embed
+
+    async def send(self, interaction):
+        embed = await self.page_embed()
+        if self.pages > 1:
+            await interaction.response.send_message(embed=embed, view=self, ephemeral=True)
+        else:
+            self.stop()
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    @metrics.timed("button")
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(self.page - 1, 0)
+        await interaction.response.edit_message(embed=await self.page_embed(), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    @metrics.timed("button")
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = min(self.page + 1, self.pages - 1)
+        await interaction.response.edit_message(embed=await self.page_embed(), view=self)
+
+async def add_member_offer_fields(embed, page_ids, guild):
+    """One field per offer on the page, resolving only those offerers"""
+    trade_offers = guild_data(guild.id).trade_offers
+    offers = [trade_offers[msg_id] for msg_id in page_ids if msg_id in trade_offers]
+    users = await asyncio.gather(*(user_cache.get(offer_data.user_id, guild) for offer_data in offers), return_exceptions=True)
+    for offer_data, user in zip(offers, users):
+        name = "Unknown member" if isinstance(user, BaseException) else user.name
+        embed.add_field(name=f"👤 {name}", value=offer_field_value(offer_data), inline=False)
+
+async def search_who_wants(interaction, item):
+    """Reply with the members whose offers want an item, best matches first"""
+    item = item.lower().strip()
+    data = guild_data(interaction.guild.id)
+    msg_ids = data.search_cache.get("wants", item)
+    if msg_ids is None:
+        msg_ids = data.search_cache.put("wants", item, [msg_id for msg_id, score in data.offer_index.search_wants(item)])
+
+    if not msg_ids:
+        await interaction.response.send_message(f"❌ No members are currently looking for **{item}**", ephemeral=True)
+        return
+
+    async def render(page_ids, start):
+        embed = discord.Embed(
+            title=f"🎯 Who Wants **{item}**?",
+            description=f"📊 Found **{len(msg_ids)}** member(s) currently looking for this item:",
+            color=0x27ae60
+        )
+        await add_member_offer_fields(embed, page_ids, interaction.guild)
+        embed.set_footer(text="💼 Baddies Trading Plaza • Contact these members to make a deal!")
+        embed.timestamp = discord.utils.utcnow()
+        return embed
+
+    await ResultPages(msg_ids, render).send(interaction)
+
+async def search_who_has(interaction, item):
+    """Reply with the members offering an item, best matches first"""
+    item = item.lower().strip()
+    data = guild_data(interaction.guild.id)
+    msg_ids = data.search_cache.get("has", item)
+    if msg_ids is None:
+        msg_ids = data.search_cache.put("has", item, [msg_id for msg_id, score in data.offer_index.search_offer(item)])
+
+    if not msg_ids:
+        await interaction.response.send_message(f"❌ No members are currently offering **{item}**", ephemeral=True)
+        return
+
+    async def render(page_ids, start):
+        embed = discord.Embed(
+            title=f"🛍️ Who's Offering **{item}**?",
+            description=f"📊 Found **{len(msg_ids)}** member(s) currently offering this item:",
+            color=0x27ae60
+        )
+        await add_member_offer_fields(embed, page_ids, interaction.guild)
+        embed.set_footer(text="💼 Baddies Trading Plaza • Contact these members to make a deal!")
+        embed.timestamp = discord.utils.utcnow()
+        return embed
+
+    await ResultPages(msg_ids, render).send(interaction)
+
+async def add_notification(interaction, item):
+    """Add an item to the user's wishlist"""
+    item = item.strip()
+    user_id = interaction.user.id
+    data = guild_data(interaction.guild.id)
 
-async def save_trade_requests():
-    """Async save to prevent blocking"""
-    def _save():
-        with open(PENDING_REQUESTS_FILE, "w") as f:
-            json.dump(pending_trade_requests, f, indent=4)
+    user_subs = data.notify_subscriptions.get(user_id, ())
 
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, _save)
+    item_id = item_catalog.resolve(item)
+    if item_id is None:
+        await interaction.response.send_message(f"❌ **{item}** isn't an item name", ephemeral=True)
+        return
+    if item_id in [item_catalog.resolve(existing) for existing in user_subs]:
+        await interaction.response.send_message(f"❌ You're already subscribed to notifications for **{item}**", ephemeral=True)
+        return
+
+    set_subscriptions(interaction.guild.id, user_id, (*user_subs, item))
+    save_notifications()
+
+    embed = discord.Embed(
+        title="✅ Notification Added",
+        description=f"You'll now receive DM notifications when someone offers **{item}**!",
+        color=0x27ae60
+    )
+    embed.add_field(
+        name="📬 Your Notifications",
+        value=f"You're now subscribed to **{len(data.notify_subscriptions[user_id])}** notification(s)",
+        inline=False
+    )
+    embed.set_footer(text="💼 You can remove this anytime using 'Remove Notify'")
+    embed.timestamp = discord.utils.utcnow()
+
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # --- Events ---
 
 @bot.event
 async def on_ready():
-    load_trade_offers()
-    load_notifications()
-    load_trade_requests()  # Load pending trade requests
     print(f"Logged in as {bot.user} (ID: {bot.user.id})")
-    await tree.sync()
-    print("Commands synced.")
 
-    # Clean up old trade offers on startup
-    await cleanup_old_offers()
+    # on_ready fires again after every gateway reconnect; one-time work runs once
+    if "ready" in startup_timings:
+        return
+    startup_timings["ready"] = round(time.perf_counter() - PROCESS_STARTED, 3)
 
-    # Start the background task to delete old requests
+    # Start the background tasks to expire old requests and log stats
     bot.loop.create_task(cleanup_old_trade_requests())
+    bot.loop.create_task(log_stats())
+    bot.loop.create_task(find_trade_cycles())
+    bot.loop.create_task(metrics.sample_loop_lag(LOOP_LAG_INTERVAL))
+    bot.loop.create_task(guild_configs.watch(GUILD_CONFIG_RELOAD_INTERVAL))
+
+    # Start the DM delivery workers and the matching workers
+    dm_dispatcher.start()
+    match_pool.start()
+
+    # Clean up old trade offers in the background; the bot is usable meanwhile
+    bot.loop.create_task(reconcile_offers())
+
+    # Commands are global; one process syncing them is enough. Runs last so a
+    # failed sync can't keep the background work above from starting
+    if shard_plan.primary:
+        started = time.perf_counter()
+        try:
+            await sync_commands()
+            startup_timings["sync"] = round(time.perf_counter() - started, 3)
+        except Exception as e:
+            print(f"❌ Command sync failed, serving the previously synced commands: {e}")
+
+    print(f"⏱️ Startup timings (s): {startup_timings}")
+
+async def sync_commands():
+    """Sync the command tree only when it changed since the last sync"""
+    payload = [command.to_dict(tree) for command in tree.get_commands()]
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    if os.path.isfile(COMMAND_HASH_FILE):
+        with open(COMMAND_HASH_FILE, "r") as f:
+            if f.read().strip() == digest:
+                print("Commands unchanged, skipping sync.")
+                return
+
+    await tree.sync()
+    with open(COMMAND_HASH_FILE, "w") as f:
+        f.write(digest)
+    print("Commands synced.")
+
+async def reconcile_offers():
+    """Run the startup offer reconciliation and report when it finishes"""
+    global reconciliation_complete
+    started = time.perf_counter()
+    # Each guild's offers are reconciled by the process running its shard; the others mirror the result
+    await asyncio.gather(*(cleanup_old_offers(guild_id) for guild_id in guild_configs if shard_plan.owns_guild(guild_id)))
+    reconciliation_complete = True
+    startup_timings["reconcile"] = round(time.perf_counter() - started, 3)
+    print(f"✅ Startup reconciliation finished in {startup_timings['reconcile']}s")
 
 async def cleanup_old_trade_requests():
-    """Remove trade requests that are older than 5 hours"""
+    """Remove trade requests that are older than 5 hours as each one comes due"""
     await bot.wait_until_ready()
-    while not bot.is_closed():
-        try:
-            now = time.time()
-            requests_to_remove = []
-            for msg_id, request_data in pending_trade_requests.items():
-                if 'timestamp' in request_data and (now - request_data['timestamp']) > 5 * 3600:  # 5 hours
-                    requests_to_remove.append(msg_id)
+    await request_expiry.run()
 
-            for msg_id in requests_to_remove:
-                del pending_trade_requests[msg_id]
+async def expire_trade_requests(msg_ids):
+    """Drop expired requests and take the buttons off their messages"""
+    expired = []
+    for msg_id in msg_ids:
+        request_data = remove_trade_request(msg_id, reason="expire")
+        if request_data is not None:
+            expired.append((msg_id, request_data))
 
-            await save_trade_requests()
-
-            if requests_to_remove:
-                print(f"🧹 Cleaned up {len(requests_to_remove)} expired trade requests")
+    if not expired:
+        return
+    save_trade_requests()
+    print(f"🧹 Cleaned up {len(expired)} expired trade requests")
 
-        except Exception as e:
-            print(f"❌ Error during trade request cleanup: {e}")
+    for msg_id, request_data in expired:
+        channel_id = request_data.channel_id
+        if channel_id is None:
+            continue
+        try:
+            message = bot.get_partial_messageable(channel_id).get_partial_message(msg_id)
+            await message.edit(content="⌛ This trade request has expired.", view=None)
+        except discord.HTTPException:
+            pass
 
-        await asyncio.sleep(3600)  # Check every hour
+async def log_stats():
+    """Log subsystem counters every hour"""
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        print(f"📬 DM dispatch stats: {dm_dispatcher.stats()}")
+        print(f"👤 User cache stats: {user_cache.stats()}")
+        print(f"💾 Write scheduler stats: {write_scheduler.stats()}")
+        print(f"🏠 Guild config stats: {guild_configs.stats()}")
+        print(f"🔎 Search cache stats: {search_cache_stats()}")
+        print(f"🤝 Auto-match stats: {combined_stats(lambda data: data.match_scorer.stats())}")
+        print(f"⚙️ Match pool stats: {match_pool.stats()}")
+        if change_feed is not None:
+            print(f"🔀 Change feed stats: {change_feed.stats()}")
+        print(f"⏱️ Latency (count, p50/p95/p99 ms): {metrics.summary()}")
+        await asyncio.sleep(3600)
+
+def combined_stats(stats):
+    """Sum the numeric counters stats(data) returns for every guild partition"""
+    total = {}
+    for data in list(guilds.values()):
+        for key, value in stats(data).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                total[key] = total.get(key, 0) + value
+    return total
+
+def search_cache_stats():
+    total = combined_stats(lambda data: data.search_cache.stats())
+    lookups = total.get("hits", 0) + total.get("misses", 0)
+    total["hit_rate"] = round(total["hits"] / lookups, 3) if lookups else 0
+    return total
+
+def health_stats():
+    """Store sizes, queue depths and cache hit rates for /stats"""
+    return {
+        "ready": reconciliation_complete,
+        "startup_timings": startup_timings,
+        "guilds": {**guild_configs.stats(), "partitions": len(guilds)},
+        "stores": {
+            "trade_offers": sum(len(data.trade_offers) for data in list(guilds.values())),
+            "subscribers": sum(len(data.notify_subscriptions) for data in list(guilds.values())),
+            "pending_requests": len(pending_trade_requests),
+            "catalog_items": len(item_catalog.names),
+            "trade_cycle_users": len(trade_cycle_users),
+        },
+        "queues": {
+            "dm": dm_dispatcher.queue.qsize(),
+            "request_expiry": len(request_expiry),
+            "trade_cycle_dirty_users": sum(len(data.trade_graph.dirty) for data in list(guilds.values())),
+            "dirty_stores": write_scheduler.stats()["dirty"],
+        },
+        "caches": {
+            "search": search_cache_stats(),
+            "users": user_cache.stats(),
+        },
+        "dm": dm_dispatcher.stats(),
+        "auto_match": combined_stats(lambda data: data.match_scorer.stats()),
+        "match_pool": match_pool.stats(),
+        "shards": {**shard_plan.stats(), "change_feed": None if change_feed is None else change_feed.stats()},
+    }
+
+async def find_trade_cycles():
+    """Periodically look for 3- and 4-way trades among users whose offers changed"""
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        await asyncio.sleep(CYCLE_SCAN_INTERVAL)
+        searched = opened = queued = 0
+        # Cycles never cross guilds; each owned guild with changes gets an equal share of the budget
+        pending = [data for guild_id, data in list(guilds.items()) if data.trade_graph.dirty and shard_plan.owns_guild(guild_id)]
+        for data in pending:
+            trade_graph = data.trade_graph
+            started = time.perf_counter()
+            # Users left over when the budget runs out stay queued for the next run
+            while trade_graph.dirty and time.perf_counter() - started < CYCLE_TIME_BUDGET / len(pending):
+                user_id = trade_graph.pop_dirty()
+                searched += 1
+                if time.time() - trade_cycle_users.get(user_id, 0) < CYCLE_COOLDOWN:
+                    continue
+                for cycle in trade_graph.cycles_through(user_id, CYCLE_MAX_EXPANSIONS):
+                    if await open_trade_cycle_ticket(data, cycle):
+                        opened += 1
+                        break
+                await asyncio.sleep(0)
+            queued += len(trade_graph.dirty)
+        if opened:
+            print(f"🔁 Trade cycle search: {searched} user(s) searched, {opened} ticket(s) opened, {queued} queued")
+
+async def open_trade_cycle_ticket(data, cycle):
+    """Open one private ticket in the guild for every trader in a multi-party trade"""
+    now = time.time()
+    user_ids = [giver for giver, _, _ in cycle]
+    # Offers may have changed since the search, and nobody gets two tickets a day
+    if any(now - trade_cycle_users.get(user_id, 0) < CYCLE_COOLDOWN for user_id in user_ids):
+        return False
+    if not all(data.trade_graph.has_edge(giver, item_id, receiver) for giver, item_id, receiver in cycle):
+        return False
+
+    guild = bot.get_guild(data.guild_id)
+    config = guild_configs.get(data.guild_id)
+    if guild is None or config is None:
+        return False
+    members = [guild.get_member(user_id) for user_id in user_ids]
+    if None in members:
+        return False
+
+    overwrites = {
+        guild.default_role: discord.PermissionOverwrite(read_messages=False),
+        guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
+    }
+    for member in members:
+        overwrites[member] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
 
-async def cleanup_old_offers():
-    """Remove trade offers that no longer have valid Discord messages"""
-    global trade_offers
     try:
-        guild = bot.get_guild(1390975139838881823)  # Replace with your guild ID
+        ticket_channel = await guild.create_text_channel(
+            name=f"trade-cycle-{'-'.join(member.name for member in members)}"[:100],
+            category=guild.get_channel(config.ticket_category_id),
+            overwrites=overwrites
+        )
+    except discord.HTTPException as e:
+        print(f"❌ Could not open trade cycle ticket: {e}")
+        return False
+
+    by_id = dict(zip(user_ids, members))
+    ticket_embed = discord.Embed(
+        title=f"🔁 {len(cycle)}-Way Trade Found",
+        description="Nobody here can swap directly, but passing items around the circle gets everyone what they want!",
+        color=0x9b59b6
+    )
+    for giver, item_id, receiver in cycle:
+        ticket_embed.add_field(
+            name=f"👤 {by_id[giver].display_name}",
+            value=f"Gives **{item_catalog.names.get(item_id, item_id)}** to {by_id[receiver].mention}",
+            inline=False
+        )
+    ticket_embed.set_footer(text="💼 Discuss the trade details and finalize your exchange!")
+    await ticket_channel.send(" ".join(member.mention for member in members), embed=ticket_embed)
+
+    for user_id in user_ids:
+        trade_cycle_users[user_id] = now
+    for user_id in [user_id for user_id, ts in trade_cycle_users.items() if now - ts >= CYCLE_COOLDOWN]:
+        del trade_cycle_users[user_id]
+    await asyncio.get_running_loop().run_in_executor(None, write_json_atomic, TRADE_CYCLES_FILE, dict(trade_cycle_users))
+    return True
+
+async def cleanup_old_offers(guild_id):
+    """Remove a guild's trade offers that no longer have valid Discord messages"""
+    try:
+        guild = bot.get_guild(guild_id)
         if not guild:
-            print("Guild not found for cleanup")
+            print(f"Guild {guild_id} not found for cleanup")
             return
 
-        offers_channel = guild.get_channel(1391947187281330206)
+        offers_channel = guild.get_channel(guild_configs.get(guild_id).offers_channel_id)
         if not offers_channel:
-            print("Trading offers channel not found for cleanup")
+            print(f"Trading offers channel of guild {guild_id} not found for cleanup")
             return
 
-        valid_offers = {}
-        cleanup_count = 0
+        started = time.perf_counter()
+        stored_ids = set(guild_data(guild_id).trade_offers)
+        if not stored_ids:
+            print("✅ No trade offers to reconcile")
+            return
 
-        for msg_id, offer_data in trade_offers.items():
-            try:
-                # Try to fetch the message to see if it still exists
-                await offers_channel.fetch_message(int(msg_id))
-                valid_offers[msg_id] = offer_data
-            except discord.NotFound:
-                # Message was deleted, remove from trade offers
+        # Page through channel history (100 messages per request) back to the
+        # oldest stored offer, collecting the IDs that still exist
+        oldest_stored = min(stored_ids)
+        live_ids = set()
+        scanned = 0
+        covered_from = 0  # Every stored ID >= this was inside the scanned window
+        try:
+            async for message in offers_channel.history(limit=RECONCILE_HISTORY_LIMIT):
+                scanned += 1
+                live_ids.add(message.id)
+                covered_from = message.id
+                if message.id <= oldest_stored:
+                    covered_from = 0
+                    break
+            else:
+                if scanned < RECONCILE_HISTORY_LIMIT:
+                    covered_from = 0  # Reached the start of the channel
+        except discord.HTTPException as e:
+            print(f"⚠️ History scan stopped early: {e}")
+            if not scanned:
+                # Nothing was seen, so nothing is known to be gone; check every offer individually
+                covered_from = max(stored_ids) + 1
+
+        orphaned = [msg_id for msg_id in stored_ids if msg_id >= covered_from and msg_id not in live_ids]
+
+        # Offers older than the scanned window are checked one by one, a few at a time
+        outside = [msg_id for msg_id in stored_ids if msg_id < covered_from]
+        semaphore = asyncio.Semaphore(RECONCILE_CONCURRENCY)
+
+        async def check(msg_id):
+            async with semaphore:
+                try:
+                    await offers_channel.fetch_message(msg_id)
+                except discord.NotFound:
+                    # Message was deleted, remove from trade offers
+                    orphaned.append(msg_id)
+                except discord.HTTPException:
+                    # Keep the offer in case of temporary network issues
+                    pass
+
+        await asyncio.gather(*(check(msg_id) for msg_id in outside))
+
+        cleanup_count = 0
+        for msg_id in orphaned:
+            if remove_trade_offer(msg_id, guild_id) is not None:
                 cleanup_count += 1
-            except discord.HTTPException:
-                # Keep the offer in case of temporary network issues
-                valid_offers[msg_id] = offer_data
 
-        # Update trade_offers with only valid entries
-        trade_offers = valid_offers
-        await save_trade_offers()
+        if cleanup_count:
+            save_trade_offers()
+
+        elapsed = time.perf_counter() - started
+        report = {
+            "offers": len(stored_ids),
+            "removed": cleanup_count,
+            "history_scanned": scanned,
+            "fetched": len(outside),
+            "seconds": round(elapsed, 2)
+        }
 
         if cleanup_count > 0:
             print(f"🧹 Cleaned up {cleanup_count} orphaned trade offer(s)")
         else:
             print("✅ All trade offers are valid")
+        print(f"⏱️ Reconciled {len(stored_ids)} offer(s) in {elapsed:.2f}s "
+              f"({scanned} messages scanned, {len(outside)} fetched individually)")
+        return report
 
     except Exception as e:
         print(f"❌ Error during cleanup: {e}")
@@ -436,11 +1231,13 @@ async def cleanup_old_offers():
 
 @bot.command(name="launchembed")
 async def launchembed(ctx):
-    # Check if user has the authorized launch role
-    user_role_ids = [role.id for role in ctx.author.roles]
-    if AUTHORIZED_LAUNCH_ROLE not in user_role_ids:
+    # Check if user has this guild's authorized launch role
+    config = guild_configs.get(ctx.guild.id) if ctx.guild else None
+    user_role_ids = [role.id for role in getattr(ctx.author, "roles", [])]
+    if config is None or config.launch_role_id not in user_role_ids:
         await ctx.send("❌ You are not authorized to use this command.", delete_after=5)
         return
+    data = guild_data(ctx.guild.id)
 
     embed = discord.Embed(
         title="🏪 Trading Plaza Control Panel",
@@ -449,7 +1246,7 @@ async def launchembed(ctx):
     )
     embed.add_field(
         name="📊 Statistics",
-        value=f"```📦 Active Offers: {len(trade_offers)}\n🔔 Notification Users: {len(notify_subscriptions)}```",
+        value=f"```📦 Active Offers: {len(data.trade_offers)}\n🔔 Notification Users: {len(data.notify_subscriptions)}```",
         inline=True
     )
     embed.add_field(
@@ -479,10 +1276,10 @@ async def launchembed(ctx):
                 discord.SelectOption(label="📜 View Notifications", value="view_notifications", description="See your current notification subscriptions")
             ]
         )
+        @metrics.timed("select", lambda self, select_interaction, select: select.values[0])
         async def trading_select(self, select_interaction: discord.Interaction, select: discord.ui.Select):
             # Check if user has the trader role
-            user_role_ids = [role.id for role in select_interaction.user.roles]
-            if TRADER_ROLE not in user_role_ids:
+            if not is_trader(select_interaction.user, select_interaction.guild):
                 await select_interaction.response.send_message("❌ You need the Trader role to use this menu.", ephemeral=True)
                 return
 
@@ -507,9 +1304,11 @@ async def launchembed(ctx):
                         max_length=500
                     )
 
+                    @metrics.timed("modal")
                     async def on_submit(self, modal_interaction: discord.Interaction):
                         # Use the existing offer logic
-                        offers_channel = modal_interaction.guild.get_channel(1391947187281330206)
+                        config = guild_configs.get(modal_interaction.guild.id)
+                        offers_channel = config and modal_interaction.guild.get_channel(config.offers_channel_id)
                         if not offers_channel:
                             await modal_interaction.response.send_message("Trading-offers channel not found.", ephemeral=True)
                             return
@@ -526,7 +1325,8 @@ async def launchembed(ctx):
                             return
 
                         offering_text = "\n".join(offering_parts)
-                        combined_offer = f"{self.weapons_trade.value} {self.skins_trade.value}".strip()
+                        # Comma-join so the catalog sees weapons and skins as separate items
+                        combined_offer = ", ".join(part.strip() for part in (self.weapons_trade.value, self.skins_trade.value) if part.strip())
 
                         embed = discord.Embed(
                             title="🛒 New Trade Offer",
@@ -540,155 +1340,49 @@ async def launchembed(ctx):
                         embed.set_footer(text="💼 Baddies Trading Plaza", icon_url=modal_interaction.guild.icon.url if modal_interaction.guild.icon else None)
                         embed.timestamp = discord.utils.utcnow()
 
-                        class RequestTradeButton(discord.ui.Button):
-                            def __init__(self):
-                                super().__init__(label="Request a trade", style=discord.ButtonStyle.primary)
-
-                            async def callback(self, button_interaction: discord.Interaction):
-                                class RequestTradeModal(discord.ui.Modal, title="Trade Request"):
-                                    requested_offer = discord.ui.TextInput(
-                                        label="Your Offer",
-                                        placeholder="What are you offering?",
-                                        required=True
-                                    )
-
-                                    async def on_submit(self, inner_modal_interaction: discord.Interaction):
-                                        requester = inner_modal_interaction.user
-                                        offer_msg = button_interaction.message
-                                        offer_data = trade_offers.get(str(offer_msg.id))
-                                        if not offer_data:
-                                            await inner_modal_interaction.response.send_message("❌ This trade offer is no longer available.", ephemeral=True)
-                                            return
-
-                                        requests_channel = modal_interaction.guild.get_channel(1393265373750755388)
-                                        if not requests_channel:
-                                            await inner_modal_interaction.response.send_message("Trading-requests channel not found.", ephemeral=True)
-                                            return
-
-                                        embed_req = discord.Embed(
-                                            title="🔔 Trade Request Incoming",
-                                            description="Someone is interested in your trade offer!",
-                                            color=0xf39c12
-                                        )
-                                        embed_req.add_field(name="👤 Requester", value=f"{requester.mention}", inline=True)
-                                        embed_req.add_field(name="💰 Their Offer", value=f"```{self.requested_offer.value}```", inline=True)
-                                        embed_req.add_field(name="🔄 Trade Details", value=f"**Your Offer:** {offer_data['offer']}\n**You Want:** {offer_data['wants']}", inline=False)
-                                        embed_req.set_author(name=f"{requester.display_name}", icon_url=requester.display_avatar.url)
-                                        embed_req.set_footer(text="💼 Baddies Trading Plaza • Accept or Decline below", icon_url=modal_interaction.guild.icon.url if modal_interaction.guild.icon else None)
-                                        embed_req.timestamp = discord.utils.utcnow()
-
-                                        class AcceptDeclineView(discord.ui.View):
-                                            def __init__(self, requested_offer_value):
-                                                super().__init__(timeout=None)
-                                                self.requester = requester
-                                                self.original_offerer_id = offer_data['user_id']
-                                                self.requested_offer_value = requested_offer_value
-
-                                            @discord.ui.button(label="Accept", style=discord.ButtonStyle.success)
-                                            async def accept(self, accept_interaction: discord.Interaction, button: discord.ui.Button):
-                                                if accept_interaction.user.id != self.original_offerer_id:
-                                                    await accept_interaction.response.send_message("Only the original offerer can accept.", ephemeral=True)
-                                                    return
-
-                                                category = accept_interaction.guild.get_channel(1393216235877175447)
-                                                overwrites = {
-                                                    accept_interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                                                    accept_interaction.guild.get_member(self.original_offerer_id): discord.PermissionOverwrite(read_messages=True, send_messages=True),
-                                                    self.requester: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-                                                    accept_interaction.guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
-                                                }
-                                                ticket_channel = await accept_interaction.guild.create_text_channel(
-                                                    name=f"trade-{self.requester.name}-{accept_interaction.user.name}",
-                                                    category=category,
-                                                    overwrites=overwrites
-                                                )
-
-                                                await ticket_channel.send(
-                                                    f"Trade ticket created between <@{self.original_offerer_id}> and {self.requester.mention}.\n"
-                                                    f"Original offer: {offer_data['offer']} - Wants: {offer_data['wants']}\n"
-                                                    f"Requester offer: {self.requested_offer_value}"
-                                                )
-                                                await accept_interaction.response.edit_message(content="✅ Trade accepted! Ticket created.", view=None)
-
-                                                 # Remove the standard trade request from pending
-                                                msg_id = str(accept_interaction.message.id)
-                                                if msg_id in pending_trade_requests:
-                                                    del pending_trade_requests[msg_id]
-                                                    await save_trade_requests()
-
-                                            @discord.ui.button(label="Decline", style=discord.ButtonStyle.danger)
-                                            async def decline(self, decline_interaction: discord.Interaction, button: discord.ui.Button):
-                                                if decline_interaction.user.id != self.original_offerer_id:
-                                                    await decline_interaction.response.send_message("Only the original offerer can decline.", ephemeral=True)
-                                                    return
-                                                await decline_interaction.response.edit_message(content="❌ Trade request declined.", view=None)
-
-                                                 # Remove the standard trade request from pending
-                                                msg_id = str(decline_interaction.message.id)
-                                                if msg_id in pending_trade_requests:
-                                                    del pending_trade_requests[msg_id]
-                                                    await save_trade_requests()
-
-                                        await requests_channel.send(f"<@{offer_data['user_id']}> You have a new trade request!", embed=embed_req, view=AcceptDeclineView(self.requested_offer.value))
-
-                                        # Store standard trade request with timestamp for auto-deletion
-                                        import time
-                                        pending_trade_requests[str(button_interaction.message.id)] = {
-                                            'timestamp': time.time(),
-                                            'requester_id': requester.id,
-                                            'original_offerer_id': offer_data['user_id'],
-                                            'requested_offer': self.requested_offer.value,
-                                            'original_offer': offer_data['offer'],
-                                            'original_wants': offer_data['wants'],
-                                            'is_auto_match': False
-                                        }
-                                        await save_trade_requests()
-                                        await inner_modal_interaction.response.send_message("Trade request sent!", ephemeral=True)
-
-                        view = discord.ui.View()
-                        view.add_item(RequestTradeButton())
+                        view = discord.ui.View(timeout=None)
+                        view.add_item(RequestTradeButton(modal_interaction.user.id))
 
                         msg = await offers_channel.send(embed=embed, view=view)
-                        trade_offers[str(msg.id)] = {
-                            "user_id": modal_interaction.user.id,
-                            "offer": combined_offer,
-                            "wants": self.looking_for.value
-                        }
-                        await save_trade_offers()
+                        add_trade_offer(msg.id, Offer(
+                            user_id=modal_interaction.user.id,
+                            offer=combined_offer,
+                            wants=self.looking_for.value,
+                            guild_id=modal_interaction.guild.id
+                        ))
+                        save_trade_offers()
+
+                        # Respond before matching; DMs are delivered by the background dispatcher
+                        await modal_interaction.response.send_message(f"✅ Your trade offer was posted in {offers_channel.mention}", ephemeral=True)
 
                         # Check for auto-matches with existing offers
                         await check_auto_matches(modal_interaction.user, combined_offer, self.looking_for.value, modal_interaction.guild)
 
-                        # Check for notification matches
-                        offer_lower = combined_offer.lower()
-                        for user_id, subscribed_items in notify_subscriptions.items():
+                        # Notify everyone in this guild subscribed to one of the offer's catalog items
+                        data = guild_data(modal_interaction.guild.id)
+                        offer_items, _ = data.offer_index.items(msg.id)
+                        with match_pool.on_loop():
+                            postings = data.wishlist_matcher.snapshot(offer_items)
+                        wishlist_hits = await match_pool.run(sum(map(len, postings)), merge_subscribers, postings)
+                        for user_id, subscribed_item in wishlist_hits.items():
                             if user_id == modal_interaction.user.id:
                                 continue
 
-                            for subscribed_item in subscribed_items:
-                                if subscribed_item.lower() in offer_lower:
-                                    try:
-                                        user = await bot.fetch_user(user_id)
-                                        dm_embed = discord.Embed(
-                                            title="🎉 Wishlist Alert!",
-                                            description=f"Great news! Someone is offering an item from your wishlist!",
-                                            color=0x27ae60
-                                        )
-                                        dm_embed.add_field(name="🛍️ Available Item", value=f"```{offering_text}```", inline=False)
-                                        dm_embed.add_field(name="📝 Your Notification", value=f"```{subscribed_item}```", inline=True)
-                                        dm_embed.add_field(name="👤 Offered By", value=f"{modal_interaction.user.name}", inline=True)
-                                        dm_embed.add_field(name="🎯 They Want", value=f"```{self.looking_for.value}```", inline=True)
-                                        dm_embed.add_field(name="🏢 Server", value=f"{modal_interaction.guild.name}", inline=True)
-                                        dm_embed.set_author(name="Wishlist Notification", icon_url=modal_interaction.user.display_avatar.url)
-                                        dm_embed.set_footer(text="💼 Go to the trading-offers channel to request this trade!")
-                                        dm_embed.timestamp = discord.utils.utcnow()
-
-                                        await user.send(embed=dm_embed)
-                                    except:
-                                        pass
-                                    break
+                            dm_embed = discord.Embed(
+                                title="🎉 Wishlist Alert!",
+                                description=f"Great news! Someone is offering an item from your wishlist!",
+                                color=0x27ae60
+                            )
+                            dm_embed.add_field(name="🛍️ Available Item", value=f"```{offering_text}```", inline=False)
+                            dm_embed.add_field(name="📝 Your Notification", value=f"```{subscribed_item}```", inline=True)
+                            dm_embed.add_field(name="👤 Offered By", value=f"{modal_interaction.user.name}", inline=True)
+                            dm_embed.add_field(name="🎯 They Want", value=f"```{self.looking_for.value}```", inline=True)
+                            dm_embed.add_field(name="🏢 Server", value=f"{modal_interaction.guild.name}", inline=True)
+                            dm_embed.set_author(name="Wishlist Notification", icon_url=modal_interaction.user.display_avatar.url)
+                            dm_embed.set_footer(text="💼 Go to the trading-offers channel to request this trade!")
+                            dm_embed.timestamp = discord.utils.utcnow()
 
-                        await modal_interaction.response.send_message(f"✅ Your trade offer was posted in {offers_channel.mention}", ephemeral=True)
+                            dm_dispatcher.enqueue(user_id, lambda user, dm_embed=dm_embed: {"embed": dm_embed})
 
                 await select_interaction.response.send_modal(CreateOfferModal())
 
@@ -700,27 +1394,30 @@ async def launchembed(ctx):
                         required=True
                     )
 
+                    @metrics.timed("modal")
                     async def on_submit(self, modal_interaction: discord.Interaction):
                         offer = self.offer_item.value.lower().strip()
                         user_id = modal_interaction.user.id
                         removed_offers = []
-                        offers_channel = modal_interaction.guild.get_channel(1391947187281330206)
+                        guild_id = modal_interaction.guild.id
+                        config = guild_configs.get(guild_id)
+                        offers_channel = config and modal_interaction.guild.get_channel(config.offers_channel_id)
                         if not offers_channel:
                             await modal_interaction.response.send_message("Trading-offers channel not found.", ephemeral=True)
                             return
 
-                        for msg_id, offer_data in list(trade_offers.items()):
-                            if offer in offer_data.get("offer", "").lower() and offer_data.get('user_id') == user_id:
-                                try:
-                                    msg = await offers_channel.fetch_message(int(msg_id))
-                                    await msg.delete()
-                                    del trade_offers[msg_id]
-                                    removed_offers.append(offer_data['offer'])
-                                except:
-                                    del trade_offers[msg_id]
-                                    removed_offers.append(offer_data['offer'])
+                        # Rank the user's offers by how closely their items match; remove the best ones
+                        offer_index = guild_data(guild_id).offer_index
+                        query_scores = dict(item_catalog.search(offer))
+                        scored = [(max((query_scores.get(item_id, 0) for item_id in offer_index.items(msg_id)[0]), default=0), msg_id)
+                                  for msg_id in offer_index.offers_for_user(user_id)]
+                        best = max((score for score, _ in scored), default=0)
+                        removed_ids = [msg_id for score, msg_id in scored if best and score == best]
+                        for msg_id in removed_ids:
+                            removed_offers.append(remove_trade_offer(msg_id, guild_id).offer)
 
-                        await save_trade_offers()
+                        if removed_ids:
+                            save_trade_offers()
 
                         if removed_offers:
                             embed = discord.Embed(
@@ -742,6 +1439,9 @@ async def launchembed(ctx):
 
                         await modal_interaction.response.send_message(embed=embed, ephemeral=True)
 
+                        # Delete the posted messages after responding; usually one bulk call
+                        await delete_offer_messages(offers_channel, removed_ids)
+
                 await select_interaction.response.send_modal(RemoveOfferModal())
 
             elif select.values[0] == "search_wants":
@@ -752,39 +1452,9 @@ async def launchembed(ctx):
                         required=True
                     )
 
+                    @metrics.timed("modal")
                     async def on_submit(self, modal_interaction: discord.Interaction):
-                        item = self.item_name.value.lower().strip()
-                        matches = []
-
-                        for msg_id, offer_data in trade_offers.items():
-                            if item.lower() in offer_data.get("wants", "").lower():
-                                try:
-                                    user = await bot.fetch_user(offer_data['user_id'])
-                                    matches.append((user, offer_data))
-                                except:
-                                    continue
-
-                        if not matches:
-                            await modal_interaction.response.send_message(f"❌ No members are currently looking for **{item}**", ephemeral=True)
-                            return
-
-                        embed = discord.Embed(
-                            title=f"🎯 Who Wants **{item}**?",
-                            description=f"📊 Found **{len(matches)}** member(s) currently looking for this item:",
-                            color=0x27ae60
-                        )
-
-                        for user, offer_data in matches:
-                            embed.add_field(
-                                name=f"👤 {user.name}",
-                                value=f"💰 **Offering:** ```{offer_data['offer']}```\n🎯 **Wants:** ```{offer_data['wants']}```",
-                                inline=False
-                            )
-
-                        embed.set_footer(text="💼 Baddies Trading Plaza • Contact these members to make a deal!")
-                        embed.timestamp = discord.utils.utcnow()
-
-                        await modal_interaction.response.send_message(embed=embed, ephemeral=True)
+                        await search_who_wants(modal_interaction, self.item_name.value)
 
                 await select_interaction.response.send_modal(SearchWantsModal())
 
@@ -796,72 +1466,39 @@ async def launchembed(ctx):
                         required=True
                     )
 
+                    @metrics.timed("modal")
                     async def on_submit(self, modal_interaction: discord.Interaction):
-                        item = self.item_name.value.lower().strip()
-                        matches = []
-
-                        for msg_id, offer_data in trade_offers.items():
-                            if item.lower() in offer_data.get("offer", "").lower():
-                                try:
-                                    user = await bot.fetch_user(offer_data['user_id'])
-                                    matches.append((user, offer_data))
-                                except:
-                                    continue
-
-                        if not matches:
-                            await modal_interaction.response.send_message(f"❌ No members are currently offering **{item}**", ephemeral=True)
-                            return
-
-                        embed = discord.Embed(
-                            title=f"🛍️ Who's Offering **{item}**?",
-                            description=f"📊 Found **{len(matches)}** member(s) currently offering this item:",
-                            color=0x27ae60
-                        )
-
-                        for user, offer_data in matches:
-                            embed.add_field(
-                                name=f"👤 {user.name}",
-                                value=f"💰 **Offering:** ```{offer_data['offer']}```\n🎯 **Wants:** ```{offer_data['wants']}```",
-                                inline=False
-                            )
-
-                        embed.set_footer(text="💼 Baddies Trading Plaza • Contact these members to make a deal!")
-                        embed.timestamp = discord.utils.utcnow()
-
-                        await modal_interaction.response.send_message(embed=embed, ephemeral=True)
+                        await search_who_has(modal_interaction, self.item_name.value)
 
                 await select_interaction.response.send_modal(SearchHasModal())
 
             elif select.values[0] == "view_offers":
-                user_offers = []
-                for msg_id, offer_data in trade_offers.items():
-                    if offer_data.get('user_id') == select_interaction.user.id:
-                        user_offers.append(offer_data)
+                data = guild_data(select_interaction.guild.id)
+                msg_ids = data.offer_index.offers_for_user(select_interaction.user.id)
 
-                if not user_offers:
+                if not msg_ids:
                     await select_interaction.response.send_message("❌ You don't have any active trade offers.", ephemeral=True)
                     return
 
-                embed = discord.Embed(
-                    title="📋 Your Active Trade Offers",
-                    description=f"You have **{len(user_offers)}** active offer(s):",
-                    color=0x3498db
-                )
-
-                for i, offer_data in enumerate(user_offers, 1):
-                    embed.add_field(
-                        name=f"🛒 Offer #{i}",
-                        value=f"💰 **Offering:** ```{offer_data['offer']}```\n🎯 **Wants:** ```{offer_data['wants']}```",
-                        inline=False
+                async def render(page_ids, start):
+                    embed = discord.Embed(
+                        title="📋 Your Active Trade Offers",
+                        description=f"You have **{len(msg_ids)}** active offer(s):",
+                        color=0x3498db
                     )
 
-                embed.set_footer(text="💼 Baddies Trading Plaza • Use 'Remove Trade Offer' to delete any of these")
-                embed.timestamp = discord.utils.utcnow()
+                    for i, msg_id in enumerate(page_ids, start + 1):
+                        if msg_id in data.trade_offers:
+                            embed.add_field(name=f"🛒 Offer #{i}", value=offer_field_value(data.trade_offers[msg_id]), inline=False)
 
-                await select_interaction.response.send_message(embed=embed, ephemeral=True)
+                    embed.set_footer(text="💼 Baddies Trading Plaza • Use 'Remove Trade Offer' to delete any of these")
+                    embed.timestamp = discord.utils.utcnow()
+                    return embed
+
+                await ResultPages(msg_ids, render).send(select_interaction)
 
             elif select.values[0] == "view_notifications":
-                user_subs = notify_subscriptions.get(select_interaction.user.id, set())
+                user_subs = guild_data(select_interaction.guild.id).notify_subscriptions.get(select_interaction.user.id, ())
 
                 if not user_subs:
                     await select_interaction.response.send_message("❌ You don't have any notification subscriptions.", ephemeral=True)
@@ -900,7 +1537,7 @@ async def launchembed(ctx):
 
                 help_embed.add_field(
                     name="🔍 Finding Trades",
-                    value="```• 'What Are You Looking For' - Find who has an item\n• 'Is Someone Looking For' - Find who wants an item\n• Use partial names (e.g., 'sword' finds 'Golden Sword')```",
+                    value="```• 'What Are You Looking For' - Find who has an item\n• 'Is Someone Looking For' - Find who wants an item\n• Use partial names (e.g., 'sword' finds 'Golden Sword')\n• /has, /wants and /notify suggest item names as you type```",
                     inline=False
                 )
 
@@ -942,34 +1579,9 @@ async def launchembed(ctx):
                         required=True
                     )
 
+                    @metrics.timed("modal")
                     async def on_submit(self, modal_interaction: discord.Interaction):
-                        item = self.item_name.value.strip()
-                        user_id = modal_interaction.user.id
-
-                        if user_id not in notify_subscriptions:
-                            notify_subscriptions[user_id] = set()
-
-                        if item.lower() in [existing.lower() for existing in notify_subscriptions[user_id]]:
-                            await modal_interaction.response.send_message(f"❌ You're already subscribed to notifications for **{item}**", ephemeral=True)
-                            return
-
-                        notify_subscriptions[user_id].add(item)
-                        await save_notifications()
-
-                        embed = discord.Embed(
-                            title="✅ Notification Added",
-                            description=f"You'll now receive DM notifications when someone offers **{item}**!",
-                            color=0x27ae60
-                        )
-                        embed.add_field(
-                            name="📬 Your Notifications",
-                            value=f"You're now subscribed to **{len(notify_subscriptions[user_id])}** notification(s)",
-                            inline=False
-                        )
-                        embed.set_footer(text="💼 You can remove this anytime using 'Remove Notify'")
-                        embed.timestamp = discord.utils.utcnow()
-
-                        await modal_interaction.response.send_message(embed=embed, ephemeral=True)
+                        await add_notification(modal_interaction, self.item_name.value)
 
                 await select_interaction.response.send_modal(AddNotifyModal())
 
@@ -981,26 +1593,30 @@ async def launchembed(ctx):
                         required=True
                     )
 
+                    @metrics.timed("modal")
                     async def on_submit(self, modal_interaction: discord.Interaction):
                         item = self.item_name.value.strip()
                         user_id = modal_interaction.user.id
+                        notify_subscriptions = guild_data(modal_interaction.guild.id).notify_subscriptions
 
                         if user_id not in notify_subscriptions or not notify_subscriptions[user_id]:
                             await modal_interaction.response.send_message("❌ You don't have any notification subscriptions.", ephemeral=True)
                             return
 
-                        # Find and remove the item (case insensitive)
-                        removed_items = []
-                        for existing_item in list(notify_subscriptions[user_id]):
-                            if item.lower() in existing_item.lower():
-                                notify_subscriptions[user_id].remove(existing_item)
-                                removed_items.append(existing_item)
+                        # Remove the subscriptions whose catalog item matches best
+                        query_scores = dict(item_catalog.search(item))
+                        scored = [(query_scores.get(item_catalog.resolve(existing_item), 0), existing_item)
+                                  for existing_item in notify_subscriptions[user_id]]
+                        best = max(score for score, _ in scored)
+                        removed_items = [existing_item for score, existing_item in scored if best and score == best]
 
                         if not removed_items:
                             await modal_interaction.response.send_message(f"❌ You're not subscribed to notifications for **{item}**", ephemeral=True)
                             return
 
-                        await save_notifications()
+                        set_subscriptions(modal_interaction.guild.id, user_id, [existing_item for existing_item in notify_subscriptions[user_id]
+                                                   if existing_item not in removed_items])
+                        save_notifications()
 
                         embed = discord.Embed(
                             title="✅ Notification Removed",
@@ -1025,11 +1641,63 @@ async def launchembed(ctx):
     embed.set_author(name="Trading Plaza", icon_url=ctx.guild.icon.url if ctx.guild.icon else None)
     await ctx.send(embed=embed, view=TradingControlPanel())
 
+# --- Slash commands ---
+
+@metrics.timed("autocomplete")
+async def item_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggest item names currently used in this guild's offers and wishlists"""
+    if interaction.guild is None:
+        return []
+    completer = guild_data(interaction.guild.id).item_completer
+    return [app_commands.Choice(name=name[:100], value=name[:100]) for name in completer.complete(current)]
+
+def is_trader(member, guild):
+    """True if the member has the guild's configured trader role"""
+    config = guild_configs.get(guild.id) if guild else None
+    return config is not None and config.trader_role_id in [role.id for role in getattr(member, "roles", [])]
+
+async def require_trader(interaction):
+    if is_trader(interaction.user, interaction.guild):
+        return True
+    await interaction.response.send_message("❌ You need the Trader role to use this command.", ephemeral=True)
+    return False
+
+@tree.command(name="has", description="Find members offering an item")
+@app_commands.guild_only()
+@app_commands.describe(item="Item name")
+@app_commands.autocomplete(item=item_autocomplete)
+@metrics.timed("command")
+async def has_command(interaction: discord.Interaction, item: str):
+    if await require_trader(interaction):
+        await search_who_has(interaction, item)
+
+@tree.command(name="wants", description="Find members looking for an item")
+@app_commands.guild_only()
+@app_commands.describe(item="Item name")
+@app_commands.autocomplete(item=item_autocomplete)
+@metrics.timed("command")
+async def wants_command(interaction: discord.Interaction, item: str):
+    if await require_trader(interaction):
+        await search_who_wants(interaction, item)
+
+@tree.command(name="notify", description="Get a DM when someone offers an item")
+@app_commands.guild_only()
+@app_commands.describe(item="Item name")
+@app_commands.autocomplete(item=item_autocomplete)
+@metrics.timed("command")
+async def notify_command(interaction: discord.Interaction, item: str):
+    if await require_trader(interaction):
+        await add_notification(interaction, item)
+
 # --- Run the bot ---
 if __name__ == "__main__":
     if not TOKEN:
         print("❌ Error: DISCORD_TOKEN environment variable not found!")
         print("Please set your Discord bot token in the Secrets tab.")
+    elif SHARD_IDS and not SHARD_COUNT:
+        print("❌ Error: SHARD_IDS needs SHARD_COUNT, the total across every process.")
+    elif SHARD_IDS and STORAGE_BACKEND != "shared":
+        print("❌ Error: running a subset of shards needs STORAGE_BACKEND=shared so processes see each other's writes.")
     else:
         print("🤖 Starting Discord Trading Bot...")
         bot.run(TOKEN)
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+class MatchPool:
+    """Runs pure matching functions off the event loop.
+
+    Jobs over at least process_threshold items go to a process pool, so
+    scoring does not hold the GIL the gateway heartbeat needs. Smaller jobs
+    go to one worker thread, where pickling the snapshot would cost more
+    than the work itself; with workers=0 every job runs in the thread.
+    Time the loop spends building snapshots and merging results is
+    measured with on_loop() and reported by stats().
+    """
+
+    def __init__(self, workers=2, process_threshold=5000):
+        self.worker_count = workers
+        self.process_threshold = process_threshold
+        self.processes = None
+        self.thread = None
+
+        self.thread_jobs = 0
+        self.process_jobs = 0
+        self.fallbacks = 0
+        self.work_times = deque(maxlen=1000)     # seconds per job in a worker
+        self.blocked_times = deque(maxlen=1000)  # seconds per on_loop() section
+
+    def start(self):
+        if self.thread is None:
+            self.thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="match")
+        if self.worker_count and self.processes is None:
+            self.processes = ProcessPoolExecutor(max_workers=self.worker_count)
+
+    def stop(self):
+        for executor in (self.processes, self.thread):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self.processes = self.thread = None
+
+    async def run(self, size, fn, *args):
+        """Run fn(*args) in a worker; size is the number of items in the snapshot"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        if self.processes is not None and size >= self.process_threshold:
+            self.process_jobs += 1
+            try:
+                result = await loop.run_in_executor(self.processes, fn, *args)
+            except BrokenProcessPool:
+                # A worker died; rebuild the pool and use the thread this time
+                self.fallbacks += 1
+                self.processes.shutdown(wait=False, cancel_futures=True)
+                self.processes = ProcessPoolExecutor(max_workers=self.worker_count)
+                result = await loop.run_in_executor(self.thread, fn, *args)
+        else:
+            self.thread_jobs += 1
+            result = await loop.run_in_executor(self.thread, fn, *args)
+        self.work_times.append(time.perf_counter() - started)
+        return result
+
+    def on_loop(self):
+        """Context manager timing a section that has to run on the event loop"""
+        return BlockedTimer(self.blocked_times)
+
+    def stats(self):
+        blocked = sorted(self.blocked_times)
+        work = self.work_times
+        return {
+            "workers": self.worker_count,
+            "thread_jobs": self.thread_jobs,
+            "process_jobs": self.process_jobs,
+            "fallbacks": self.fallbacks,
+            "work_avg_ms": round(sum(work) / len(work) * 1000, 2) if work else 0,
+            "loop_blocked_avg_ms": round(sum(blocked) / len(blocked) * 1000, 3) if blocked else 0,
+            "loop_blocked_max_ms": round(blocked[-1] * 1000, 3) if blocked else 0,
+        }
+
+class BlockedTimer:
+    def __init__(self, times):
+        self.times = times
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.times.append(time.perf_counter() - self.started)
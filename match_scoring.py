@@ -0,0 +1,124 @@
+import heapq
+import time
+
+# Score weights; a fresh offer that trades exactly both ways scores 100
+PERFECT_BASE = 60   # Each side offers something the other wants
+INTEREST_BASE = 40  # Only one side's wants are covered
+COVERAGE_WEIGHT = 20  # Share of the wanted items that is actually on offer
+TOKEN_WEIGHT = 10     # Word overlap between wanted and offered item names ("golden sword" ~ "golden axe")
+KEYWORD_WEIGHT = 10   # Overlap of the MATCH_KEYWORDS both posts mention
+KEYWORD_ONLY_MAX = TOKEN_WEIGHT + KEYWORD_WEIGHT  # Best possible score without an exact item match
+MIN_SCORE = 5  # Weaker matches are not worth a DM
+DISCORD_EPOCH_MS = 1420070400000  # Snowflake timestamps count from here
+
+def overlap(a, b):
+    """Jaccard similarity of two sets"""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+def words(item_ids):
+    return {word for item_id in item_ids for word in item_id.split()}
+
+def score_match(new_entry, existing_entry, age, half_life):
+    """(score 0-100, match type) of an existing offer against a new post; age in seconds"""
+    new_offer, new_wants, new_keywords = new_entry
+    existing_offer, existing_wants, existing_keywords = existing_entry
+
+    they_have = set(new_wants).intersection(existing_offer)
+    they_want = set(new_offer).intersection(existing_wants)
+    if they_have and they_want:
+        match_type, score = "Perfect", PERFECT_BASE
+    elif they_have or they_want:
+        match_type, score = "Interest", INTEREST_BASE
+    else:
+        match_type, score = "Keyword", 0
+
+    coverage = max(len(they_have) / len(new_wants) if new_wants else 0,
+                   len(they_want) / len(existing_wants) if existing_wants else 0)
+    tokens = max(overlap(words(new_wants), words(existing_offer)), overlap(words(new_offer), words(existing_wants)))
+    score += COVERAGE_WEIGHT * coverage + TOKEN_WEIGHT * tokens + KEYWORD_WEIGHT * overlap(new_keywords, existing_keywords)
+
+    # Older offers are less likely to still be available
+    recency = 0.5 ** (max(age, 0) / half_life)
+    score = round(score * (0.7 + 0.3 * recency))
+    return (score if score >= MIN_SCORE else 0), match_type
+
+def best_per_user(new_entry, candidates, now, half_life):
+    """{user_id: (score, msg_id, match type)} of each trader's best offer.
+
+    Pure function over a snapshot of (msg_id, user_id, entry) tuples, so it
+    can run in a worker process; offer age comes from the snowflake msg_id.
+    """
+    best = {}
+    for msg_id, user_id, entry in candidates:
+        age = now - ((msg_id >> 22) + DISCORD_EPOCH_MS) / 1000
+        score, match_type = score_match(new_entry, entry, age, half_life)
+        if score > best.get(user_id, (0,))[0]:
+            best[user_id] = (score, msg_id, match_type)
+    return best
+
+class MatchScorer:
+    """Graded auto-match scoring with a top-K cut and per-recipient cooldowns.
+
+    Entries are (offer item IDs, wants item IDs, keywords) as stored by
+    OfferIndex. Only the top_k best recipients of a new post are notified,
+    and a recipient is not scored again until its cooldown has passed.
+    """
+
+    def __init__(self, top_k=5, cooldown=600):
+        self.top_k = top_k
+        self.cooldown = cooldown
+        self._last_notified = {}  # user_id -> time.monotonic() of the last auto-match DM
+
+        self.scored = 0
+        self.cooling = 0  # Recipients skipped for their cooldown, once per post
+        self.delivered = 0
+        self.cut = 0
+
+    def cooling_down(self, user_id):
+        last = self._last_notified.get(user_id)
+        return last is not None and time.monotonic() - last < self.cooldown
+
+    def needs_keyword_pass(self, best_scores):
+        """False once top_k recipients already beat anything a keyword-only match can score"""
+        if len(best_scores) < self.top_k:
+            return True
+        return heapq.nlargest(self.top_k, best_scores)[-1] < KEYWORD_ONLY_MAX
+
+    def top(self, candidates, skipped=None):
+        """Keep the top_k (score, ...) tuples.
+
+        candidates maps user_id -> (score, ...) with at most one entry per
+        recipient; skipped is the set of recipients the caller already left
+        out for their cooldown, so each is counted once. Cooldowns start in
+        notified(), once a DM has actually been delivered.
+        """
+        # Scoring may have run off the loop while another post notified someone
+        cooling = {user_id for user_id in candidates if self.cooling_down(user_id)}
+        self.cooling += len(cooling.union(skipped or ()))
+        candidates = {user_id: candidate for user_id, candidate in candidates.items() if user_id not in cooling}
+        best = heapq.nlargest(self.top_k, candidates.items(), key=lambda pair: pair[1][0])
+        self.cut += len(candidates) - len(best)
+        return best
+
+    def notified(self, user_id):
+        """Start user_id's cooldown after an auto-match DM reached them"""
+        now = time.monotonic()
+        self._last_notified[user_id] = now
+        self.delivered += 1
+
+        # Forget recipients whose cooldown has passed
+        if len(self._last_notified) > 10 * self.top_k + 1000:
+            self._last_notified = {user_id: last for user_id, last in self._last_notified.items()
+                                   if now - last < self.cooldown}
+
+    def stats(self):
+        return {
+            "scored": self.scored,
+            "cooling_down": self.cooling,
+            "notified": self.delivered,
+            "cut": self.cut,
+            "cooldowns": len(self._last_notified),
+        }
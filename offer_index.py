@@ -0,0 +1,127 @@
+import heapq
+
+# Keywords used by the auto-match "Keyword" tier
+MATCH_KEYWORDS = ['sword', 'shield', 'armor', 'weapon', 'rare', 'epic', 'legendary', 'pet', 'mount', 'accessory']
+
+def keywords_in(text):
+    """Return the auto-match keywords contained in the given text"""
+    text = text.lower()
+    return {kw for kw in MATCH_KEYWORDS if kw in text}
+
+class OfferIndex:
+    """Inverted indexes from catalog item IDs to offer message IDs.
+
+    Kept in step with trade_offers so lookups only touch offers that list
+    an item the query resolves to instead of scanning every stored offer.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.offer_items = {}   # item_id -> set(msg_id), built from the "offer" field
+        self.wants_items = {}   # item_id -> set(msg_id), built from the "wants" field
+        self.keywords = {}      # keyword -> set(msg_id), offer or wants mentions it
+        self.by_user = {}       # user_id -> set(msg_id) of the offers they own
+        self._entries = {}      # msg_id -> (offer items, wants items, keywords)
+        self._owners = {}       # msg_id -> user_id
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, msg_id, offer_data):
+        if msg_id in self._entries:
+            self.remove(msg_id)
+
+        offer_text = offer_data.offer
+        wants_text = offer_data.wants
+        entry = (self.catalog.items_in(offer_text), self.catalog.items_in(wants_text),
+                 keywords_in(f"{offer_text} {wants_text}"))
+        self._entries[msg_id] = entry
+
+        for postings, keys in zip((self.offer_items, self.wants_items, self.keywords), entry):
+            for key in keys:
+                postings.setdefault(key, set()).add(msg_id)
+
+        user_id = offer_data.user_id
+        self._owners[msg_id] = user_id
+        self.by_user.setdefault(user_id, set()).add(msg_id)
+
+    def remove(self, msg_id):
+        entry = self._entries.pop(msg_id, None)
+        if entry is None:
+            return
+
+        for postings, keys in zip((self.offer_items, self.wants_items, self.keywords), entry):
+            for key in keys:
+                ids = postings.get(key)
+                if ids is None:
+                    continue
+                ids.discard(msg_id)
+                if not ids:
+                    del postings[key]
+
+        user_id = self._owners.pop(msg_id)
+        owned = self.by_user[user_id]
+        owned.discard(msg_id)
+        if not owned:
+            del self.by_user[user_id]
+
+    def rebuild(self, offers):
+        self.offer_items.clear()
+        self.wants_items.clear()
+        self.keywords.clear()
+        self.by_user.clear()
+        self._entries.clear()
+        self._owners.clear()
+        for msg_id, offer_data in offers.items():
+            self.add(msg_id, offer_data)
+
+    def entry(self, msg_id):
+        """(offer item IDs, wants item IDs, keywords) of an indexed offer"""
+        return self._entries[msg_id]
+
+    def items(self, msg_id):
+        """(offer item IDs, wants item IDs) of an indexed offer"""
+        offer_items, wants_items, _ = self._entries[msg_id]
+        return offer_items, wants_items
+
+    def _lookup(self, postings, keys):
+        found = set()
+        for key in keys:
+            found |= postings.get(key, set())
+        return found
+
+    def _ranked(self, postings, text, limit):
+        ranked = []
+        seen = set()
+        for item_id, score in self.catalog.search(text):
+            ids = postings.get(item_id)
+            if not ids:
+                continue
+            # Newest offers first within an item; only pull as many as can still be returned
+            newest = sorted(ids, reverse=True) if limit is None else heapq.nlargest(limit - len(ranked) + len(seen & ids), ids)
+            for msg_id in newest:
+                if msg_id not in seen:
+                    seen.add(msg_id)
+                    ranked.append((msg_id, score))
+            if limit is not None and len(ranked) >= limit:
+                return ranked[:limit]
+        return ranked
+
+    def search_offer(self, text, limit=None):
+        """[(msg_id, score)] of offers whose "offer" field lists an item close to text, best first"""
+        return self._ranked(self.offer_items, text, limit)
+
+    def search_wants(self, text, limit=None):
+        """[(msg_id, score)] of offers whose "wants" field lists an item close to text, best first"""
+        return self._ranked(self.wants_items, text, limit)
+
+    def offers_for_user(self, user_id):
+        """Message IDs of every offer owned by user_id, oldest first"""
+        return sorted(self.by_user.get(user_id, ()))
+
+    def match_candidates(self, offer_items, wants_items, keywords):
+        """Offers that could score in any auto-match tier against a new post"""
+        candidates = self._lookup(self.offer_items, wants_items)
+        candidates |= self._lookup(self.wants_items, offer_items)
+        candidates |= self._lookup(self.keywords, keywords)
+        return candidates
@@ -0,0 +1,82 @@
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# Compact in-memory records for the bot's stores. Stores are keyed by integer
+# message IDs and hold these instead of per-entry dicts; the JSON-style dict
+# layout only exists at the persistence boundary (from_dict / to_dict).
+
+@dataclass(slots=True)
+class Offer:
+    user_id: int
+    offer: str
+    wants: str
+    guild_id: Optional[int] = None  # None for offers saved before multi-guild support
+
+    def __post_init__(self):
+        # Many offers repeat the same item text; share one string object
+        self.offer = sys.intern(self.offer)
+        self.wants = sys.intern(self.wants)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(int(data['user_id']), data.get('offer', ''), data.get('wants', ''), data.get('guild_id'))
+
+    def to_dict(self):
+        data = {"user_id": self.user_id, "offer": self.offer, "wants": self.wants}
+        if self.guild_id is not None:
+            data["guild_id"] = self.guild_id
+        return data
+
+@dataclass(slots=True)
+class TradeRequest:
+    timestamp: float
+    requester_id: int
+    original_offerer_id: int
+    requested_offer: str
+    original_offer: str
+    original_wants: str
+    is_auto_match: bool = False
+    channel_id: Optional[int] = None
+    requested_wants: Optional[str] = None
+    guild_id: Optional[int] = None
+
+    def __post_init__(self):
+        self.original_offer = sys.intern(self.original_offer)
+        self.original_wants = sys.intern(self.original_wants)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            timestamp=data.get('timestamp', time.time()),
+            requester_id=int(data['requester_id']),
+            original_offerer_id=int(data['original_offerer_id']),
+            requested_offer=data['requested_offer'],
+            original_offer=data['original_offer'],
+            original_wants=data['original_wants'],
+            is_auto_match=bool(data.get('is_auto_match', False)),
+            channel_id=data.get('channel_id'),
+            requested_wants=data.get('requested_wants'),
+            guild_id=data.get('guild_id')
+        )
+
+    def to_dict(self):
+        data = {
+            'timestamp': self.timestamp,
+            'requester_id': self.requester_id,
+            'original_offerer_id': self.original_offerer_id,
+            'requested_offer': self.requested_offer,
+            'original_offer': self.original_offer,
+            'original_wants': self.original_wants,
+            'is_auto_match': self.is_auto_match
+        }
+        for field in ('channel_id', 'requested_wants', 'guild_id'):
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+def make_subscriptions(items):
+    """Subscriptions for one user: a sorted tuple of interned item strings"""
+    return tuple(sorted({sys.intern(item) for item in items}))
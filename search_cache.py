@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+from item_catalog import SEARCH_SIMILARITY, normalize, trigrams
+
+class SearchCache:
+    """LRU cache of item search results keyed on (kind, normalized query).
+
+    Each entry remembers the catalog items its query resolved to. Adding or
+    removing an offer drops only the entries that depend on one of its items
+    (see invalidate()). An entry whose query would also match a name the
+    catalog learned since it was cached is dropped when it is next read, so
+    a name learned from one guild's post costs nothing in other guilds'
+    caches until they search.
+    """
+
+    def __init__(self, catalog, max_size=1000):
+        self.catalog = catalog
+        self.max_size = max_size
+        self._cache = OrderedDict()  # (kind, query) -> (msg_ids, item_ids, query trigrams, catalog aliases checked)
+        self._dependents = {}        # (kind, item_id) -> set((kind, query))
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, kind, query):
+        key = (kind, normalize(query))
+        entry = self._cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        learned = len(self.catalog.alias_log)
+        if entry[3] < learned:
+            if self._matches_any(entry[2], self.catalog.alias_log[entry[3]:learned]):
+                self._drop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            entry = self._cache[key] = (*entry[:3], learned)
+        self._cache.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, kind, query, msg_ids):
+        key = (kind, normalize(query))
+        self._drop(key)
+        item_ids = [item_id for item_id, score in self.catalog.search(query)]
+        grams = [trigrams(normalize(phrase)) for phrase in self.catalog.phrases(query)]
+        self._cache[key] = (tuple(msg_ids), item_ids, grams, len(self.catalog.alias_log))
+        for item_id in item_ids:
+            self._dependents.setdefault((kind, item_id), set()).add(key)
+        while len(self._cache) > self.max_size:
+            self._drop(next(iter(self._cache)))
+            self.evictions += 1
+        return self._cache[key][0]
+
+    def _drop(self, key):
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return False
+        for item_id in entry[1]:
+            dependents = self._dependents.get((key[0], item_id))
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[(key[0], item_id)]
+        return True
+
+    def invalidate(self, kind, item_ids):
+        """Drop cached searches of this kind that depend on any of the given items"""
+        for item_id in item_ids:
+            for key in list(self._dependents.get((kind, item_id), ())):
+                if self._drop(key):
+                    self.invalidations += 1
+
+    @staticmethod
+    def _matches_any(grams, aliases):
+        """True if a query with these phrase trigrams would match one of the aliases"""
+        for alias in aliases:
+            alias_grams = trigrams(alias)
+            for phrase_grams in grams:
+                shared = len(phrase_grams & alias_grams)
+                if shared and 2 * shared / (len(phrase_grams) + len(alias_grams)) >= SEARCH_SIMILARITY:
+                    return True
+        return False
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+        }
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from collections import deque
+
+def shard_for_guild(guild_id, shard_count):
+    """The shard Discord routes a guild's events to"""
+    return (guild_id >> 22) % shard_count
+
+class ShardPlan:
+    """Which shards this process runs, and so which guilds' data it writes.
+
+    Discord delivers a guild's interactions only to the shard that owns it
+    and DMs only to shard 0, so the process running that shard is the one
+    writer for the guild's offers, requests and subscriptions; every other
+    process only mirrors them. Without shard_ids the process runs every
+    shard and owns everything.
+    """
+
+    def __init__(self, shard_ids=None, shard_count=None):
+        self.shard_ids = None if shard_ids is None else frozenset(shard_ids)
+        self.shard_count = shard_count
+
+    @property
+    def primary(self):
+        """True for the process running shard 0 (DMs, global command sync)"""
+        return self.shard_ids is None or 0 in self.shard_ids
+
+    def owns_guild(self, guild_id):
+        if self.shard_ids is None:
+            return True
+        if guild_id is None:
+            return self.primary
+        return shard_for_guild(guild_id, self.shard_count) in self.shard_ids
+
+    def stats(self):
+        return {
+            "shard_ids": None if self.shard_ids is None else sorted(self.shard_ids),
+            "shard_count": self.shard_count,
+        }
+
+class ChangeFeed:
+    """Mirror the mutations other processes write to a SharedSqliteStorage.
+
+    Polls the storage's change table every interval and calls
+    apply(store, key, value) for each change another origin wrote, in
+    commit order (value None means deleted). Call mark_loaded() before
+    loading the stores: changes after that point are replayed, so apply
+    must be idempotent for rows the load already saw.
+    """
+
+    def __init__(self, storage, apply, interval=0.25, retention=3600, batch=1000):
+        self.storage = storage
+        self.apply = apply
+        self.interval = interval
+        self.retention = retention
+        self.batch = batch
+        self.cursor = 0
+        self._task = None
+        self._last_prune = time.time()
+
+        self.applied = 0
+        self.own = 0
+        self.failures = 0
+        self.lags = deque(maxlen=1000)  # Seconds from a peer's commit to applying it here
+
+    def mark_loaded(self):
+        self.cursor = self.storage.last_change()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def poll(self):
+        """Apply one batch of new changes; returns how many rows were read"""
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(None, self.storage.changes_since, self.cursor, self.batch)
+        now = time.time()
+        for seq, origin, store, key, value, created_at in rows:
+            self.cursor = seq
+            if origin == self.storage.origin:
+                self.own += 1
+                continue
+            try:
+                self.apply(store, key, value)
+                self.applied += 1
+                self.lags.append(max(now - created_at, 0))
+            except Exception as e:
+                self.failures += 1
+                print(f"❌ Error applying {store} change {key}: {e}")
+        return len(rows)
+
+    async def run(self):
+        while True:
+            try:
+                # A full batch means more is waiting; catch up before sleeping
+                while await self.poll() >= self.batch:
+                    pass
+                if time.time() - self._last_prune > self.retention / 10:
+                    self._last_prune = time.time()
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(None, self.storage.prune_changes, time.time() - self.retention)
+            except Exception as e:
+                print(f"❌ Change feed poll failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self):
+        lags = sorted(self.lags)
+        return {
+            "cursor": self.cursor,
+            "applied": self.applied,
+            "own": self.own,
+            "failures": self.failures,
+            "lag_p50_ms": round(lags[len(lags) // 2] * 1000, 1) if lags else None,
+            "lag_p99_ms": round(lags[int(len(lags) * 0.99)] * 1000, 1) if lags else None,
+        }
@@ -0,0 +1,539 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+# Store names shared by every backend
+OFFERS = "offers"
+SUBSCRIPTIONS = "subscriptions"
+REQUESTS = "requests"
+STORES = (OFFERS, SUBSCRIPTIONS, REQUESTS)
+
+def subscription_key(guild_id, user_id):
+    """Storage key of one member's wishlist in one guild"""
+    return f"{guild_id}:{user_id}"
+
+def parse_subscription_key(key):
+    """(guild_id, user_id); guild_id is None for wishlists saved before multi-guild support"""
+    guild_id, _, user_id = str(key).rpartition(":")
+    return (int(guild_id) if guild_id else None), int(user_id)
+
+class Storage(ABC):
+    """Persistence interface for the bot's three stores.
+
+    load() returns the store as a dict in the JSON file layout (string keys,
+    subscriptions as {subscription_key(): [items]}). Mutations are recorded with
+    upsert()/delete() and written out by flush().
+    """
+
+    @abstractmethod
+    def load(self, store):
+        pass
+
+    @abstractmethod
+    def upsert(self, store, key, value):
+        pass
+
+    @abstractmethod
+    def delete(self, store, key, reason="remove"):
+        """Remove a key; reason ("remove" or "expire") is kept by backends that log it"""
+
+    @abstractmethod
+    async def flush(self, store):
+        pass
+
+    def close(self):
+        pass
+
+class JsonStorage(Storage):
+    """One JSON file per store, rewritten in full on every flush"""
+
+    def __init__(self, paths):
+        self.paths = paths  # store -> file path
+        self._data = {store: {} for store in paths}
+
+    def load(self, store):
+        path = self.paths[store]
+        data = {}
+        if os.path.isfile(path) and os.path.getsize(path) > 0:
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+            except json.JSONDecodeError:
+                print(f"⚠️ {path} is corrupt, starting {store} empty")
+        self._data[store] = data
+        return dict(data)
+
+    def upsert(self, store, key, value):
+        self._data[store][str(key)] = list(value) if store == SUBSCRIPTIONS else value
+
+    def delete(self, store, key, reason="remove"):
+        self._data[store].pop(str(key), None)
+
+    async def flush(self, store):
+        # Snapshot on the loop so the executor never sees a dict being mutated
+        snapshot = dict(self._data[store])
+        path = self.paths[store]
+
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, write_json_atomic, path, snapshot)
+
+class JournalStorage(JsonStorage):
+    """Append-only JSONL operation log per store on top of a JSON snapshot.
+
+    Each flush appends only the operations since the last flush, so write
+    cost no longer grows with the store. Once a log passes compact_bytes the
+    current state is written as a new snapshot and the log is truncated.
+    Operations are idempotent puts/deletes, so replaying a log over a newer
+    snapshot (a crash between the two steps) yields the same state.
+    """
+
+    def __init__(self, paths, compact_bytes=1024 * 1024):
+        super().__init__(paths)
+        self.compact_bytes = compact_bytes
+        self._pending = {store: [] for store in paths}
+        self._locks = {store: asyncio.Lock() for store in paths}
+        self.compactions = 0
+
+    def _log_path(self, store):
+        return f"{self.paths[store]}.log"
+
+    def load(self, store):
+        super().load(store)
+        data = self._data[store]
+        log_path = self._log_path(store)
+        replayed = 0
+        if os.path.isfile(log_path):
+            with open(log_path, "rb+") as f:
+                lines = f.readlines()
+                good_offset = 0
+                for number, line in enumerate(lines, 1):
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        if number < len(lines):
+                            # Every line before the last was fsynced whole; skipping
+                            # it would silently drop the ops it holds
+                            raise ValueError(f"{log_path} line {number} is corrupt; fix or remove it before starting")
+                        # A torn final line from a crash mid-append; cut it off
+                        # so later appends don't land on the same line
+                        f.truncate(good_offset)
+                        break
+                    if not line.endswith(b"\n"):
+                        # The crash came right before the newline; end the line
+                        # here or the next append would be joined onto it
+                        f.seek(good_offset + len(line))
+                        f.write(b"\n")
+                        line += b"\n"
+                    if entry["op"] == "add":
+                        data[entry["key"]] = entry["value"]
+                    else:
+                        data.pop(entry["key"], None)
+                    good_offset += len(line)
+                    replayed += 1
+        if replayed:
+            print(f"📜 Replayed {replayed} journal entries for {store}")
+        return dict(data)
+
+    def upsert(self, store, key, value):
+        super().upsert(store, key, value)
+        key = str(key)
+        self._pending[store].append({"op": "add", "key": key, "value": self._data[store][key]})
+
+    def delete(self, store, key, reason="remove"):
+        super().delete(store, key)
+        self._pending[store].append({"op": reason, "key": str(key)})
+
+    async def flush(self, store):
+        async with self._locks[store]:
+            entries, self._pending[store] = self._pending[store], []
+            if not entries:
+                return
+            lines = "".join(json.dumps(entry) + "\n" for entry in entries)
+            loop = asyncio.get_event_loop()
+            try:
+                log_size = await loop.run_in_executor(None, self._append, self._log_path(store), lines)
+            except Exception:
+                # Ahead of entries logged meanwhile, so the retry keeps their order
+                self._pending[store][:0] = entries
+                raise
+
+            if log_size >= self.compact_bytes:
+                # Snapshot may include newer, still-pending ops; they are
+                # re-applied harmlessly when the next flush logs them
+                snapshot = dict(self._data[store])
+                await loop.run_in_executor(None, self._compact, store, snapshot)
+                self.compactions += 1
+
+    def _append(self, log_path, lines):
+        with open(log_path, "ab", buffering=0) as f:
+            start = f.tell()
+            try:
+                data = lines.encode()
+                while data:
+                    data = data[f.write(data):]
+                os.fsync(f.fileno())
+            except OSError:
+                # Cut off a partial write; the retry must start on a fresh line
+                # or replay would stop at the torn one
+                os.truncate(log_path, start)
+                raise
+            return f.tell()
+
+    def _compact(self, store, snapshot):
+        write_json_atomic(self.paths[store], snapshot)
+        with open(self._log_path(store), "w"):
+            pass
+
+def write_json_atomic(path, data):
+    """Write a temp file and rename it over path so a crash never leaves a truncated file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class SqliteStorage(Storage):
+    """SQLite (WAL mode) backend with row-level writes"""
+
+    # guild_id 0 holds wishlists saved before multi-guild support
+    SUBSCRIPTIONS_TABLE = """CREATE TABLE IF NOT EXISTS subscriptions (
+            guild_id INTEGER NOT NULL DEFAULT 0,
+            user_id INTEGER NOT NULL,
+            item TEXT NOT NULL,
+            PRIMARY KEY (guild_id, user_id, item)
+        );"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS offers (
+            msg_id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            offer TEXT NOT NULL,
+            wants TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            guild_id INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS offers_user_id ON offers (user_id);
+        CREATE INDEX IF NOT EXISTS offers_created_at ON offers (created_at);
+
+        {subscriptions}
+
+        CREATE TABLE IF NOT EXISTS requests (
+            msg_id TEXT PRIMARY KEY,
+            timestamp REAL NOT NULL,
+            requester_id INTEGER NOT NULL,
+            original_offerer_id INTEGER NOT NULL,
+            requested_offer TEXT NOT NULL,
+            original_offer TEXT NOT NULL,
+            original_wants TEXT NOT NULL,
+            is_auto_match INTEGER NOT NULL,
+            channel_id INTEGER,
+            requested_wants TEXT,
+            guild_id INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS requests_requester_id ON requests (requester_id);
+        CREATE INDEX IF NOT EXISTS requests_original_offerer_id ON requests (original_offerer_id);
+        CREATE INDEX IF NOT EXISTS requests_timestamp ON requests (timestamp);
+    """.format(subscriptions=SUBSCRIPTIONS_TABLE)
+
+    def __init__(self, path):
+        self.path = path
+        self.created = not os.path.exists(path)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate_subscriptions()
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+        self._lock = threading.Lock()
+        self._pending = {store: {} for store in STORES}  # store -> {key: value or None for delete}
+
+    # Optional request columns added after the first release; NULL means unset
+    REQUEST_EXTRA_COLUMNS = (("channel_id", "INTEGER"), ("requested_wants", "TEXT"), ("guild_id", "INTEGER"))
+
+    def _migrate(self):
+        for table, extra_columns in (("requests", self.REQUEST_EXTRA_COLUMNS), ("offers", (("guild_id", "INTEGER"),))):
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in extra_columns:
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        self._conn.commit()
+
+    def _migrate_subscriptions(self):
+        """Move a pre-multi-guild subscriptions table under guild 0 (the default guild)"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(subscriptions)")}
+        if columns and "guild_id" not in columns:
+            # The primary key changes, which ALTER TABLE can't do; rename and copy in one transaction
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("ALTER TABLE subscriptions RENAME TO subscriptions_old")
+                self._conn.execute(self.SUBSCRIPTIONS_TABLE)
+                self._conn.execute("INSERT INTO subscriptions (guild_id, user_id, item) SELECT 0, user_id, item FROM subscriptions_old")
+                self._conn.execute("DROP TABLE subscriptions_old")
+
+    def load(self, store):
+        with self._lock:
+            if store == OFFERS:
+                rows = self._conn.execute("SELECT msg_id, user_id, offer, wants, guild_id FROM offers ORDER BY created_at, CAST(msg_id AS INTEGER)")
+                data = {}
+                for msg_id, user_id, offer, wants, guild_id in rows:
+                    data[msg_id] = {"user_id": user_id, "offer": offer, "wants": wants}
+                    if guild_id is not None:
+                        data[msg_id]["guild_id"] = guild_id
+                return data
+
+            if store == SUBSCRIPTIONS:
+                data = {}
+                for guild_id, user_id, item in self._conn.execute("SELECT guild_id, user_id, item FROM subscriptions"):
+                    key = subscription_key(guild_id, user_id) if guild_id else str(user_id)
+                    data.setdefault(key, []).append(item)
+                return data
+
+            rows = self._conn.execute(
+                "SELECT msg_id, timestamp, requester_id, original_offerer_id, requested_offer, "
+                "original_offer, original_wants, is_auto_match, channel_id, requested_wants, guild_id "
+                "FROM requests ORDER BY timestamp"
+            )
+            data = {}
+            for row in rows:
+                data[row[0]] = {
+                    'timestamp': row[1],
+                    'requester_id': row[2],
+                    'original_offerer_id': row[3],
+                    'requested_offer': row[4],
+                    'original_offer': row[5],
+                    'original_wants': row[6],
+                    'is_auto_match': bool(row[7])
+                }
+                for (column, _), value in zip(self.REQUEST_EXTRA_COLUMNS, row[8:]):
+                    if value is not None:
+                        data[row[0]][column] = value
+            return data
+
+    def upsert(self, store, key, value):
+        self._pending[store][str(key)] = list(value) if store == SUBSCRIPTIONS else dict(value)
+
+    def delete(self, store, key, reason="remove"):
+        self._pending[store][str(key)] = None
+
+    async def flush(self, store):
+        ops, self._pending[store] = self._pending[store], {}
+        if not ops:
+            return
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(None, self._write, store, ops)
+        except Exception:
+            # The transaction rolled back; put the ops back under anything
+            # newer that arrived meanwhile so the retry writes them
+            self._pending[store] = {**ops, **self._pending[store]}
+            raise
+
+    def _write(self, store, ops):
+        with self._lock, self._conn:
+            self._write_rows(store, ops, time.time())
+
+    def _write_rows(self, store, ops, now):
+        """Apply ops inside the caller's transaction"""
+        for key, value in ops.items():
+            if store == OFFERS:
+                if value is None:
+                    self._conn.execute("DELETE FROM offers WHERE msg_id = ?", (key,))
+                else:
+                    self._conn.execute(
+                        "INSERT INTO offers (msg_id, user_id, offer, wants, created_at, guild_id) VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (msg_id) DO UPDATE SET user_id = excluded.user_id, "
+                        "offer = excluded.offer, wants = excluded.wants, guild_id = excluded.guild_id",
+                        (key, value['user_id'], value['offer'], value['wants'], now, value.get('guild_id'))
+                    )
+
+            elif store == SUBSCRIPTIONS:
+                guild_id, user_id = parse_subscription_key(key)
+                guild_id = guild_id or 0
+                self._conn.execute("DELETE FROM subscriptions WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+                if value:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO subscriptions (guild_id, user_id, item) VALUES (?, ?, ?)",
+                        [(guild_id, user_id, item) for item in value]
+                    )
+
+            elif value is None:
+                self._conn.execute("DELETE FROM requests WHERE msg_id = ?", (key,))
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO requests (msg_id, timestamp, requester_id, original_offerer_id, "
+                    "requested_offer, original_offer, original_wants, is_auto_match, channel_id, "
+                    "requested_wants, guild_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, value['timestamp'], value['requester_id'], value['original_offerer_id'],
+                     value['requested_offer'], value['original_offer'], value['original_wants'],
+                     int(value.get('is_auto_match', False)),
+                     *(value.get(column) for column, _ in self.REQUEST_EXTRA_COLUMNS))
+                )
+
+    def import_json(self, paths):
+        """One-shot import of the legacy JSON files into the database"""
+        source = JsonStorage(paths)
+        counts = {}
+        for store in STORES:
+            if store not in paths:
+                continue
+            data = source.load(store)
+            self._write(store, data)
+            counts[store] = len(data)
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class SharedSqliteStorage(SqliteStorage):
+    """SqliteStorage for several bot processes sharing one database, with a change feed.
+
+    Every row a process writes is also appended to a changes table in the
+    same transaction, tagged with the writer's origin, so the feed can
+    never disagree with the rows. Peers poll changes_since() to mirror
+    each other's mutations in memory; on one machine the WAL file stands
+    in for a networked store with pub/sub.
+    """
+
+    CHANGES_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin TEXT NOT NULL,
+            store TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS changes_created_at ON changes (created_at);
+    """
+
+    def __init__(self, path, origin):
+        super().__init__(path)
+        self.origin = origin
+        self._conn.executescript(self.CHANGES_SCHEMA)
+
+    def _write_rows(self, store, ops, now):
+        super()._write_rows(store, ops, now)
+        self._conn.executemany(
+            "INSERT INTO changes (origin, store, key, value, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(self.origin, store, key, None if value is None else json.dumps(value), now)
+             for key, value in ops.items()]
+        )
+
+    def publish(self, store, key, value):
+        """Append a change with no row behind it: a message for the peer that acts on it"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO changes (origin, store, key, value, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self.origin, store, str(key), json.dumps(value), time.time())
+            )
+
+    def last_change(self):
+        """Sequence number of the newest change; take it before load() to start a feed from"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def changes_since(self, seq, limit=1000):
+        """Up to limit (seq, origin, store, key, value or None, created_at) rows after seq, in commit order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, origin, store, key, value, created_at FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, limit)
+            ).fetchall()
+        return [(seq, origin, store, key, None if value is None else json.loads(value), created_at)
+                for seq, origin, store, key, value, created_at in rows]
+
+    def prune_changes(self, before):
+        """Drop changes written before the given UNIX time; returns how many"""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM changes WHERE created_at < ?", (before,)).rowcount
+
+class WriteScheduler:
+    """Coalesce save requests into at most one write per store per window.
+
+    mark_dirty() is cheap and synchronous; the first call for a clean store
+    starts a timer and every mutation that lands before it fires is written
+    by the same flush. Only one flush per store is ever in flight.
+    """
+
+    def __init__(self, storage, window=0.25):
+        self.storage = storage
+        self.window = window
+        self._dirty = set()
+        self._tasks = {}  # store -> pending flush task
+
+        self.requested = 0
+        self.writes = 0
+        self.failures = 0
+
+    def mark_dirty(self, store):
+        self.requested += 1
+        self._dirty.add(store)
+        if store not in self._tasks:
+            self._tasks[store] = asyncio.create_task(self._flush_later(store))
+
+    async def _flush_later(self, store):
+        await asyncio.sleep(self.window)
+        await self._flush(store)
+        del self._tasks[store]
+        # Mutations that arrived while writing get their own window
+        if store in self._dirty:
+            self._tasks[store] = asyncio.create_task(self._flush_later(store))
+
+    async def _flush(self, store):
+        self._dirty.discard(store)
+        try:
+            await self.storage.flush(store)
+            self.writes += 1
+        except Exception as e:
+            self.failures += 1
+            self._dirty.add(store)
+            print(f"❌ Error saving {store}: {e}")
+
+    async def close(self):
+        """Flush every dirty store; call once on shutdown"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        for store in list(self._dirty):
+            await self._flush(store)
+
+    def stats(self):
+        return {
+            "requested": self.requested,
+            "writes": self.writes,
+            "coalesced": max(self.requested - self.writes - len(self._dirty), 0),
+            "failures": self.failures,
+            "dirty": sorted(self._dirty),
+        }
+
+def open_storage(backend, json_paths, database_path, compact_bytes=1024 * 1024, origin=None):
+    """Create the configured storage backend ("json", "journal", "sqlite" or "shared")"""
+    if backend == "journal":
+        return JournalStorage(json_paths, compact_bytes=compact_bytes)
+    if backend in ("sqlite", "shared"):
+        storage = SharedSqliteStorage(database_path, origin) if backend == "shared" else SqliteStorage(database_path)
+        if storage.created and any(os.path.isfile(path) for path in json_paths.values()):
+            counts = storage.import_json(json_paths)
+            print(f"📥 Imported JSON data into {database_path}: {counts}")
+        return storage
+    return JsonStorage(json_paths)
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 5:
+        print("Usage: python storage.py <trade_offers.json> <notifications.json> <pending_requests.json> <database>")
+        sys.exit(1)
+
+    offers_path, notifications_path, requests_path, database_path = sys.argv[1:]
+    db = SqliteStorage(database_path)
+    print(db.import_json({OFFERS: offers_path, SUBSCRIPTIONS: notifications_path, REQUESTS: requests_path}))
+    db.close()
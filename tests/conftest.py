@@ -0,0 +1,23 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.join(REPO, "benchmarks"))
+
+@pytest.fixture(scope="session")
+def main(tmp_path_factory):
+    """main.py imported in a scratch directory; it opens its data files relative to the working directory"""
+    workdir = tmp_path_factory.mktemp("bot")
+    os.makedirs(workdir / "data")
+    shutil.copy(os.path.join(REPO, "item_catalog.json"), workdir)
+    shutil.copy(os.path.join(REPO, "guild_config.json"), workdir)
+    previous = os.getcwd()
+    os.chdir(workdir)
+    import main
+    main.load_all_data()
+    yield main
+    os.chdir(previous)
@@ -0,0 +1,25 @@
+import asyncio
+import threading
+import time
+
+from expiry import ExpiryScheduler
+
+def test_rebuild_from_another_thread_wakes_the_runner():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        expired = loop.create_future()
+
+        async def on_expire(keys):
+            expired.set_result(keys)
+
+        scheduler = ExpiryScheduler(0, on_expire)
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0)
+        # The runner sleeps with no deadline and the loop idles; only the rebuild's wakeup can start it
+        threading.Timer(0.05, scheduler.rebuild, ({"request": time.time()},)).start()
+        try:
+            return await asyncio.wait_for(expired, 0.5)
+        finally:
+            runner.cancel()
+
+    assert asyncio.run(scenario()) == ["request"]
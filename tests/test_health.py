@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+from health_server import HealthServer
+
+class FakeShard:
+    def __init__(self):
+        self.latency = float("nan")
+
+    def is_ws_ratelimited(self):
+        return False
+
+def server(shards):
+    bot = SimpleNamespace(shards=shards, is_closed=lambda: False)
+    return HealthServer(bot, lambda: True, dict, str, heartbeat_timeout=0)
+
+def test_livez_fails_only_for_a_shard_that_lost_its_connection():
+    first, second = FakeShard(), FakeShard()
+    health = server({0: first, 1: second})
+    # Neither has connected yet
+    assert health.gateway()[0]
+
+    first.latency = second.latency = 0.05
+    alive, details = health.gateway()
+    assert alive and details["shards"][0] == {"latency_ms": 50.0, "ws_ratelimited": False, "down_s": None}
+
+    # Reconnecting: no ACK on the new socket yet
+    second.latency = float("inf")
+    alive, details = health.gateway()
+    assert not alive and details["shards"][1]["down_s"] is not None
+
+    second.latency = 0.06
+    assert health.gateway()[0]
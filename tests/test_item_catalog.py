@@ -0,0 +1,53 @@
+from autocomplete import ItemCompleter
+from item_catalog import ItemCatalog
+
+def test_learned_item_takes_its_most_used_spelling():
+    catalog = ItemCatalog()
+    typo = catalog.items_in("Golden Swrod")[0]
+    assert catalog.names[typo] == "Golden Swrod"
+
+    # The right spelling joins the typo's item and takes the name once it is used more
+    assert catalog.items_in("Golden Sword") == (typo,)
+    assert catalog.names[typo] == "Golden Swrod"
+    catalog.items_in("golden sword, Kitty Purse")
+    assert catalog.names[typo] == "Golden Sword"
+    assert catalog.resolve("Golden Swrod") == catalog.resolve("Golden Sword") == typo
+    assert len(catalog) == 2
+
+def test_common_words_break_a_tie():
+    catalog = ItemCatalog()
+    catalog.items_in("Silver Sword, Iron Sword")
+    typo = catalog.items_in("Golden Swrod")[0]
+    catalog.items_in("Golden Sword")
+    assert catalog.names[typo] == "Golden Sword"
+
+def test_seeded_names_stay():
+    catalog = ItemCatalog()
+    item_id = catalog.add_item("Kitty Purse")
+    catalog.items_in("Kity Purse, Kity Purse, Kity Purse")
+    assert catalog.names[item_id] == "Kitty Purse"
+
+def test_completer_follows_a_renamed_item():
+    catalog = ItemCatalog()
+    completer = ItemCompleter()
+    typo = catalog.items_in("Golden Swrod")[0]
+    completer.add(typo, catalog.names[typo])
+    catalog.items_in("Golden Sword")
+    catalog.items_in("Golden Sword")
+    completer.add(typo, catalog.names[typo])
+
+    assert completer.complete("swo") == ["Golden Sword"]
+    assert completer.complete("swr") == []
+    completer.discard(typo)
+    completer.discard(typo)
+    assert completer.complete("gol") == []
+
+def test_search_keeps_only_relevant_items():
+    catalog = ItemCatalog()
+    catalog.items_in("Golden Sword, Golden Staff, Golden Loverboard, Kitty Purse, Iron Purse")
+    golden_sword = catalog.resolve("Golden Sword")
+
+    # Neighbours sharing a word no longer ride along with a named item
+    assert catalog.search("Golden Sword") == [(golden_sword, 1.0)]
+    assert catalog.search("golden swrod") == [(golden_sword, 1.0)]
+    assert {catalog.names[item_id] for item_id, _ in catalog.search("purse")} == {"Kitty Purse", "Iron Purse"}
@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+
+from fake_discord import FakeGuild, FakeREST, snowflake
+from match_scoring import MatchScorer
+from records import Offer
+
+def test_top_counts_each_cooling_recipient_once():
+    scorer = MatchScorer(top_k=1, cooldown=600)
+    assert scorer.top({1: (90,), 2: (80,)}) == [(1, (90,))]
+    scorer.notified(1)
+
+    # Recipient 1 is cooling down; the caller already skipped it while snapshotting
+    assert scorer.top({1: (90,), 2: (80,)}, skipped={1}) == [(2, (80,))]
+    assert scorer.stats()["cooling_down"] == 1
+
+def test_auto_match_counts_a_cooling_trader_once_per_post(main, monkeypatch):
+    guild = FakeGuild(FakeREST(), main.guild_configs.default_guild_id)
+    data = main.guild_data(guild.id)
+    monkeypatch.setattr(main, "send_auto_match_notifications", lambda *args: None)
+    # One trader with three offers the new post matches
+    msg_ids = [snowflake() for _ in range(3)]
+    for msg_id in msg_ids:
+        main.add_trade_offer(msg_id, Offer(77, "Silver", "Gold Bar", guild.id))
+    data.match_scorer._last_notified[77] = float("inf")  # In cooldown
+    before = data.match_scorer.cooling
+
+    asyncio.run(main.check_auto_matches(guild.get_member(88), "Gold Bar", "Silver", guild))
+
+    assert data.match_scorer.cooling - before == 1
+    for msg_id in msg_ids:
+        main.remove_trade_offer(msg_id, guild.id)
+    del data.match_scorer._last_notified[77]
+
+def test_cooldown_starts_only_for_delivered_dms(main, monkeypatch):
+    guild = FakeGuild(FakeREST(), main.guild_configs.default_guild_id)
+    data = main.guild_data(guild.id)
+    queued = []
+    monkeypatch.setattr(main.dm_dispatcher, "enqueue", lambda user_id, build, on_sent=None: queued.append((user_id, on_sent)))
+    msg_ids = [snowflake(), snowflake()]
+    main.add_trade_offer(msg_ids[0], Offer(61, "Silver", "Gold Bar", guild.id))
+    main.add_trade_offer(msg_ids[1], Offer(62, "Silver", "Gold Bar", guild.id))
+
+    async def post_and_deliver_to(user_id):
+        queued.clear()
+        await main.check_auto_matches(guild.get_member(89), "Gold Bar", "Silver", guild)
+        for recipient, on_sent in queued:
+            if recipient == user_id:
+                await on_sent(SimpleNamespace(id=snowflake(), channel=SimpleNamespace(id=snowflake())))
+                main.remove_trade_request(next(reversed(main.pending_trade_requests)))
+        return {recipient for recipient, _ in queued}
+
+    # 62's DM was dropped, so only 61 waits out the cooldown
+    assert asyncio.run(post_and_deliver_to(61)) == {61, 62}
+    assert data.match_scorer.cooling_down(61) and not data.match_scorer.cooling_down(62)
+    assert asyncio.run(post_and_deliver_to(None)) == {62}
+
+    for msg_id in msg_ids:
+        main.remove_trade_offer(msg_id, guild.id)
+    data.match_scorer._last_notified.pop(61, None)
@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from fake_discord import FakeChannel, FakeGuild, FakeREST, snowflake
+from records import Offer
+
+class HistoryChannel(FakeChannel):
+    """Offers channel whose history() yields the live messages newest first, or fails"""
+
+    def __init__(self, rest, channel_id, guild, history_error=None):
+        super().__init__(rest, channel_id, guild)
+        self.history_error = history_error
+
+    async def history(self, limit=None):
+        if self.history_error is not None:
+            raise self.history_error
+        for msg_id in sorted(self.messages, reverse=True)[:limit]:
+            yield SimpleNamespace(id=msg_id)
+
+@pytest.fixture
+def guild(main, monkeypatch):
+    config = main.guild_configs.get(main.guild_configs.default_guild_id)
+    guild = FakeGuild(FakeREST(), config.guild_id)
+    monkeypatch.setattr(main.bot, "get_guild", lambda guild_id: guild if guild_id == guild.id else None)
+    yield guild
+    data = main.guild_data(guild.id)
+    for msg_id in list(data.trade_offers):
+        main.remove_trade_offer(msg_id, guild.id)
+
+def post_offers(main, guild, channel, count, live):
+    msg_ids = []
+    for i in range(count):
+        msg_id = snowflake()
+        main.add_trade_offer(msg_id, Offer(i + 1, "Gold Bar", "Silver", guild.id))
+        if i < live:
+            channel.messages.add(msg_id)
+        msg_ids.append(msg_id)
+    return msg_ids
+
+def add_channel(main, guild, history_error=None):
+    config = main.guild_configs.get(guild.id)
+    channel = guild.channels[config.offers_channel_id] = HistoryChannel(guild.rest, config.offers_channel_id, guild, history_error)
+    return channel
+
+def test_history_scan_removes_deleted_offers(main, guild):
+    channel = add_channel(main, guild)
+    msg_ids = post_offers(main, guild, channel, 5, live=3)
+
+    report = asyncio.run(main.cleanup_old_offers(guild.id))
+
+    assert report["removed"] == 2
+    assert sorted(main.guild_data(guild.id).trade_offers) == msg_ids[:3]
+
+def test_failed_history_scan_falls_back_to_fetching_every_offer(main, guild):
+    forbidden = discord.Forbidden(SimpleNamespace(status=403, reason="Forbidden"), "Missing Access")
+    channel = add_channel(main, guild, history_error=forbidden)
+    msg_ids = post_offers(main, guild, channel, 5, live=4)
+
+    report = asyncio.run(main.cleanup_old_offers(guild.id))
+
+    # Only the offer whose message is really gone goes; the rest survive the failed scan
+    assert report["history_scanned"] == 0
+    assert report["fetched"] == 5
+    assert sorted(main.guild_data(guild.id).trade_offers) == msg_ids[:4]
@@ -0,0 +1,25 @@
+from guild_data import GuildData
+from item_catalog import ItemCatalog
+from records import Offer
+
+def test_learned_alias_drops_matching_queries_on_next_read():
+    catalog = ItemCatalog()
+    catalog.add_item("Kitty Purse")
+    posting, other = GuildData(1, catalog), GuildData(2, catalog)
+    other.search_cache.put("has", "spiked purse", ())
+    other.search_cache.put("has", "loverboard", ())
+
+    # A name learned from one guild's post leaves other guilds' caches alone until they read
+    posting.add_offer(10, Offer(5, "Spiked Purse", "Loverboard", 1))
+    assert len(other.search_cache) == 2
+
+    assert other.search_cache.get("has", "spiked purse") is None
+    assert other.search_cache.get("has", "loverboard") is None
+    assert other.search_cache.stats()["invalidations"] == 2
+
+def test_unrelated_alias_keeps_cached_query():
+    catalog = ItemCatalog()
+    data = GuildData(1, catalog)
+    data.search_cache.put("has", "kitty purse", (7,))
+    catalog.resolve("Golden Sword")
+    assert data.search_cache.get("has", "kitty purse") == (7,)
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from fake_discord import FakeChannel, FakeGuild, FakeInteraction, FakeREST, snowflake
+from records import Offer, TradeRequest
+from sharding import ShardPlan, shard_for_guild
+from storage import SharedSqliteStorage
+
+def test_auto_match_accept_is_handed_to_the_guild_owner(main, monkeypatch, tmp_path):
+    guild_id = main.guild_configs.default_guild_id
+    # Enough shards that the guild isn't on shard 0
+    shard_count = next(count for count in range(2, 64) if shard_for_guild(guild_id, count))
+    guild = FakeGuild(FakeREST(), guild_id, roles=())
+    monkeypatch.setattr(main.bot, "get_guild", lambda requested_id: guild if requested_id == guild_id else None)
+    monkeypatch.setattr(main, "save_trade_requests", lambda: None)
+    shared = SharedSqliteStorage(str(tmp_path / "shared.db"), origin="primary")
+    monkeypatch.setattr(main, "storage", shared)
+
+    existing_user, new_user = guild.get_member(1001), guild.get_member(1002)
+    msg_id = snowflake()
+    main.add_trade_request(msg_id, TradeRequest(time.time(), new_user.id, existing_user.id, "Gold Bar", "Silver", "Gold Bar",
+                                                is_auto_match=True, requested_wants="Silver", guild_id=guild_id), replicated=True)
+
+    async def click_then_apply():
+        # The primary runs shard 0 and receives the DM click, but doesn't own the guild
+        monkeypatch.setattr(main, "shard_plan", ShardPlan([0], shard_count))
+        interaction = FakeInteraction(guild.rest, existing_user, None, message=FakeChannel(guild.rest).get_partial_message(msg_id))
+        await main.AutoMatchButton("accept", existing_user.id).callback(interaction)
+        assert msg_id in main.pending_trade_requests
+        assert not any(name.startswith("automatch-") for name in (channel.name for channel in guild.channels.values()))
+
+        # The owner picks the click up from the change feed and does the work
+        monkeypatch.setattr(main, "shard_plan", ShardPlan([shard_for_guild(guild_id, shard_count)], shard_count))
+        for _, _, store, key, value, _ in shared.changes_since(0):
+            main.apply_change(store, key, value)
+        # Let the ticket task run
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    asyncio.run(click_then_apply())
+    shared.close()
+
+    assert msg_id not in main.pending_trade_requests
+    assert [channel.name for channel in guild.channels.values()] == [f"automatch-{new_user.name}-{existing_user.name}"]
+
+def test_replicated_offer_changes_follow_the_offer_to_its_guild(main):
+    other_guild_id = 4242 << 22
+    msg_id = snowflake()
+    main.apply_change("offers", str(msg_id), Offer(7, "Gold Bar", "Silver", other_guild_id).to_dict())
+    assert main.offer_guilds[msg_id] == other_guild_id
+    assert msg_id in main.guild_data(other_guild_id).trade_offers
+
+    main.apply_change("offers", str(msg_id), None)
+    assert msg_id not in main.offer_guilds
+    assert msg_id not in main.guild_data(other_guild_id).trade_offers
@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+import pytest
+
+from storage import OFFERS, JournalStorage, Storage
+
+def journal(tmp_path):
+    return JournalStorage({OFFERS: str(tmp_path / "offers.json")})
+
+def write_log(tmp_path, text):
+    (tmp_path / "offers.json.log").write_bytes(text.encode())
+
+def add(key):
+    return json.dumps({"op": "add", "key": key, "value": key})
+
+def test_unterminated_final_line_is_kept_and_ended(tmp_path):
+    # Crash after the last entry was written but before its newline
+    write_log(tmp_path, f"{add('1')}\n{add('2')}")
+    storage = journal(tmp_path)
+    assert storage.load(OFFERS) == {"1": "1", "2": "2"}
+
+    for key in ("3", "4"):
+        storage.upsert(OFFERS, key, key)
+    asyncio.run(storage.flush(OFFERS))
+
+    assert journal(tmp_path).load(OFFERS) == {"1": "1", "2": "2", "3": "3", "4": "4"}
+
+def test_torn_final_line_is_cut(tmp_path):
+    write_log(tmp_path, f"{add('1')}\n{add('2')[:10]}")
+    storage = journal(tmp_path)
+    assert storage.load(OFFERS) == {"1": "1"}
+
+    storage.upsert(OFFERS, "3", "3")
+    asyncio.run(storage.flush(OFFERS))
+
+    assert journal(tmp_path).load(OFFERS) == {"1": "1", "3": "3"}
+
+def test_corrupt_line_before_the_end_fails_load(tmp_path):
+    log = f"{add('1')}\n{add('2')[:10]}\n{add('3')}\n"
+    write_log(tmp_path, log)
+
+    with pytest.raises(ValueError, match="line 2"):
+        journal(tmp_path).load(OFFERS)
+    # Nothing after the bad line was discarded
+    assert (tmp_path / "offers.json.log").read_text() == log
+
+def test_incomplete_backend_fails_on_construction():
+    class NoFlush(Storage):
+        def load(self, store):
+            return {}
+
+        def upsert(self, store, key, value):
+            pass
+
+        def delete(self, store, key, reason="remove"):
+            pass
+
+    with pytest.raises(TypeError):
+        NoFlush()
@@ -0,0 +1,26 @@
+import asyncio
+
+from fake_discord import FakeGuild, FakeInteraction, FakeREST
+from guild_data import GuildData
+from item_catalog import ItemCatalog
+
+def test_entries_without_an_item_load_and_update():
+    catalog = ItemCatalog()
+    data = GuildData(1, catalog)
+    # Wishlists saved before item resolution could hold any text
+    data.load({}, {10: ("#1", "Kitty Purse"), 11: ("5",)})
+    assert data.item_completer.complete("kit") == ["Kitty Purse"]
+
+    data.set_subscriptions(10, ("x2", "Loverboard"))
+    data.set_subscriptions(11, ())
+
+    assert data.item_completer.complete("") == ["Loverboard"]
+    assert data.wishlist_matcher.match((catalog.resolve("Loverboard"),)) == {10: "Loverboard"}
+
+def test_notify_rejects_text_without_an_item(main):
+    guild = FakeGuild(FakeREST(), main.guild_configs.default_guild_id)
+    user = guild.get_member(42)
+
+    asyncio.run(main.add_notification(FakeInteraction(guild.rest, user, guild), "x2"))
+
+    assert user.id not in main.guild_data(guild.id).notify_subscriptions
@@ -0,0 +1,11 @@
+from trade_cycles import TradeGraph
+
+def test_four_way_through_a_second_receiver():
+    graph = TradeGraph()
+    graph.add_offer(1, ["ticket"], ["crown"])
+    # 2 gives 1 a crown too, and wants both of 3's items; 4 only wants the third
+    graph.add_offer(2, ["bow", "crown"], ["ticket", "ring", "cape"])
+    graph.add_offer(3, ["ring", "cape", "wand"], ["bow"])
+    graph.add_offer(4, ["crown"], ["wand"])
+
+    assert graph.cycles_through(1) == [[(1, "ticket", 2), (2, "bow", 3), (3, "wand", 4), (4, "crown", 1)]]
@@ -0,0 +1,137 @@
+class BudgetExceeded(Exception):
+    """Stops a cycle search once its work budget or result limit is used up"""
+
+class TradeGraph:
+    """Who-gives-what-to-whom graph over trade_offers, searched for 3- and 4-way trades.
+
+    There is an edge X -> Y when X offers an item Y wants. Edges are never
+    materialized; they are walked through the item postings. Users whose
+    offers changed are queued in `dirty`, and a search from one of them only
+    looks for cycles through that user, so each run does work proportional
+    to what changed. A search gives up after max_expansions postings visits.
+    """
+
+    def __init__(self):
+        self.gives = {}    # user_id -> {item_id: number of their offers listing it}
+        self.wants = {}    # user_id -> {item_id: number of their offers wanting it}
+        self.givers = {}   # item_id -> set(user_id)
+        self.wanters = {}  # item_id -> set(user_id)
+        self.dirty = {}    # user_id -> None; insertion-ordered queue of users to search from
+
+    def _bump(self, by_user, by_item, user_id, item_ids, delta):
+        counts = by_user.setdefault(user_id, {})
+        for item_id in item_ids:
+            count = counts.get(item_id, 0) + delta
+            if count > 0:
+                counts[item_id] = count
+                by_item.setdefault(item_id, set()).add(user_id)
+            else:
+                counts.pop(item_id, None)
+                users = by_item.get(item_id)
+                if users is not None:
+                    users.discard(user_id)
+                    if not users:
+                        del by_item[item_id]
+        if not counts:
+            del by_user[user_id]
+
+    def add_offer(self, user_id, offer_items, wants_items):
+        self._bump(self.gives, self.givers, user_id, offer_items, 1)
+        self._bump(self.wants, self.wanters, user_id, wants_items, 1)
+        # Only new edges can close new cycles, and they all touch this user
+        self.dirty[user_id] = None
+
+    def remove_offer(self, user_id, offer_items, wants_items):
+        self._bump(self.gives, self.givers, user_id, offer_items, -1)
+        self._bump(self.wants, self.wanters, user_id, wants_items, -1)
+
+    def rebuild(self, offers):
+        """Replace the graph from (user_id, offer item IDs, wants item IDs) tuples"""
+        self.gives, self.wants, self.givers, self.wanters, self.dirty = {}, {}, {}, {}, {}
+        for user_id, offer_items, wants_items in offers:
+            self.add_offer(user_id, offer_items, wants_items)
+
+    def pop_dirty(self):
+        user_id = next(iter(self.dirty))
+        del self.dirty[user_id]
+        return user_id
+
+    def has_edge(self, giver, item_id, receiver):
+        return item_id in self.gives.get(giver, ()) and item_id in self.wants.get(receiver, ())
+
+    def cycles_through(self, user_id, max_expansions=50_000, limit=5):
+        """Up to limit 3- and 4-way trades through user_id as lists of (giver, item_id, receiver) legs"""
+        budget = [max_expansions]
+
+        def spend(count=1):
+            budget[0] -= count
+            if budget[0] < 0:
+                raise BudgetExceeded
+
+        cycles = []
+        seen = set()
+
+        def found(legs):
+            users = tuple(giver for giver, _, _ in legs)
+            # Rotate so the same cycle found from another user has one key
+            start = users.index(min(users))
+            key = users[start:] + users[:start]
+            if key not in seen:
+                seen.add(key)
+                cycles.append(legs[start:] + legs[:start])
+                if len(cycles) >= limit:
+                    raise BudgetExceeded
+
+        try:
+            # First leg out of user_id and last leg back into it
+            out1 = {}  # A -> item user_id gives A
+            for item_id in self.gives.get(user_id, ()):
+                wanters = self.wanters.get(item_id, ())
+                spend(len(wanters))
+                for a in wanters:
+                    if a != user_id:
+                        out1.setdefault(a, item_id)
+            in1 = {}   # B -> item B gives user_id
+            for item_id in self.wants.get(user_id, ()):
+                givers = self.givers.get(item_id, ())
+                spend(len(givers))
+                for b in givers:
+                    if b != user_id:
+                        in1.setdefault(b, item_id)
+            if not out1 or not in1:
+                return cycles
+            in1_users = set(in1)
+
+            # 3-way: user_id -> A -> B -> user_id
+            for a, first_item in out1.items():
+                for item_id in self.gives.get(a, ()):
+                    wanters = self.wanters.get(item_id, ())
+                    # Set intersection walks the smaller side
+                    spend(min(len(in1_users), len(wanters)) or 1)
+                    for b in in1_users.intersection(wanters):
+                        if b != a:
+                            found([(user_id, first_item, a), (a, item_id, b), (b, in1[b], user_id)])
+
+            # 4-way: user_id -> A -> C -> B -> user_id, meeting in the middle at C
+            into_b = {}  # C -> [(item C gives B, B)] for two distinct Bs, so one of them differs from any A
+            for b in in1_users:
+                for item_id in self.wants.get(b, ()):
+                    givers = self.givers.get(item_id, ())
+                    spend(len(givers))
+                    for c in givers:
+                        if c != user_id and c != b:
+                            legs = into_b.setdefault(c, [])
+                            if len(legs) < 2 and all(b != other for _, other in legs):
+                                legs.append((item_id, b))
+            for a, first_item in out1.items():
+                for item_id in self.gives.get(a, ()):
+                    wanters = self.wanters.get(item_id, ())
+                    spend(len(wanters))
+                    for c in wanters:
+                        for last_item, b in into_b.get(c, ()):
+                            if c != a and b != a:
+                                found([(user_id, first_item, a), (a, item_id, c), (c, last_item, b), (b, in1[b], user_id)])
+                                break
+        except BudgetExceeded:
+            pass
+        return cycles
@@ -0,0 +1,83 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+class UserCache:
+    """Resolve user IDs to discord.User objects with as few REST calls as possible.
+
+    Lookup order: the gateway cache (bot.get_user / guild.get_member), then a
+    TTL+LRU cache of previously fetched users, then bot.fetch_user. Concurrent
+    lookups for the same ID share a single in-flight fetch.
+    """
+
+    def __init__(self, bot, ttl=600, max_size=5000):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_size = max_size
+        self._cache = OrderedDict()  # user_id -> (expires_at, user)
+        self._inflight = {}          # user_id -> asyncio.Future
+
+        self.gateway_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, user_id, guild=None):
+        user_id = int(user_id)
+
+        user = self.bot.get_user(user_id)
+        if user is None and guild is not None:
+            user = guild.get_member(user_id)
+        if user is not None:
+            self.gateway_hits += 1
+            return user
+
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            expires_at, user = cached
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(user_id)
+                self.hits += 1
+                return user
+            del self._cache[user_id]
+
+        pending = self._inflight.get(user_id)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        pending = self._inflight[user_id] = asyncio.get_running_loop().create_future()
+        try:
+            user = await self.bot.fetch_user(user_id)
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            # Mark retrieved so an uncoalesced failure doesn't log "never retrieved"
+            pending.exception()
+            raise
+        else:
+            pending.set_result(user)
+            self._store(user_id, user)
+            return user
+        finally:
+            del self._inflight[user_id]
+
+    def _store(self, user_id, user):
+        self._cache[user_id] = (time.monotonic() + self.ttl, user)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def stats(self):
+        lookups = self.gateway_hits + self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._cache),
+            "gateway_hits": self.gateway_hits,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((lookups - self.misses) / lookups, 3) if lookups else 0,
+        }
@@ -0,0 +1,62 @@
+class WishlistMatcher:
+    """Subscribers grouped by the catalog item their wishlist entry resolves to.
+
+    An offer notifies everyone subscribed to one of its item IDs, so a post
+    costs one dict lookup per item it lists. build() replaces the postings
+    when a guild's wishlists are loaded (off the event loop); one user's
+    changes are applied in place with update().
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._subscribers = {}  # item_id -> {user_id: original item}
+
+    def update(self, user_id, old_items, new_items):
+        """Move one user's postings from old_items to new_items without a rebuild"""
+        # Copy-on-write, so snapshots already handed to a worker stay intact
+        for item in old_items:
+            item_id = self.catalog.resolve(item)
+            subscribers = self._subscribers.get(item_id)
+            if subscribers and user_id in subscribers:
+                subscribers = dict(subscribers)
+                del subscribers[user_id]
+                if subscribers:
+                    self._subscribers[item_id] = subscribers
+                else:
+                    del self._subscribers[item_id]
+        for item in new_items:
+            item_id = self.catalog.resolve(item)
+            if item_id is None:
+                continue
+            subscribers = self._subscribers.get(item_id, {})
+            if user_id not in subscribers:
+                self._subscribers[item_id] = {**subscribers, user_id: item}
+
+    def build(self, subscriptions):
+        subscribers = {}
+        for user_id, items in subscriptions.items():
+            for item in items:
+                item_id = self.catalog.resolve(item)
+                if item_id is not None:
+                    subscribers.setdefault(item_id, {}).setdefault(user_id, item)
+        self._subscribers = subscribers
+
+    def snapshot(self, item_ids):
+        """The {user_id: subscribed item} postings of the given item IDs.
+
+        Postings are replaced, never mutated, when the matcher rebuilds, so
+        the result can be read by a worker while the loop carries on.
+        """
+        return tuple(self._subscribers[item_id] for item_id in item_ids if item_id in self._subscribers)
+
+    def match(self, item_ids):
+        """Return {user_id: subscribed item} for every subscriber of the given item IDs"""
+        return merge_subscribers(self.snapshot(item_ids))
+
+def merge_subscribers(postings):
+    """Merge postings from WishlistMatcher.snapshot(); the first item per user wins"""
+    matches = {}
+    for subscribers in postings:
+        for user_id, item in subscribers.items():
+            matches.setdefault(user_id, item)
+    return matches